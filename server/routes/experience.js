@@ -1,13 +1,29 @@
 const express = require('express');
 const router = express.Router();
 const fs = require('fs').promises;
+const { watch } = require('fs');
 const path = require('path');
+const crypto = require('crypto');
 const { spawn } = require('child_process');
 
 // Path configurations
 const NLP_SCRIPT_PATH = path.join(__dirname, '../scripts/process_experience_nlp.py');
 const EXPERIENCES_FILE = path.join(__dirname, '../../public/processed_experiences.json');
 const TEMP_DIR = path.join(__dirname, '../data');
+// JSON export of the per-company counters the NLP pipelines maintain (scripts/company_aggregates.py)
+const COMPANY_AGGREGATES_FILE = process.env.NLP_COMPANY_AGGREGATES
+  ? process.env.NLP_COMPANY_AGGREGATES.replace(/\.[^./]*$/, '') + '.json'
+  : path.join(TEMP_DIR, 'company_aggregates.json');
+
+// Warm NLP worker pool configuration (set NLP_WORKER_POOL_SIZE=0 to disable)
+const NLP_WORKER_POOL_SIZE = parseInt(process.env.NLP_WORKER_POOL_SIZE || '2', 10);
+const NLP_WORKER_TIMEOUT_MS = parseInt(process.env.NLP_WORKER_TIMEOUT_MS || '60000', 10);
+
+// Optional micro-batching NLP service (scripts/nlp_service.py), e.g. http://127.0.0.1:8765
+const NLP_SERVICE_URL = (process.env.NLP_SERVICE_URL || '').replace(/\/$/, '');
+
+// Optional spool directory drained by `python scripts/job_queue.py consume`, e.g. server/data/nlp_queue
+const NLP_QUEUE_DIR = process.env.NLP_QUEUE_DIR || '';
 
 // Ensure temp directory exists
 async function ensureTempDirectory() {
@@ -47,19 +63,412 @@ async function saveExperiences(experiences) {
   try {
     const dir = path.dirname(EXPERIENCES_FILE);
     await fs.mkdir(dir, { recursive: true });
-    await fs.writeFile(EXPERIENCES_FILE, JSON.stringify(experiences, null, 2));
+    // Minified: indentation made up a quarter of the file and of every rewrite
+    await fs.writeFile(EXPERIENCES_FILE, JSON.stringify(experiences));
   } catch (error) {
     console.error('Error saving experiences:', error);
     throw error;
   }
 }
 
-// Process experience using NLP pipeline
+// Long-lived Python worker that keeps the NLP models loaded between submissions
+class NLPWorker {
+  constructor() {
+    this.ready = false;
+    this.dead = false;
+    this.pending = new Map();
+    this.nextId = 1;
+    this.buffer = '';
+    this.readyPromise = new Promise((resolve, reject) => {
+      this.resolveReady = resolve;
+      this.rejectReady = reject;
+    });
+    // Only send() awaits readiness; a worker that dies before anyone asked must not crash the server
+    this.readyPromise.catch(() => {});
+
+    this.process = spawn('python', [NLP_SCRIPT_PATH, '--worker'], {
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: { ...process.env, PYTHONUNBUFFERED: '1' }
+    });
+
+    this.process.stdout.on('data', (data) => this.onData(data));
+    this.process.stderr.on('data', (data) => {
+      console.error('NLP worker stderr:', data.toString());
+    });
+    this.process.on('error', (error) => this.onExit(error));
+    this.process.on('close', (code) => this.onExit(new Error(`NLP worker exited with code ${code}`)));
+  }
+
+  onData(data) {
+    this.buffer += data.toString();
+    let newline;
+    while ((newline = this.buffer.indexOf('\n')) >= 0) {
+      const line = this.buffer.slice(0, newline).trim();
+      this.buffer = this.buffer.slice(newline + 1);
+      if (!line) continue;
+
+      let reply;
+      try {
+        reply = JSON.parse(line);
+      } catch (error) {
+        console.error('NLP worker sent invalid JSON:', line);
+        continue;
+      }
+
+      if (reply.type === 'ready') {
+        this.ready = true;
+        console.log('NLP worker ready:', { pid: reply.pid, nlp_tools_used: reply.nlp_tools_used });
+        this.resolveReady(reply);
+        continue;
+      }
+
+      const request = this.pending.get(reply.id);
+      if (!request) continue;
+      this.pending.delete(reply.id);
+      clearTimeout(request.timer);
+
+      if (reply.ok) {
+        request.resolve(reply);
+      } else {
+        request.reject(new Error(reply.error || 'NLP worker request failed'));
+      }
+    }
+  }
+
+  onExit(error) {
+    if (this.dead) return;
+    this.dead = true;
+    this.ready = false;
+    this.rejectReady(error);
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  async waitReady() {
+    if (this.ready) return;
+    let timer;
+    const timeout = new Promise((resolve, reject) => {
+      timer = setTimeout(() => {
+        reject(new Error(`NLP worker not ready after ${NLP_WORKER_TIMEOUT_MS}ms`));
+      }, NLP_WORKER_TIMEOUT_MS);
+    });
+    try {
+      await Promise.race([this.readyPromise, timeout]);
+    } finally {
+      clearTimeout(timer);
+    }
+  }
+
+  async send(payload) {
+    await this.waitReady();
+    if (this.dead) throw new Error('NLP worker is not running');
+
+    const id = String(this.nextId++);
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`NLP worker timed out after ${NLP_WORKER_TIMEOUT_MS}ms`));
+      }, NLP_WORKER_TIMEOUT_MS);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+  }
+
+  stop() {
+    this.process.stdin.end();
+  }
+}
+
+// Fixed-size pool of warm workers; dead workers are replaced on demand
+class NLPWorkerPool {
+  constructor(size) {
+    this.size = size;
+    this.workers = [];
+    this.cursor = 0;
+  }
+
+  getWorker() {
+    this.workers = this.workers.filter(worker => !worker.dead);
+    while (this.workers.length < this.size) {
+      this.workers.push(new NLPWorker());
+    }
+
+    // Prefer the ready worker with the fewest in-flight requests
+    const ready = this.workers.filter(worker => worker.ready);
+    if (ready.length > 0) {
+      return ready.reduce((best, worker) => worker.pending.size < best.pending.size ? worker : best);
+    }
+
+    const worker = this.workers[this.cursor % this.workers.length];
+    this.cursor++;
+    return worker;
+  }
+
+  async process(experienceData) {
+    const reply = await this.getWorker().send({ type: 'process', experience: experienceData });
+    return reply.result;
+  }
+
+  async commit(records) {
+    const reply = await this.getWorker().send({ type: 'commit', records });
+    return reply.committed;
+  }
+
+  async health() {
+    const alive = this.workers.filter(worker => !worker.dead);
+    return Promise.all(alive.map(worker => worker.send({ type: 'health' }).catch(error => ({
+      ok: false,
+      error: error.message
+    }))));
+  }
+
+  stop() {
+    this.workers.forEach(worker => worker.stop());
+    this.workers = [];
+  }
+}
+
+const nlpWorkerPool = NLP_WORKER_POOL_SIZE > 0 ? new NLPWorkerPool(NLP_WORKER_POOL_SIZE) : null;
+
+// Submits jobs to the durable spool queue; results are announced by file events, not polled for
+class NLPJobQueue {
+  constructor(dir) {
+    this.jobsDir = path.join(dir, 'jobs');
+    this.resultsDir = path.join(dir, 'results');
+    this.pending = new Map();
+    this.started = null;
+  }
+
+  start() {
+    if (!this.started) {
+      this.started = (async () => {
+        await fs.mkdir(this.jobsDir, { recursive: true });
+        await fs.mkdir(this.resultsDir, { recursive: true });
+        watch(this.resultsDir, (event, filename) => {
+          if (filename && filename.endsWith('.json')) this.collect(filename.slice(0, -5));
+        });
+      })();
+    }
+    return this.started;
+  }
+
+  async collect(id) {
+    const request = this.pending.get(id);
+    if (!request) return;
+    const resultFile = path.join(this.resultsDir, `${id}.json`);
+    let reply;
+    try {
+      reply = JSON.parse(await fs.readFile(resultFile, 'utf8'));
+    } catch (error) {
+      return; // not written yet
+    }
+    if (!this.pending.delete(id)) return;
+    clearTimeout(request.timer);
+    await fs.unlink(resultFile).catch(() => {});
+
+    if (reply.ok) {
+      request.resolve(reply.result);
+    } else {
+      request.reject(new Error(`Queued NLP job failed after ${reply.attempts} attempts: ${reply.error}`));
+    }
+  }
+
+  // Same protocol as JobQueue.withdraw: take the job's lock so no consumer can claim it
+  // meanwhile, then remove it; a job a consumer already holds is marked abandoned instead
+  async withdraw(id) {
+    const lockFile = path.join(this.jobsDir, `${id}.lock`);
+    let lock;
+    try {
+      lock = await fs.open(lockFile, 'wx');
+    } catch (error) {
+      await fs.writeFile(path.join(this.jobsDir, `${id}.abandoned`), '').catch(() => {});
+      return;
+    }
+    try {
+      await lock.writeFile(String(process.pid));
+      await lock.close();
+      await fs.unlink(path.join(this.jobsDir, `${id}.json`)).catch(() => {});
+    } finally {
+      await fs.unlink(lockFile).catch(() => {});
+    }
+  }
+
+  async process(experienceData) {
+    await this.start();
+    const id = `${Date.now()}_${crypto.randomUUID().replace(/-/g, '').slice(0, 12)}`;
+    const jobFile = path.join(this.jobsDir, `${id}.json`);
+
+    const result = new Promise((resolve, reject) => {
+      const timer = setTimeout(async () => {
+        // A missed file event must not turn a finished job into a timeout
+        await this.collect(id);
+        if (!this.pending.delete(id)) return;
+        await this.withdraw(id);
+        reject(new Error(`Queued NLP job timed out after ${NLP_WORKER_TIMEOUT_MS}ms`));
+      }, NLP_WORKER_TIMEOUT_MS);
+      this.pending.set(id, { resolve, reject, timer });
+    });
+
+    await fs.writeFile(`${jobFile}.tmp`, JSON.stringify({ id, experience: experienceData, attempts: 0 }));
+    await fs.rename(`${jobFile}.tmp`, jobFile);
+    return result;
+  }
+}
+
+const nlpJobQueue = NLP_QUEUE_DIR ? new NLPJobQueue(NLP_QUEUE_DIR) : null;
+
+// Attempts at an NLP service submission that is shed with a 503 before giving up
+const NLP_SERVICE_ATTEMPTS = parseInt(process.env.NLP_SERVICE_ATTEMPTS || '3', 10);
+
+// Raised when the NLP service sheds a request (503) or its deadline passes (504); local processing
+// would only add to the load, so callers report it instead of falling back
+class NLPServiceOverloadedError extends Error {
+  constructor(message, status, retryAfter) {
+    super(message);
+    this.name = 'NLPServiceOverloadedError';
+    this.status = status;
+    this.retryAfter = retryAfter;
+  }
+}
+
+// Submit to the NLP service, which batches concurrent submissions together. The whole call,
+// retries included, stays within NLP_WORKER_TIMEOUT_MS, and each attempt passes what is left of
+// it as the request's deadline; a 503 is retried with backoff while time remains
+async function processExperienceWithService(experienceData) {
+  const deadline = Date.now() + NLP_WORKER_TIMEOUT_MS;
+  for (let attempt = 1; ; attempt++) {
+    const remaining = deadline - Date.now();
+    const response = await fetch(`${NLP_SERVICE_URL}/process/experience`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ experience: experienceData, deadline_ms: remaining }),
+      signal: AbortSignal.timeout(remaining)
+    });
+    const reply = await response.json();
+    if (response.ok && reply.ok) {
+      return reply.result;
+    }
+    const message = reply.error || `NLP service returned ${response.status}`;
+    if (response.status !== 503 && response.status !== 504) {
+      throw new Error(message);
+    }
+
+    const retryAfter = parseInt(response.headers.get('retry-after'), 10) || 1;
+    const backoff = Math.max(retryAfter * 1000, 100 * 2 ** attempt);
+    if (response.status === 504 || attempt >= NLP_SERVICE_ATTEMPTS || Date.now() + backoff >= deadline) {
+      throw new NLPServiceOverloadedError(message, response.status, retryAfter);
+    }
+    await new Promise(resolve => setTimeout(resolve, backoff));
+  }
+}
+
+// Report stored experiences to the NLP side, preferring the NLP service, then a warm worker,
+// then a one-off process; they are added to the search index, and only committed records
+// reach the per-company counters
+async function commitExperiences(records) {
+  if (NLP_SERVICE_URL) {
+    try {
+      const response = await fetch(`${NLP_SERVICE_URL}/commit/experience`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ records }),
+        signal: AbortSignal.timeout(NLP_WORKER_TIMEOUT_MS)
+      });
+      const reply = await response.json();
+      if (!response.ok || !reply.ok) {
+        throw new Error(reply.error || `NLP service returned ${response.status}`);
+      }
+      return reply.committed;
+    } catch (error) {
+      console.error('NLP service commit failed, falling back to local workers:', error.message);
+    }
+  }
+  if (nlpWorkerPool) {
+    try {
+      return await nlpWorkerPool.commit(records);
+    } catch (error) {
+      console.error('NLP worker pool commit failed, falling back to one-off process:', error.message);
+    }
+  }
+  return new Promise((resolve, reject) => {
+    const pythonProcess = spawn('python', [NLP_SCRIPT_PATH, '--commit'], {
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: { ...process.env, PYTHONUNBUFFERED: '1' }
+    });
+    let stdout = '';
+    let stderr = '';
+    pythonProcess.stdout.on('data', (data) => { stdout += data.toString(); });
+    pythonProcess.stderr.on('data', (data) => { stderr += data.toString(); });
+    pythonProcess.on('error', reject);
+    pythonProcess.on('close', (code) => {
+      if (code !== 0) {
+        reject(new Error(`NLP commit failed with code ${code}: ${stderr}`));
+        return;
+      }
+      try {
+        resolve(JSON.parse(stdout.trim().split('\n').pop()).committed);
+      } catch (error) {
+        reject(new Error(`NLP commit returned invalid output: ${stdout}`));
+      }
+    });
+    pythonProcess.stdin.end(JSON.stringify(records));
+  });
+}
+
+// Top-k record ids for a query from the NLP service's BM25 index
+async function searchWithService(query, corpus, k) {
+  const params = new URLSearchParams({ q: query, corpus, k: String(k) });
+  const response = await fetch(`${NLP_SERVICE_URL}/search?${params}`, {
+    signal: AbortSignal.timeout(NLP_WORKER_TIMEOUT_MS)
+  });
+  const reply = await response.json();
+  if (!response.ok || !reply.ok) {
+    throw new Error(reply.error || `NLP service returned ${response.status}`);
+  }
+  return reply.results;
+}
+
+// Process experience using NLP pipeline, preferring the NLP service, then the job queue, then a warm worker;
+// an overloaded service is reported rather than worked around
 async function processExperienceWithNLP(experienceData) {
+  if (NLP_SERVICE_URL) {
+    try {
+      return await processExperienceWithService(experienceData);
+    } catch (error) {
+      if (error instanceof NLPServiceOverloadedError) {
+        throw error;
+      }
+      console.error('NLP service failed, falling back to local workers:', error.message);
+    }
+  }
+  if (nlpJobQueue) {
+    try {
+      return await nlpJobQueue.process(experienceData);
+    } catch (error) {
+      console.error('NLP job queue failed, falling back to local workers:', error.message);
+    }
+  }
+  if (nlpWorkerPool) {
+    try {
+      return await nlpWorkerPool.process(experienceData);
+    } catch (error) {
+      console.error('NLP worker pool failed, falling back to one-off process:', error.message);
+    }
+  }
+  return processExperienceWithNLPFile(experienceData);
+}
+
+// Process experience using a one-off NLP process and temporary files
+async function processExperienceWithNLPFile(experienceData) {
   await ensureTempDirectory();
   
   return new Promise(async (resolve, reject) => {
-    const timestamp = Date.now();
+    // Random suffix so submissions in the same millisecond do not share files
+    const timestamp = `${Date.now()}_${crypto.randomUUID().slice(0, 8)}`;
     const tempInputFile = path.join(TEMP_DIR, `temp_experience_${timestamp}.json`);
     const tempOutputFile = path.join(TEMP_DIR, `temp_processed_${timestamp}.json`);
     
@@ -231,6 +640,16 @@ router.get('/user-experiences', async (req, res) => {
   }
 });
 
+// Ask the client to come back later instead of storing an unprocessed record
+function rejectOverloaded(res, error) {
+  console.error('NLP service overloaded:', error.message);
+  res.setHeader('Retry-After', String(error.retryAfter));
+  return res.status(503).json({
+    message: 'NLP service is overloaded, please try again later',
+    error: error.message
+  });
+}
+
 // Submit new experience
 router.post('/submit-experience', async (req, res) => {
   try {
@@ -261,14 +680,45 @@ router.post('/submit-experience', async (req, res) => {
       processedExperience = await processExperienceWithNLP(experienceData);
       console.log('NLP processing successful');
     } catch (nlpError) {
+      if (nlpError instanceof NLPServiceOverloadedError) {
+        return rejectOverloaded(res, nlpError);
+      }
       console.error('NLP processing failed:', nlpError.message);
       // Fallback: create basic processed experience without NLP
       processedExperience = createFallbackExperience(experienceData, nlpError);
     }
     
     // Load existing experiences
-    const experiences = await loadExperiences();
-    
+    let experiences = await loadExperiences();
+
+    // Near-duplicate of an experience we already have: link to it instead of storing a copy
+    if (processedExperience.duplicate_of) {
+      const original = experiences.find(exp => exp.id === processedExperience.duplicate_of);
+      if (original) {
+        console.log('Experience is a near-duplicate of', original.id);
+        return res.status(200).json({
+          message: 'Experience already submitted',
+          experience_id: original.id,
+          duplicate_of: original.id,
+          duplicate_similarity: processedExperience.duplicate_similarity,
+          nlp_processed: original.nlp_processed,
+          sentiment: original.sentiment_analysis?.sentiment || 'neutral'
+        });
+      }
+      // The linked record is gone: process this submission after all
+      console.log('Linked experience', processedExperience.duplicate_of, 'not found, processing submission');
+      try {
+        processedExperience = await processExperienceWithNLP({ ...experienceData, allow_duplicate: true });
+      } catch (nlpError) {
+        if (nlpError instanceof NLPServiceOverloadedError) {
+          return rejectOverloaded(res, nlpError);
+        }
+        console.error('NLP processing failed:', nlpError.message);
+        processedExperience = createFallbackExperience(experienceData, nlpError);
+      }
+      experiences = await loadExperiences();
+    }
+
     // Add new experience
     experiences.push(processedExperience);
     
@@ -276,6 +726,11 @@ router.post('/submit-experience', async (req, res) => {
     await saveExperiences(experiences);
     
     console.log('Experience saved successfully:', processedExperience.id);
+
+    // Indexed and counted only now that it is stored; a failure here must not fail the submission
+    commitExperiences([processedExperience]).catch(error => {
+      console.error('Failed to report committed experience:', error.message);
+    });
     
     res.status(200).json({
       message: 'Experience submitted successfully',
@@ -307,26 +762,6 @@ router.get('/experiences', async (req, res) => {
   }
 });
 
-// Get experience by ID
-router.get('/experiences/:id', async (req, res) => {
-  try {
-    const experiences = await loadExperiences();
-    const experience = experiences.find(exp => exp.id === req.params.id);
-    
-    if (!experience) {
-      return res.status(404).json({ message: 'Experience not found' });
-    }
-    
-    res.json(experience);
-  } catch (error) {
-    console.error('Error loading experience:', error);
-    res.status(500).json({ 
-      message: 'Failed to load experience',
-      error: error.message 
-    });
-  }
-});
-
 // Get experiences with filters
 router.get('/experiences/filter', async (req, res) => {
   try {
@@ -411,6 +846,35 @@ router.get('/experiences/stats', async (req, res) => {
   }
 });
 
+// Per-company difficulty, verdict, sentiment, round and technology counters
+router.get('/experiences/stats/companies', async (req, res) => {
+  try {
+    const { company, corpus } = req.query;
+    let aggregates;
+    try {
+      aggregates = JSON.parse(await fs.readFile(COMPANY_AGGREGATES_FILE, 'utf8'));
+    } catch (error) {
+      return res.status(404).json({ message: 'Company aggregates have not been built yet' });
+    }
+
+    const corpora = {};
+    for (const [name, companies] of Object.entries(aggregates.corpora || {})) {
+      if (corpus && name !== corpus) continue;
+      corpora[name] = company
+        ? Object.fromEntries(Object.entries(companies).filter(([key]) => key.toLowerCase() === company.toLowerCase()))
+        : companies;
+    }
+
+    res.json({ updated_at: aggregates.updated_at, corpora });
+  } catch (error) {
+    console.error('Error getting company aggregates:', error);
+    res.status(500).json({ 
+      message: 'Failed to get company aggregates',
+      error: error.message 
+    });
+  }
+});
+
 // Search experiences
 router.get('/experiences/search', async (req, res) => {
   try {
@@ -437,6 +901,19 @@ router.get('/experiences/search', async (req, res) => {
       
       return searchableText.includes(searchTerm);
     });
+
+    // BM25-ranked hits from the NLP service first; substring matches cover submissions not indexed yet
+    if (NLP_SERVICE_URL) {
+      try {
+        const ranked = await searchWithService(q, 'experiences', 50);
+        const byId = new Map(experiences.map(exp => [exp.id, exp]));
+        const rankedExperiences = ranked.map(hit => byId.get(hit.id)).filter(Boolean);
+        const rankedIds = new Set(rankedExperiences.map(exp => exp.id));
+        return res.json([...rankedExperiences, ...filteredExperiences.filter(exp => !rankedIds.has(exp.id))]);
+      } catch (error) {
+        console.error('NLP service search failed, using substring search:', error.message);
+      }
+    }
     
     res.json(filteredExperiences);
   } catch (error) {
@@ -448,6 +925,26 @@ router.get('/experiences/search', async (req, res) => {
   }
 });
 
+// Get experience by ID (after the fixed /experiences/* paths, which ':id' would also match)
+router.get('/experiences/:id', async (req, res) => {
+  try {
+    const experiences = await loadExperiences();
+    const experience = experiences.find(exp => exp.id === req.params.id);
+    
+    if (!experience) {
+      return res.status(404).json({ message: 'Experience not found' });
+    }
+    
+    res.json(experience);
+  } catch (error) {
+    console.error('Error loading experience:', error);
+    res.status(500).json({ 
+      message: 'Failed to load experience',
+      error: error.message 
+    });
+  }
+});
+
 // Test NLP processing endpoint
 router.post('/test-nlp', async (req, res) => {
   try {
@@ -469,6 +966,9 @@ router.post('/test-nlp', async (req, res) => {
       nlp_tools_used: processed.nlp_tools_used
     });
   } catch (error) {
+    if (error instanceof NLPServiceOverloadedError) {
+      return rejectOverloaded(res, error);
+    }
     console.error('NLP test failed:', error);
     res.status(500).json({
       message: 'NLP processing test failed',
@@ -488,10 +988,19 @@ router.get('/health', async (req, res) => {
       fallback_processed: experiences.filter(exp => !exp.nlp_processed).length
     };
     
+    const nlpWorkers = nlpWorkerPool ? await nlpWorkerPool.health() : [];
+    const nlpService = NLP_SERVICE_URL
+      ? await fetch(`${NLP_SERVICE_URL}/health`, { signal: AbortSignal.timeout(2000) })
+        .then(response => response.json())
+        .catch(error => ({ status: 'unreachable', error: error.message }))
+      : null;
+    
     res.json({
       status: 'healthy',
       timestamp: new Date().toISOString(),
-      stats: stats
+      stats: stats,
+      nlp_workers: nlpWorkers,
+      nlp_service: nlpService
     });
   } catch (error) {
     res.status(500).json({
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass KeywordMatcher against the previous per-pattern scans.
+
+The legacy functions below are the pre-matcher implementations of the keyword
+parts of categorize_questions, analyze_sentiment, extract_key_insights and
+extract_rounds. Every generated text is checked for identical output before
+timings are reported.
+
+Usage: python benchmark_matcher.py [--sizes 1000,10000,100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from process_experience_nlp import InterviewExperienceProcessor
+
+
+def legacy_categorize(processor, questions):
+    categorized = {category: [] for category in ['technical', 'behavioral', 'system_design', 'coding', 'other']}
+    for question in questions:
+        question_lower = question.lower()
+        max_score = 0
+        best_category = 'other'
+        for category, patterns in processor.question_patterns.items():
+            score = 0
+            for pattern in patterns:
+                score += len(re.findall(pattern, question_lower, re.IGNORECASE))
+            if score > max_score:
+                max_score = score
+                best_category = category
+        categorized[best_category].append(question)
+    return categorized
+
+
+def legacy_keyword_scores(processor, text):
+    text_lower = text.lower()
+    keyword_scores = {'positive': 0, 'negative': 0, 'neutral': 0}
+    for sentiment, keywords in processor.sentiment_keywords.items():
+        for keyword in keywords:
+            keyword_scores[sentiment] += text_lower.count(keyword)
+    return keyword_scores
+
+
+def legacy_insights(processor, text):
+    text_lower = text.lower()
+    insights = {'technologies': [], 'difficulty_indicators': [], 'preparation_tips': [],
+                'red_flags': [], 'positive_aspects': []}
+    for patterns, key in ((processor.tech_patterns, 'technologies'),
+                          (processor.difficulty_patterns, 'difficulty_indicators'),
+                          (processor.tip_patterns, 'preparation_tips')):
+        for pattern in patterns:
+            insights[key].extend(re.findall(pattern, text_lower, re.IGNORECASE))
+    for keyword in processor.sentiment_keywords['negative']:
+        if keyword in text_lower:
+            insights['red_flags'].append(keyword)
+    for keyword in processor.sentiment_keywords['positive']:
+        if keyword in text_lower:
+            insights['positive_aspects'].append(keyword)
+    return {key: list(dict.fromkeys(values)) for key, values in insights.items()}
+
+
+def legacy_rounds(processor, text):
+    rounds = []
+    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    for sentence in sentences:
+        sentence_lower = sentence.lower()
+        for pattern, round_type in processor.round_patterns:
+            if re.search(pattern, sentence_lower):
+                rounds.append({'type': round_type, 'description': sentence,
+                               'questions': [sentence] if '?' in sentence else []})
+                break
+    return rounds
+
+
+def legacy_scan(processor, text, questions):
+    return (legacy_categorize(processor, questions), legacy_keyword_scores(processor, text),
+            legacy_insights(processor, text), legacy_rounds(processor, text))
+
+
+def matcher_scan(processor, text, questions):
+    hits = processor.matcher.scan(text.lower())
+    insights = processor.extract_key_insights(text, hits)
+    keyword_scores = {
+        sentiment: sum(processor._keyword_count(hits, keyword) for keyword in keywords)
+        for sentiment, keywords in processor.sentiment_keywords.items()
+    }
+    return (processor.categorize_questions(questions), keyword_scores,
+            {key: insights[key] for key in ('technologies', 'difficulty_indicators', 'preparation_tips',
+                                            'red_flags', 'positive_aspects')},
+            processor.extract_rounds(text, hits))
+
+
+def generate_text(processor, n_words, seed=0):
+    """Interview-like text mixing every keyword set with filler, punctuation and casing"""
+    rng = random.Random(seed)
+    vocabulary = [k for ks in processor.sentiment_keywords.values() for k in ks]
+    for patterns in (list(processor.question_patterns.values())
+                     + [processor.tech_patterns, processor.difficulty_patterns, processor.tip_patterns,
+                        [p for p, _ in processor.round_patterns]]):
+        for pattern in patterns:
+            vocabulary.extend(pattern[3:-3].split('|'))
+    filler = ['the', 'interviewer', 'asked', 'me', 'about', 'and', 'then', 'we', 'discussed', 'my',
+              'unhelpful', 'goodness', 'badge', 'unfair', 'designer', 're-design', 'Java', 'HR']
+
+    words = []
+    while len(words) < n_words:
+        word = rng.choice(vocabulary) if rng.random() < 0.3 else rng.choice(filler)
+        if rng.random() < 0.1:
+            word = word.capitalize()
+        words.append(word)
+        if rng.random() < 0.08:
+            words[-1] += rng.choice(['.', '?', '!', '...'])
+    return ' '.join(words)
+
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the single-pass keyword matcher")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="Comma-separated text lengths in words")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    processor = InterviewExperienceProcessor()
+
+    print(f"{'words':>8} {'legacy ms':>10} {'matcher ms':>11} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        text = generate_text(processor, size, seed=size)
+        questions = processor.extract_questions(text)
+
+        if legacy_scan(processor, text, questions) != matcher_scan(processor, text, questions):
+            raise SystemExit(f"Matcher output differs from legacy scans for {size} words")
+
+        legacy = best_time(lambda: legacy_scan(processor, text, questions), args.repeat)
+        matcher = best_time(lambda: matcher_scan(processor, text, questions), args.repeat)
+        print(f"{size:>8} {legacy * 1000:>10.2f} {matcher * 1000:>11.2f} {legacy / matcher:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the experience and GFG NLP pipelines.
+
+Generates realistic synthetic interview experiences / GFG articles at a
+configurable corpus size and text length, times every pipeline stage, records
+peak RSS and writes machine-readable results that can be compared against a
+stored baseline.
+
+Usage:
+    python benchmark_pipelines.py generate --pipeline gfg --records 1000 --length long -o corpus.jsonl
+    python benchmark_pipelines.py run --pipeline experience --records 500 --length medium -o results.json
+    python benchmark_pipelines.py run --pipeline gfg --records 200 --baseline baseline.json
+    python benchmark_pipelines.py coldstart -o coldstart.json
+    python benchmark_pipelines.py backends --records 200 -o backends.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from itertools import islice
+
+# Approximate words per generated text
+LENGTHS = {'short': 80, 'medium': 400, 'long': 2000, 'very_long': 10000}
+
+COMPANIES = ['Amazon', 'Google', 'Microsoft', 'Flipkart', 'Adobe', 'Goldman Sachs', 'TCS', 'Infosys',
+             'Walmart', 'Uber', 'Oracle', 'Paytm', 'Zoho', 'Salesforce', 'Atlassian', 'Swiggy']
+ROLES = ['SDE-1', 'SDE Intern', 'Software Engineer', 'Backend Developer', 'Frontend Developer',
+         'Data Analyst', 'Support Engineer', 'Senior Software Engineer']
+ROUND_HEADERS = ['Online Assessment', 'Technical Interview 1', 'Technical Interview 2', 'Coding Round',
+                 'Managerial Round', 'HR Round', 'Group Discussion', 'Aptitude Round', 'System Design Round']
+QUESTIONS = [
+    'How would you reverse a linked list in place?',
+    'What is the difference between a process and a thread?',
+    'Explain how a hash table handles collisions.',
+    'Design a URL shortening service that can scale to millions of users.',
+    'Why do you want to join our company?',
+    'Describe a time when you handled a conflict in your team.',
+    'What happens when you type a URL in the browser?',
+    'How does TCP differ from UDP?',
+    'Explain normalization in DBMS with an example.',
+    'Find the longest increasing subsequence using dynamic programming.',
+    'Which data structure would you use to implement an LRU cache?',
+    'What is deadlock and how can it be prevented?',
+    'Tell me about your most challenging project.',
+    'How do you detect a cycle in a directed graph?',
+    'What are the SOLID principles?',
+    'Explain the difference between SQL and NoSQL databases.',
+]
+NARRATIVE = [
+    'The interviewer was very friendly and helpful throughout the discussion.',
+    'I explained my approach first and then wrote clean code in Java.',
+    'The round focused on data structures, algorithms and time complexity.',
+    'We discussed my resume and the projects I built with React and Node.',
+    'The overall process was smooth and well organized by the recruiter.',
+    'Honestly the second problem was difficult and I struggled with edge cases.',
+    'He asked me to optimize the solution from quadratic to linear time.',
+    'The assessment had two coding questions of medium difficulty on HackerRank.',
+    'I would suggest practicing on LeetCode and revising core subjects before the interview.',
+    'The panel seemed disorganized and the feedback was unclear.',
+    'We talked about caching, load balancing and database sharding for the system.',
+    'After the final round the HR called to discuss the offer.',
+]
+VERDICTS = ['Verdict: Selected', 'Verdict: Rejected', 'I was not selected.', 'Finally I got selected!',
+            'I was shortlisted for the next round.']
+
+
+def _paragraph(rng, n_words):
+    sentences = []
+    words = 0
+    while words < n_words:
+        sentence = rng.choice(QUESTIONS) if rng.random() < 0.3 else rng.choice(NARRATIVE)
+        sentences.append(sentence)
+        words += len(sentence.split())
+    return sentences
+
+
+def generate_experience(rng, n_words, index=0):
+    """A user-submitted experience in the format the Node route sends"""
+    company, role = rng.choice(COMPANIES), rng.choice(ROLES)
+    return {
+        'id': f"bench_{index}",
+        'name': 'Benchmark User',
+        'email': 'bench@example.com',
+        'company': company,
+        'role': role,
+        'experience': ' '.join(_paragraph(rng, n_words)) + ' ' + rng.choice(VERDICTS),
+        'verdict': rng.choice(['Selected', 'Rejected', 'Pending']),
+        'difficulty': rng.choice(['Easy', 'Medium', 'Hard']),
+        'tags': f"{role}, {company}"
+    }
+
+
+def generate_gfg_article(rng, n_words, index=0):
+    """A raw GFG article with round headers and one question per line"""
+    company, role = rng.choice(COMPANIES), rng.choice(ROLES)
+    n_rounds = rng.randint(2, 5)
+    lines = [f"I recently interviewed with {company} for the {role} position."]
+    for r, header in enumerate(rng.sample(ROUND_HEADERS, n_rounds), 1):
+        lines.append(f"Round {r}: {header}")
+        for sentence in _paragraph(rng, max(10, n_words // n_rounds)):
+            lines.append(sentence)
+    lines.append(rng.choice(VERDICTS))
+    return {
+        'title': f"{company} Interview Experience for {role} #{index}",
+        'url': f"https://www.geeksforgeeks.org/{company.lower().replace(' ', '-')}-interview-experience-{index}/",
+        'content': '\n'.join(lines),
+        'source': 'GeeksforGeeks'
+    }
+
+
+def generate_corpus(pipeline, records, length, seed=0):
+    """Lazily yield `records` synthetic records of the given length class"""
+    rng = random.Random(seed)
+    generate = generate_experience if pipeline == 'experience' else generate_gfg_article
+    for i in range(records):
+        # +-50% around the nominal length so texts are not all identical in size
+        n_words = max(10, int(LENGTHS[length] * rng.uniform(0.5, 1.5)))
+        yield generate(rng, n_words, i)
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+class StageTimer:
+    """Accumulates wall time and call counts per named stage"""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.samples = defaultdict(list)
+
+    def time(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        self.totals[stage] += elapsed
+        self.calls[stage] += 1
+        self.samples[stage].append(elapsed)
+        return result
+
+    def summary(self):
+        stages = {}
+        for stage, total in self.totals.items():
+            samples = sorted(self.samples[stage])
+            stages[stage] = {
+                'total_s': round(total, 6),
+                'calls': self.calls[stage],
+                'mean_ms': round(total / self.calls[stage] * 1000, 4),
+                'p50_ms': round(samples[len(samples) // 2] * 1000, 4),
+                'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 4),
+            }
+        return stages
+
+
+def run_experience(records, timer):
+    from process_experience_nlp import InterviewExperienceProcessor
+
+    processor = timer.time('load_models', InterviewExperienceProcessor)
+    for record in records:
+        text = record['experience']
+        doc = timer.time('spacy_parse', processor.parse, text)
+        questions = timer.time('extract_questions', processor.extract_questions, text, doc)
+        timer.time('categorize', processor.categorize_questions, questions)
+        hits = timer.time('keyword_scan', processor.matcher.scan, text.lower())
+        sentiment = timer.time('sentiment', processor.analyze_sentiment, text, hits)
+        insights = timer.time('insights', processor.extract_key_insights, text, hits, doc)
+        timer.time('rounds', processor.extract_rounds, text, hits, doc)
+        timer.time('highlights', processor.generate_highlights, insights, sentiment)
+        timer.time('process_experience', processor.process_experience, record)
+    return {'nltk': processor.nltk_ready, 'spacy': processor.spacy_ready}
+
+
+def run_gfg(records, timer, batch_size=64):
+    import process_gfg_nlp as gfg
+
+    # Models load lazily; load them up front so the first batch's stage timings stay comparable
+    timer.time('load_models', gfg.models.load_all)
+
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        contents = [entry.get('content', '') for entry in batch]
+        docs = timer.time('spacy_parse', gfg.parse_documents, gfg.nlp, contents)
+        for entry, doc in zip(batch, docs):
+            timer.time('text_metadata', gfg.extract_text_metadata, entry, doc)
+            rounds = timer.time('split_questions', gfg.split_questions_by_round, entry.get('content', ''))
+            questions = [q for qs in rounds.values() for q in qs]
+            if questions:
+                embeddings = timer.time('sbert_encode', gfg.sbert_model.encode, questions,
+                                        convert_to_numpy=True, normalize_embeddings=True)
+                offset = 0
+                for qs in rounds.values():
+                    timer.time('dedup', gfg.deduplicate_questions_semantically, qs,
+                               embeddings=embeddings[offset:offset + len(qs)])
+                    offset += len(qs)
+        timer.time('sentiment', gfg.sentiment_pipeline, [c[:512] for c in contents], batch_size=16)
+        timer.time('extract_metadata_batch', gfg.extract_metadata_batch, batch)
+    return {}
+
+
+# Timed in a fresh interpreter so nothing is already imported or loaded
+COLDSTART_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import process_gfg_nlp as gfg
+for name in sys.argv[1:]:
+    gfg.models.get(name)
+elapsed = time.perf_counter() - start
+from benchmark_pipelines import peak_rss_mb
+print(json.dumps({'seconds': round(elapsed, 3), 'peak_rss_mb': round(peak_rss_mb(), 1)}))
+"""
+
+
+def run_coldstart():
+    """Startup time and memory of process_gfg_nlp per stage selection, against loading every model"""
+    import process_gfg_nlp as gfg
+
+    scenarios = {'import only': []}
+    for stage, model in gfg.STAGE_MODELS.items():
+        scenarios[f'{stage} only'] = [model]
+    scenarios['all stages (old eager import)'] = gfg.models.names()
+
+    results = {'python': platform.python_version(), 'scenarios': {}}
+    print(f"{'scenario':<32} {'seconds':>8} {'peak RSS MB':>12}")
+    for label, names in scenarios.items():
+        proc = subprocess.run([sys.executable, '-c', COLDSTART_SNIPPET, *names], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proc.returncode:
+            error = (proc.stderr.strip().splitlines() or ['failed'])[-1]
+            results['scenarios'][label] = {'models': names, 'error': error}
+            print(f"{label:<32} {'-':>8} {'-':>12}  ({error})")
+            continue
+        measured = json.loads(proc.stdout.strip().splitlines()[-1])
+        results['scenarios'][label] = {'models': names, **measured}
+        print(f"{label:<32} {measured['seconds']:>8.3f} {measured['peak_rss_mb']:>12.1f}")
+    return results
+
+
+BACKEND_SNIPPET = """
+import json, sys, time
+from benchmark_pipelines import generate_corpus, peak_rss_mb
+import process_gfg_nlp as gfg
+
+records, length, seed = int(sys.argv[1]), sys.argv[2], int(sys.argv[3])
+articles = list(generate_corpus('gfg', records, length, seed))
+questions = [q for a in articles for qs in gfg.split_questions_by_round(a['content']).values() for q in qs]
+texts = [a['content'][:512] for a in articles]
+
+result = {}
+start = time.perf_counter()
+sbert, sentiment = gfg.models.get('sbert'), gfg.models.get('sentiment')
+result['load_s'] = round(time.perf_counter() - start, 3)
+
+start = time.perf_counter()
+sbert.encode(questions, batch_size=gfg.ENCODE_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True)
+result['encode_per_s'] = round(len(questions) / (time.perf_counter() - start), 1)
+
+start = time.perf_counter()
+sentiment(texts, batch_size=gfg.SENTIMENT_BATCH_SIZE)
+result['sentiment_per_s'] = round(len(texts) / (time.perf_counter() - start), 1)
+
+result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+print(json.dumps(result))
+"""
+
+
+def run_backends(records, length, seed=0):
+    """Model load time, throughput and memory of the torch and ONNX backends, plus their output agreement"""
+    results = {'records': records, 'length': length, 'backends': {}}
+    print(f"{'backend':<8} {'load s':>7} {'encode/s':>9} {'sentiment/s':>12} {'peak RSS MB':>12}")
+    for backend in ('torch', 'onnx'):
+        env = {**os.environ, 'NLP_INFERENCE_BACKEND': backend}
+        proc = subprocess.run([sys.executable, '-c', BACKEND_SNIPPET, str(records), length, str(seed)],
+                              capture_output=True, text=True, env=env,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proc.returncode:
+            error = (proc.stderr.strip().splitlines() or ['failed'])[-1]
+            results['backends'][backend] = {'error': error}
+            print(f"{backend:<8} ({error})")
+            continue
+        measured = json.loads(proc.stdout.strip().splitlines()[-1])
+        results['backends'][backend] = measured
+        print(f"{backend:<8} {measured['load_s']:>7.2f} {measured['encode_per_s']:>9.1f} "
+              f"{measured['sentiment_per_s']:>12.1f} {measured['peak_rss_mb']:>12.1f}")
+
+    if all('error' not in r for r in results['backends'].values()):
+        from onnx_backend import check_accuracy
+        from process_gfg_nlp import split_questions_by_round
+
+        articles = list(generate_corpus('gfg', records, length, seed))
+        questions = sorted({q for a in articles for qs in split_questions_by_round(a['content']).values() for q in qs})
+        results['accuracy'] = check_accuracy(questions, [a['content'] for a in articles])
+        print(f"accuracy: {results['accuracy']}")
+    return results
+
+
+def compare(results, baseline, tolerance, min_ms=0.05):
+    """Print per-stage ratios against a baseline; returns the stages that regressed"""
+    regressions = []
+    print(f"\n{'stage':<24} {'baseline ms':>12} {'current ms':>11} {'ratio':>7}")
+    for stage, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous or not previous['mean_ms']:
+            continue
+        ratio = current['mean_ms'] / previous['mean_ms']
+        # Ignore stages too fast for their ratio to be meaningful
+        slower_ms = current['mean_ms'] - previous['mean_ms']
+        flag = '  <-- regression' if ratio > 1 + tolerance and slower_ms > min_ms else ''
+        print(f"{stage:<24} {previous['mean_ms']:>12.3f} {current['mean_ms']:>11.3f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NLP pipelines on a synthetic corpus")
+    parser.add_argument('command', choices=['generate', 'run', 'coldstart', 'backends'])
+    parser.add_argument('--pipeline', choices=['experience', 'gfg'], default='experience')
+    parser.add_argument('--records', type=int, default=100, help="Number of records (10 to 100000)")
+    parser.add_argument('--length', choices=sorted(LENGTHS), default='medium')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="Corpus JSONL (generate) or results JSON (run)")
+    parser.add_argument('--baseline', help="Results JSON from a previous run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed slowdown before flagging a stage")
+    parser.add_argument('--min-ms', type=float, default=0.05, help="Ignore slowdowns smaller than this per call")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.pipeline, args.records, args.length, args.seed)
+
+    if args.command == 'generate':
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        for record in corpus:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if args.output:
+            out.close()
+        return
+
+    if args.command in ('coldstart', 'backends'):
+        results = run_coldstart() if args.command == 'coldstart' else run_backends(args.records, args.length, args.seed)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        return
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    runner = run_experience if args.pipeline == 'experience' else run_gfg
+    tools = runner(corpus, timer)
+    elapsed = time.perf_counter() - start
+
+    results = {
+        'pipeline': args.pipeline,
+        'records': args.records,
+        'length': args.length,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'tools': tools,
+        'wall_s': round(elapsed, 4),
+        'records_per_s': round(args.records / elapsed, 3) if elapsed else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': timer.summary(),
+    }
+
+    print(f"{args.pipeline}: {args.records} x {args.length} records in {elapsed:.2f}s "
+          f"({results['records_per_s']} rec/s), peak RSS {results['peak_rss_mb']} MB")
+    for stage, stats in results['stages'].items():
+        print(f"  {stage:<24} mean {stats['mean_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms  calls {stats['calls']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_ms)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Compact on-disk format for processed experiences and enriched GFG entries.
+
+The default outputs are indented JSON arrays in which every record carries its
+full raw text, so they are mostly whitespace and repeated text. A compact
+output is instead:
+
+- `<name>.jsonl`: minified JSONL, one record per line, with each raw text field
+  (`original_experience`, `experience`, `content`) replaced by a
+  `<field>_ref` hash;
+- `<name>.jsonl.texts`: the text sidecar, one "<hash>\\t<JSON string>" line per
+  distinct text, so each text is stored once however many records or fields
+  reference it.
+
+A compact output never replaces a JSON array that the server or frontend
+parse as a whole: the pipelines write it to the .jsonl sibling of a .json
+output path (compact_path). Only the hashes are read when the sidecar is
+opened; texts are read on demand.
+stream_io.iter_json_records expands compact files transparently, so every
+reader of the pipelines' outputs accepts them. For analytics, records can be
+exported to Parquet through pandas (needs pyarrow).
+
+Usage:
+    python compact_output.py convert --input ../data/enhanced_gfg_data.json --output ../data/enhanced_gfg_data.jsonl
+    python compact_output.py parquet --input ../data/enhanced_gfg_data.json --output ../data/enhanced_gfg_data.parquet
+    python compact_output.py compare --input ../data/enhanced_gfg_data.json ../../public/processed_experiences.json
+"""
+
+import hashlib
+import json
+import os
+
+TEXT_FIELDS = ('original_experience', 'experience', 'content')
+TEXTS_SUFFIX = '.texts'
+REF_SUFFIX = '_ref'
+# 128 bits of SHA-256: collisions are not a practical concern at corpus scale
+HASH_CHARS = 32
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:HASH_CHARS]
+
+
+def texts_path(path):
+    return path + TEXTS_SUFFIX
+
+
+def compact_path(path):
+    """Where a compact output requested at `path` is written: `x.json` becomes `x.jsonl`"""
+    root, ext = os.path.splitext(path)
+    return root + '.jsonl' if ext == '.json' else path
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+class TextStore:
+    """Append-only sidecar of distinct texts keyed by hash"""
+
+    def __init__(self, path, writable=True):
+        self.path = path
+        self.offsets = {}
+        size = 0
+        if os.path.exists(path) or not writable:
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Half-written line of an interrupted append
+                        break
+                    self.offsets[line[:HASH_CHARS].decode('ascii')] = size
+                    size += len(line)
+        if not writable:
+            self._file = open(path, 'rb')
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a+b')
+        self._file.truncate(size)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def add(self, text):
+        """Store `text` unless already present; returns its hash"""
+        key = text_hash(text)
+        if key not in self.offsets:
+            self._file.seek(0, os.SEEK_END)
+            self.offsets[key] = self._file.tell()
+            self._file.write(f"{key}\t{json.dumps(text, ensure_ascii=False)}\n".encode('utf-8'))
+        return key
+
+    def get(self, key):
+        self._file.flush()
+        self._file.seek(self.offsets[key])
+        line = self._file.readline()
+        return json.loads(line[HASH_CHARS + 1:])
+
+    def flush(self, sync=False):
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def compact_record(record, texts, fields=TEXT_FIELDS):
+    """Copy of `record` with its raw text fields moved into `texts` and replaced by hash references"""
+    compact = dict(record)
+    for field in fields:
+        text = compact.get(field)
+        if isinstance(text, str) and text:
+            del compact[field]
+            compact[field + REF_SUFFIX] = texts.add(text)
+    return compact
+
+
+def expand_record(record, texts, fields=TEXT_FIELDS):
+    """Inverse of compact_record"""
+    for field in fields:
+        key = record.pop(field + REF_SUFFIX, None)
+        if key is not None:
+            record[field] = texts.get(key)
+    return record
+
+
+def is_compact(path):
+    return os.path.exists(texts_path(path))
+
+
+def write_compact(records, path, fields=TEXT_FIELDS):
+    """
+    Write `records` as a compact output, replacing any previous one. Texts no
+    longer referenced are dropped; the sidecar is replaced before the records
+    so the records never reference a missing text.
+    """
+    tmp_path = path + '.tmp'
+    tmp_texts = texts_path(tmp_path)
+    if os.path.exists(tmp_texts):
+        os.remove(tmp_texts)
+    texts = TextStore(tmp_texts)
+    count = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(_dumps(compact_record(record, texts, fields)) + '\n')
+                count += 1
+    finally:
+        texts.close()
+    os.replace(tmp_texts, texts_path(path))
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_compact_records(path, fields=TEXT_FIELDS, expand=True):
+    """Yield the records of a compact output, with texts read back unless `expand` is false"""
+    texts = TextStore(texts_path(path), writable=False) if expand else None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield expand_record(record, texts, fields) if expand else record
+    finally:
+        if texts is not None:
+            texts.close()
+
+
+def export_parquet(records, path, fields=TEXT_FIELDS, include_text=False):
+    """
+    Write records to a Parquet file for analytics. Nested values become JSON
+    strings so every column has one type; raw texts are kept as hash columns
+    unless `include_text` is set.
+    """
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("Parquet export needs pandas: pip install -r requirements.txt") from e
+
+    rows = []
+    for record in records:
+        row = dict(record)
+        if not include_text:
+            for field in fields:
+                text = row.pop(field, None)
+                if isinstance(text, str) and text:
+                    row[field + REF_SUFFIX] = text_hash(text)
+        rows.append({key: _dumps(value) if isinstance(value, (dict, list)) else value for key, value in row.items()})
+
+    try:
+        pd.DataFrame(rows).to_parquet(path, index=False)
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+    return len(rows)
+
+
+def compare_formats(input_path, work_dir):
+    """Size and load time of one corpus as indented JSON, minified JSON, compact JSONL and Parquet"""
+    import time
+
+    from stream_io import iter_json_records
+
+    def timed(load):
+        start = time.perf_counter()
+        count = load()
+        return count, round((time.perf_counter() - start) * 1000, 2)
+
+    records = list(iter_json_records(input_path))
+    base = os.path.join(work_dir, os.path.splitext(os.path.basename(input_path))[0])
+    results = {}
+
+    for name, indent, separators in (('json_indent2', 2, None), ('json_minified', None, (',', ':'))):
+        path = f"{base}.{name}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=indent, separators=separators, ensure_ascii=False)
+
+        def load(path=path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return len(json.load(f))
+        _, ms = timed(load)
+        results[name] = {'bytes': os.path.getsize(path), 'load_ms': ms}
+
+    path = f"{base}.compact.jsonl"
+    write_compact(records, path)
+    _, ms = timed(lambda: sum(1 for _ in iter_compact_records(path)))
+    _, metadata_ms = timed(lambda: sum(1 for _ in iter_compact_records(path, expand=False)))
+    results['compact_jsonl'] = {
+        'bytes': os.path.getsize(path) + os.path.getsize(texts_path(path)),
+        'records_bytes': os.path.getsize(path),
+        'load_ms': ms,
+        'load_without_text_ms': metadata_ms,
+    }
+
+    path = f"{base}.parquet"
+    try:
+        export_parquet(records, path)
+    except ImportError as e:
+        results['parquet'] = {'skipped': str(e)}
+    else:
+        import pandas as pd
+        _, ms = timed(lambda: len(pd.read_parquet(path)))
+        results['parquet'] = {'bytes': os.path.getsize(path), 'load_ms': ms}
+
+    return {'input': input_path, 'records': len(records), 'formats': results}
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Convert pipeline outputs to the compact or Parquet format")
+    parser.add_argument("command", choices=["convert", "expand", "parquet", "compare"])
+    parser.add_argument("--input", nargs="+", required=True, help="JSON/JSONL/compact input(s)")
+    parser.add_argument("--output", help="Output path for convert/expand/parquet")
+    parser.add_argument("--include-text", action="store_true", help="With 'parquet', keep raw texts as columns")
+    args = parser.parse_args()
+
+    from stream_io import iter_json_records
+
+    if args.command == "compare":
+        with tempfile.TemporaryDirectory() as work_dir:
+            for input_path in args.input:
+                print(json.dumps(compare_formats(input_path, work_dir), indent=2))
+    elif not args.output:
+        parser.error(f"{args.command} needs --output")
+    elif args.command == "convert":
+        count = write_compact(iter_json_records(args.input[0]), args.output)
+        print(f"[✓] Wrote {count} compact records to '{args.output}' (+ '{texts_path(args.output)}')")
+    elif args.command == "expand":
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(list(iter_json_records(args.input[0])), f, indent=2, ensure_ascii=False)
+        print(f"[✓] Expanded '{args.input[0]}' to '{args.output}'")
+    else:
+        count = export_parquet(iter_json_records(args.input[0]), args.output, include_text=args.include_text)
+        print(f"[✓] Exported {count} records to '{args.output}'")
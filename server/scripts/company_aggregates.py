@@ -0,0 +1,235 @@
+"""
+Per-company aggregate statistics maintained incrementally as records are committed.
+
+Counters are keyed by corpus, company, role, field and value (difficulty,
+verdict, sentiment, rounds, technologies), so a dashboard reads O(companies)
+rows instead of scanning every record. Each record's contribution is kept
+under its record id: committing a record again replaces its old contribution,
+so reprocessing never double counts. After each update the counters are
+exported to a JSON file (company_aggregates.json next to the database) that
+the server reads as-is.
+
+Usage:
+    python company_aggregates.py rebuild --corpus experiences --input ../../public/processed_experiences.json
+    python company_aggregates.py rebuild --corpus gfg --input ../data/enhanced_gfg_data.json
+    python company_aggregates.py show --company Amazon
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+AGGREGATES_PATH = os.path.join(DATA_DIR, 'company_aggregates.sqlite')
+
+FIELDS = ('difficulty', 'verdict', 'sentiment', 'rounds', 'technologies')
+TOP_TECHNOLOGIES = 10
+
+
+def _label(value, default='Unknown'):
+    return ' '.join(str(value or '').split()) or default
+
+
+def _round_name(round_info):
+    if isinstance(round_info, dict):
+        round_info = round_info.get('type') or round_info.get('roundName') or round_info.get('name')
+    return _label(round_info, None)
+
+
+def record_counters(record):
+    """(field, value) pairs a record adds to its company/role counters, each counted once"""
+    counters = [
+        ('records', ''),
+        ('difficulty', _label(record.get('difficulty'))),
+        ('verdict', _label(record.get('verdict'))),
+        ('sentiment', _label(record.get('feedback_sentiment'), 'unknown').lower()),
+    ]
+    rounds = [_round_name(r) for r in (record.get('rounds') or []) + (record.get('interview_rounds') or [])]
+    counters += [('rounds', name) for name in dict.fromkeys(r for r in rounds if r)]
+    technologies = (record.get('extracted_insights') or {}).get('technologies') or []
+    counters += [('technologies', name) for name in dict.fromkeys(_label(t, None) for t in technologies) if name]
+    return counters
+
+
+def experience_id(record):
+    return record.get('id')
+
+
+def gfg_id(record):
+    from enhanced_store import content_key
+    return content_key(record)
+
+
+RECORD_IDS = {
+    'experiences': experience_id,
+    'gfg': gfg_id,
+}
+
+
+class CompanyAggregates:
+    def __init__(self, path=AGGREGATES_PATH, export_path=None):
+        self.path = path
+        self.export_path = export_path or os.path.splitext(path)[0] + '.json'
+        self.dirty = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = None
+        self._pid = None
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS contributions ("
+            " corpus TEXT NOT NULL, record_id TEXT NOT NULL, company TEXT NOT NULL, role TEXT NOT NULL,"
+            " counters TEXT NOT NULL, PRIMARY KEY (corpus, record_id));"
+            "CREATE TABLE IF NOT EXISTS counts ("
+            " corpus TEXT NOT NULL, company TEXT NOT NULL, role TEXT NOT NULL, field TEXT NOT NULL,"
+            " value TEXT NOT NULL, n INTEGER NOT NULL, PRIMARY KEY (corpus, company, role, field, value));"
+        )
+        self.conn.commit()
+
+    @property
+    def conn(self):
+        # SQLite connections must not cross fork(); reopen in child processes
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._pid = os.getpid()
+        return self._conn
+
+    def count(self, corpus):
+        """Records contributing to `corpus`"""
+        return self.conn.execute("SELECT COUNT(*) FROM contributions WHERE corpus = ?", (corpus,)).fetchone()[0]
+
+    def _apply(self, corpus, company, role, counters, delta):
+        self.conn.executemany(
+            "INSERT INTO counts (corpus, company, role, field, value, n) VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (corpus, company, role, field, value) DO UPDATE SET n = n + excluded.n",
+            [(corpus, company, role, field, value, delta) for field, value in counters]
+        )
+
+    def _contribution(self, corpus, record_id):
+        return self.conn.execute("SELECT company, role, counters FROM contributions WHERE corpus = ? AND record_id = ?",
+                                 (corpus, record_id)).fetchone()
+
+    def add(self, corpus, records, record_id=None):
+        """Apply the deltas of committed records, replacing earlier versions; returns how many changed"""
+        record_id = record_id or RECORD_IDS[corpus]
+        changed = 0
+        for record in records:
+            key = record_id(record)
+            if key is None:
+                continue
+            key = str(key)
+            counters = record_counters(record)
+            new = (_label(record.get('company')), _label(record.get('role')), json.dumps(counters, ensure_ascii=False))
+            old = self._contribution(corpus, key)
+            if old == new:
+                continue
+            if old is not None:
+                self._apply(corpus, old[0], old[1], json.loads(old[2]), -1)
+            self._apply(corpus, new[0], new[1], counters, 1)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO contributions (corpus, record_id, company, role, counters) VALUES (?, ?, ?, ?, ?)",
+                (corpus, key) + new
+            )
+            changed += 1
+        if changed:
+            self.conn.execute("DELETE FROM counts WHERE n <= 0")
+            self.dirty = True
+        self.conn.commit()
+        return changed
+
+    def remove(self, corpus, record_id):
+        old = self._contribution(corpus, str(record_id))
+        if old is not None:
+            self._apply(corpus, old[0], old[1], json.loads(old[2]), -1)
+            self.conn.execute("DELETE FROM contributions WHERE corpus = ? AND record_id = ?", (corpus, str(record_id)))
+            self.conn.execute("DELETE FROM counts WHERE n <= 0")
+            self.dirty = True
+        self.conn.commit()
+
+    def clear(self, corpus):
+        self.conn.execute("DELETE FROM contributions WHERE corpus = ?", (corpus,))
+        self.conn.execute("DELETE FROM counts WHERE corpus = ?", (corpus,))
+        self.conn.commit()
+        self.dirty = True
+
+    def summary(self, corpus=None, company=None):
+        """{corpus: {company: counters plus per-role counters}}, optionally for one corpus/company"""
+        query = "SELECT corpus, company, role, field, value, n FROM counts"
+        conditions = [(name, value) for name, value in (('corpus', corpus), ('company', company)) if value]
+        if conditions:
+            query += " WHERE " + " AND ".join(f"{name} = ?" for name, _ in conditions)
+        rows = self.conn.execute(query, [value for _, value in conditions]).fetchall()
+
+        corpora = {}
+        for corpus_name, company_name, role, field, value, n in rows:
+            entry = corpora.setdefault(corpus_name, {}).setdefault(company_name, {'roles': {}})
+            for target in (entry, entry['roles'].setdefault(role, {})):
+                counts = target.setdefault(field, {})
+                counts[value] = counts.get(value, 0) + n
+        return {corpus_name: {company_name: dict(_finalize(entry),
+                                                 roles={role: _finalize(counts) for role, counts in entry['roles'].items()})
+                              for company_name, entry in sorted(companies.items())}
+                for corpus_name, companies in corpora.items()}
+
+    def export(self, force=False):
+        """Write the summary JSON for dashboards if anything changed since the last export"""
+        if not (self.dirty or force):
+            return False
+        data = {'updated_at': datetime.now().isoformat(), 'corpora': self.summary()}
+        tmp_path = self.export_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.export_path)
+        self.dirty = False
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _finalize(counters):
+    """Record count plus distributions sorted by count, technologies cut down to the most common"""
+    summary = {'records': counters.get('records', {}).get('', 0)}
+    for field in FIELDS:
+        ranked = sorted(counters.get(field, {}).items(), key=lambda item: (-item[1], item[0]))
+        if field == 'technologies':
+            summary['top_technologies'] = ranked[:TOP_TECHNOLOGIES]
+        else:
+            summary[field] = dict(ranked)
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild or inspect the per-company aggregates")
+    parser.add_argument("command", choices=["rebuild", "show", "export"])
+    parser.add_argument("--aggregates", default=os.environ.get('NLP_COMPANY_AGGREGATES') or AGGREGATES_PATH)
+    parser.add_argument("--corpus", choices=sorted(RECORD_IDS))
+    parser.add_argument("--input", help="JSON/JSONL records to count with 'rebuild'")
+    parser.add_argument("--company", help="Limit 'show' to one company")
+    args = parser.parse_args()
+
+    aggregates = CompanyAggregates(args.aggregates)
+    if args.command == "rebuild":
+        from stream_io import iter_json_records
+
+        if not (args.corpus and args.input):
+            parser.error("rebuild needs --corpus and --input")
+        aggregates.clear(args.corpus)
+        added = aggregates.add(args.corpus, iter_json_records(args.input))
+        aggregates.export()
+        print(f"[✓] Counted {added} {args.corpus} records from '{args.input}'")
+    elif args.command == "show":
+        print(json.dumps(aggregates.summary(args.corpus, args.company), indent=2, ensure_ascii=False))
+    else:
+        aggregates.export(force=True)
+        print(f"[✓] Exported aggregates to '{aggregates.export_path}'")
+    aggregates.close()
@@ -0,0 +1,263 @@
+"""
+Content-addressed cache of question embeddings.
+
+A hash of the normalized question text maps to a row of a memory-mapped
+float16 matrix, so questions that recur across articles and runs are encoded
+once. Keys are kept in an append-only binary index (16 bytes per row) next to
+the matrix; a per-row "last used" run number drives compaction.
+
+Each model/backend gets its own subdirectory, since their vectors differ.
+
+Usage:
+    python embedding_cache.py stats
+    python embedding_cache.py compact --max-idle-runs 10 --max-entries 500000
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+EMBEDDING_CACHE_DIR = os.path.join(DATA_DIR, 'embedding_cache')
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+LAST_USED_FILE = 'last_used.npy'
+KEYS_FILE = 'keys.bin'
+META_FILE = 'meta.json'
+
+KEY_BYTES = 16
+INITIAL_CAPACITY = 4096
+
+
+def text_key(text):
+    """
+    Key of a question; whitespace and case are normalized away, which is safe
+    because the (uncased) SBERT tokenizer ignores them too.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=KEY_BYTES).digest()
+
+
+def _open_grown(path, old, count, shape, dtype):
+    """Copy the first `count` rows of `old` into a new memmap of `shape` and swap it in"""
+    tmp_path = path + '.tmp'
+    grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+    if old is not None and count:
+        grown[:count] = old[:count]
+    grown.flush()
+    del grown
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode='r+')
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, dim=None, new_run=True):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.count = 0
+        self.run = 0
+        self.hits = 0
+        self.misses = 0
+        self.rows = {}
+        self.embeddings = None
+        self.last_used = None
+        self._saved_keys = 0
+        self._new_keys = []
+
+        meta_path = os.path.join(cache_dir, META_FILE)
+        if os.path.exists(meta_path):
+            self._load(meta_path)
+        if new_run:
+            self.run += 1
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _load(self, meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.count = meta['count']
+        self.run = meta['run']
+
+        # keys.bin may hold rows written after the last meta update; those are ignored
+        with open(self._path(KEYS_FILE), 'rb') as f:
+            keys = f.read(self.count * KEY_BYTES)
+        self.rows = {keys[i * KEY_BYTES:(i + 1) * KEY_BYTES]: i for i in range(self.count)}
+        self._saved_keys = self.count
+        self.embeddings = np.load(self._path(EMBEDDINGS_FILE), mmap_mode='r+')
+        self.last_used = np.load(self._path(LAST_USED_FILE), mmap_mode='r+')
+
+    def __len__(self):
+        return self.count
+
+    def _ensure_capacity(self, needed):
+        capacity = 0 if self.embeddings is None else self.embeddings.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.embeddings = _open_grown(self._path(EMBEDDINGS_FILE), self.embeddings, self.count,
+                                      (new_capacity, self.dim), np.float16)
+        self.last_used = _open_grown(self._path(LAST_USED_FILE), self.last_used, self.count,
+                                     (new_capacity,), np.uint32)
+
+    def get_or_encode(self, texts, encode, batch_size=64):
+        """
+        L2-normalized float32 embeddings for `texts`, in order. Only texts
+        missing from the cache are passed to `encode` (a list -> normalized
+        array function), deduplicated and in batches of `batch_size`.
+        """
+        keys = [text_key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in self.rows or key in missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.setdefault(key, text)
+
+        if missing:
+            missing_keys = list(missing)
+            missing_texts = list(missing.values())
+            for start in range(0, len(missing_texts), batch_size):
+                vectors = np.asarray(encode(missing_texts[start:start + batch_size]), dtype=np.float32)
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                self._ensure_capacity(self.count + len(vectors))
+                self.embeddings[self.count:self.count + len(vectors)] = vectors
+                for key in missing_keys[start:start + len(vectors)]:
+                    self.rows[key] = self.count
+                    self._new_keys.append(key)
+                    self.count += 1
+
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+
+        rows = np.fromiter((self.rows[key] for key in keys), dtype=np.int64, count=len(keys))
+        self.last_used[rows] = self.run
+        embeddings = np.asarray(self.embeddings[rows], dtype=np.float32)
+        # Re-normalize away the float16 rounding
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def save(self):
+        """Flush the matrix, append new keys to the index, then record the row count"""
+        if self.embeddings is None:
+            return
+        self.embeddings.flush()
+        self.last_used.flush()
+        with open(self._path(KEYS_FILE), 'r+b' if os.path.exists(self._path(KEYS_FILE)) else 'wb') as f:
+            f.seek(self._saved_keys * KEY_BYTES)
+            f.write(b''.join(self._new_keys))
+            f.truncate()
+        self._saved_keys = self.count
+        self._new_keys = []
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp_path = self._path(META_FILE) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'count': self.count, 'run': self.run}, f)
+        os.replace(tmp_path, self._path(META_FILE))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        size = sum(os.path.getsize(self._path(name)) for name in (EMBEDDINGS_FILE, LAST_USED_FILE, KEYS_FILE)
+                   if os.path.exists(self._path(name)))
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': self.count,
+            'size_bytes': size,
+            'run': self.run,
+        }
+
+    def compact(self, max_entries=None, max_idle_runs=None):
+        """
+        Drop rows not used in the last `max_idle_runs` runs and keep at most
+        the `max_entries` most recently used; rewrites the files at their
+        compacted size. Returns the number of rows removed.
+        """
+        self.save()
+        if not self.count:
+            return 0
+
+        last_used = np.asarray(self.last_used[:self.count])
+        keep = np.arange(self.count)
+        if max_idle_runs is not None:
+            keep = keep[self.run - last_used[keep] <= max_idle_runs]
+        if max_entries is not None and len(keep) > max_entries:
+            # Stable sort keeps the older rows first among equally recent ones
+            recent = np.argsort(-last_used[keep].astype(np.int64), kind='stable')[:max_entries]
+            keep = np.sort(keep[recent])
+
+        removed = self.count - len(keep)
+        if not removed:
+            return 0
+
+        keys = [None] * self.count
+        for key, row in self.rows.items():
+            keys[row] = key
+        kept_keys = [keys[row] for row in keep]
+        embeddings = np.asarray(self.embeddings[keep])
+        kept_last_used = last_used[keep]
+
+        self.embeddings = self.last_used = None
+        capacity = max(len(keep), 1)
+        for name, data, shape, dtype in ((EMBEDDINGS_FILE, embeddings, (capacity, self.dim), np.float16),
+                                         (LAST_USED_FILE, kept_last_used, (capacity,), np.uint32)):
+            tmp_path = self._path(name) + '.tmp'
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+            out[:len(keep)] = data
+            out.flush()
+            del out
+            os.replace(tmp_path, self._path(name))
+
+        tmp_path = self._path(KEYS_FILE) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(kept_keys))
+        os.replace(tmp_path, self._path(KEYS_FILE))
+
+        self.count = len(keep)
+        self.rows = {key: row for row, key in enumerate(kept_keys)}
+        self._saved_keys = self.count
+        self._write_meta()
+        self.embeddings = np.load(self._path(EMBEDDINGS_FILE), mmap_mode='r+')
+        self.last_used = np.load(self._path(LAST_USED_FILE), mmap_mode='r+')
+        return removed
+
+
+def cache_dirs(root=EMBEDDING_CACHE_DIR):
+    """Per-model cache directories under `root`"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, name) for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, META_FILE)))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or prune the question embedding cache")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--cache-dir", default=EMBEDDING_CACHE_DIR)
+    parser.add_argument("--max-entries", type=int, help="Keep at most this many most recently used rows per model")
+    parser.add_argument("--max-idle-runs", type=int, help="Drop rows unused for more than this many runs")
+    args = parser.parse_args()
+
+    for directory in cache_dirs(args.cache_dir):
+        cache = EmbeddingCache(directory, new_run=False)
+        if args.command == "compact":
+            removed = cache.compact(max_entries=args.max_entries, max_idle_runs=args.max_idle_runs)
+            print(f"[✓] {os.path.basename(directory)}: removed {removed} rows")
+        print(f"{os.path.basename(directory)}: {cache.stats()}")
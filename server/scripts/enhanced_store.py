@@ -0,0 +1,101 @@
+"""
+Append-friendly store for enriched GFG records.
+
+Records are kept in SQLite under a stable content key (a hash of the
+normalized title and content), so "already processed?" is an indexed lookup
+and new records are appended without rewriting the corpus. The frontend's
+JSON array format is produced on demand with export_json.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+ENHANCED_STORE_PATH = os.path.join(DATA_DIR, 'enhanced_store.sqlite')
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+def content_key(entry):
+    """Stable key for a raw or enriched entry, independent of formatting whitespace"""
+    digest = hashlib.sha256()
+    digest.update(_normalize(entry.get("title")).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_normalize(entry.get("content")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EnhancedStore:
+    def __init__(self, path=ENHANCED_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " key TEXT NOT NULL UNIQUE,"
+            " title TEXT,"
+            " record TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def __contains__(self, key):
+        return self.conn.execute("SELECT 1 FROM records WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def append(self, records):
+        """Append records not stored yet; returns how many were added"""
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO records (key, title, record) VALUES (?, ?, ?)",
+            [(content_key(r), r.get("title"), json.dumps(r, ensure_ascii=False)) for r in records]
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def iter_records(self):
+        """Yield stored records in insertion order"""
+        for (record,) in self.conn.execute("SELECT record FROM records ORDER BY seq"):
+            yield json.loads(record)
+
+    def import_json(self, path):
+        """Seed the store from an existing enhanced JSON/JSONL file"""
+        from stream_io import iter_json_records
+
+        added = 0
+        batch = []
+        for record in iter_json_records(path):
+            batch.append(record)
+            if len(batch) >= 500:
+                added += self.append(batch)
+                batch = []
+        return added + self.append(batch)
+
+    def export_json(self, path):
+        """Write all records as the indented JSON array the frontend reads, one record at a time"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            count = 0
+            for record in self.iter_records():
+                body = json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+                f.write(("," if count else "") + "\n  " + body)
+                count += 1
+            f.write("\n]" if count else "]")
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self):
+        self.conn.close()
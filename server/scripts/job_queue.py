@@ -0,0 +1,405 @@
+"""
+Durable file-spool job queue for experience processing.
+
+Submitters (the Node server, or `enqueue` below) write each job atomically
+into the spool; one consumer with a fixed number of warm worker processes
+drains it, so a burst of submissions queues up instead of starting a burst of
+heavy processes. Layout of the spool directory:
+
+    jobs/<id>.json      pending job, written to a .tmp file and renamed
+    jobs/<id>.lock      claim by a worker (created with O_EXCL); stale once
+                        its pid is gone or it outlives --lock-timeout. A
+                        submitter withdraws a job by taking its lock too
+    jobs/<id>.abandoned submitter gave up on a job a worker already held; its
+                        result is dropped instead of published, and a failed
+                        attempt is not retried
+    results/<id>.json   outcome for the submitter, which watches this folder
+    dead/<id>.json      job that failed --max-attempts times, with its errors
+    work/               per-job input/output files for process_experience_file
+
+A failed job is retried with exponential backoff. A worker that crashes
+mid-job leaves a stale lock, and the job is picked up again, so every job is
+processed at least once.
+
+Usage:
+    python job_queue.py consume --concurrency 2
+    python job_queue.py enqueue --input experiences.json
+    python job_queue.py stats
+    python job_queue.py requeue --all
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+QUEUE_DIR = os.environ.get('NLP_QUEUE_DIR') or os.path.join(DATA_DIR, 'nlp_queue')
+
+MAX_ATTEMPTS = 3
+BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 300.0
+LOCK_TIMEOUT_SECONDS = 600.0
+POLL_INTERVAL_SECONDS = 0.5
+RESULT_TTL_SECONDS = 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+
+def new_job_id():
+    # Time-ordered, so sorting the spool gives FIFO order; the uuid keeps ids unique
+    return f"{int(time.time() * 1000)}_{uuid.uuid4().hex[:12]}"
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    def __init__(self, spool_dir=QUEUE_DIR, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_SECONDS,
+                 lock_timeout=LOCK_TIMEOUT_SECONDS):
+        self.spool_dir = spool_dir
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lock_timeout = lock_timeout
+        self.jobs_dir = os.path.join(spool_dir, 'jobs')
+        self.results_dir = os.path.join(spool_dir, 'results')
+        self.dead_dir = os.path.join(spool_dir, 'dead')
+        self.work_dir = os.path.join(spool_dir, 'work')
+        for directory in (self.jobs_dir, self.results_dir, self.dead_dir, self.work_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_dir, job_id + '.json')
+
+    def _lock_path(self, job_id):
+        return os.path.join(self.jobs_dir, job_id + '.lock')
+
+    def enqueue(self, experience, job_id=None):
+        job_id = job_id or new_job_id()
+        _write_json_atomic(self._job_path(job_id), {'id': job_id, 'experience': experience, 'attempts': 0})
+        return job_id
+
+    def pending(self):
+        """Ids of queued jobs, oldest first"""
+        return sorted(name[:-5] for name in os.listdir(self.jobs_dir) if name.endswith('.json'))
+
+    def _stale_owner(self, lock_path):
+        """Pid recorded in `lock_path` if the lock is stale, else None"""
+        try:
+            with open(lock_path, 'r', encoding='utf-8') as f:
+                owner = f.read().strip()
+            age = time.time() - os.path.getmtime(lock_path)
+            pid = int(owner)
+        except (OSError, ValueError):
+            return None
+        return owner if not _pid_alive(pid) or age > self.lock_timeout else None
+
+    def _break_stale_lock(self, lock_path):
+        """Remove a stale lock; False if the lock is live (or was retaken meanwhile)"""
+        owner = self._stale_owner(lock_path)
+        if owner is None:
+            return False
+        # Rename first, so of several consumers breaking the same lock only one succeeds
+        grabbed = f"{lock_path}.{os.getpid()}"
+        try:
+            os.rename(lock_path, grabbed)
+        except FileNotFoundError:
+            return True
+        with open(grabbed, 'r', encoding='utf-8') as f:
+            if f.read().strip() != owner:
+                # Another consumer broke and retook the lock in between; give it back
+                os.rename(grabbed, lock_path)
+                return False
+        os.remove(grabbed)
+        return True
+
+    def claim(self, job_id):
+        """The job, locked for this process, or None if it is taken, gone or not due yet"""
+        lock_path = self._lock_path(job_id)
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._break_stale_lock(lock_path):
+                    return None
+                logger.warning(f"Reclaiming job {job_id} from a stale lock")
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            break
+        else:
+            return None
+
+        try:
+            with open(self._job_path(job_id), 'r', encoding='utf-8') as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            # Finished or cancelled between listing and locking
+            self.release(job_id)
+            return None
+        if self._drop_abandoned(job_id):
+            return None
+        if job.get('next_attempt_at', 0) > time.time():
+            self.release(job_id)
+            return None
+        return job
+
+    def release(self, job_id):
+        """Remove this process's lock; one broken as stale and retaken by another process is left alone"""
+        lock_path = self._lock_path(job_id)
+        try:
+            with open(lock_path, 'r', encoding='utf-8') as f:
+                owner = f.read().strip()
+        except FileNotFoundError:
+            return
+        if owner == str(os.getpid()):
+            _remove_if_exists(lock_path)
+
+    def _abandoned_path(self, job_id):
+        return os.path.join(self.jobs_dir, job_id + '.abandoned')
+
+    def _drop_abandoned(self, job_id):
+        """Drop a locked job the submitter gave up on; False if it was not abandoned"""
+        try:
+            os.remove(self._abandoned_path(job_id))
+        except FileNotFoundError:
+            return False
+        logger.info(f"Dropping job {job_id}, its submitter gave up on it")
+        _remove_if_exists(self._job_path(job_id))
+        self.release(job_id)
+        return True
+
+    def _finish(self, job_id, outcome):
+        """Publish the outcome unless the submitter gave up, then drop the job and its lock"""
+        try:
+            os.remove(self._abandoned_path(job_id))
+        except FileNotFoundError:
+            _write_json_atomic(os.path.join(self.results_dir, job_id + '.json'), {'id': job_id, **outcome})
+        _remove_if_exists(self._job_path(job_id))
+        self.release(job_id)
+
+    def complete(self, job, result):
+        self._finish(job['id'], {'ok': True, 'result': result, 'attempts': job['attempts'] + 1})
+
+    def fail(self, job, error):
+        """Schedule a retry with exponential backoff, or dead-letter the job after max_attempts"""
+        if self._drop_abandoned(job['id']):
+            return
+        job['attempts'] += 1
+        job.setdefault('errors', []).append({'at': time.time(), 'error': error})
+        if job['attempts'] >= self.max_attempts:
+            dead_path = os.path.join(self.dead_dir, job['id'] + '.json')
+            _write_json_atomic(dead_path, job)
+            logger.error(f"Job {job['id']} failed {job['attempts']} times, moved to {dead_path}")
+            self._finish(job['id'], {'ok': False, 'error': error, 'attempts': job['attempts'],
+                                     'dead_letter': dead_path})
+            return
+
+        if not os.path.exists(self._job_path(job['id'])):
+            # Withdrawn meanwhile; rewriting the job file would bring it back
+            self.release(job['id'])
+            return
+        delay = min(self.backoff * 2 ** (job['attempts'] - 1), MAX_BACKOFF_SECONDS)
+        job['next_attempt_at'] = time.time() + delay
+        _write_json_atomic(self._job_path(job['id']), job)
+        logger.warning(f"Job {job['id']} failed (attempt {job['attempts']}), retrying in {delay:.1f}s: {error}")
+        self.release(job['id'])
+
+    def requeue_dead(self, job_id):
+        """Move a dead-lettered job back into the queue with a fresh attempt count"""
+        dead_path = os.path.join(self.dead_dir, job_id + '.json')
+        with open(dead_path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+        job.update(attempts=0, next_attempt_at=0)
+        _write_json_atomic(self._job_path(job_id), job)
+        os.remove(dead_path)
+
+    def withdraw(self, job_id):
+        """
+        Cancel a job: True if it was removed before any worker claimed it. A
+        job already claimed is marked abandoned instead, so its result is not
+        published, and False is returned.
+        """
+        lock_path = self._lock_path(job_id)
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            open(self._abandoned_path(job_id), 'w').close()
+            return False
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        try:
+            os.remove(self._job_path(job_id))
+            withdrawn = True
+        except FileNotFoundError:
+            withdrawn = False
+        self.release(job_id)
+        return withdrawn
+
+    def cleanup(self, result_ttl=RESULT_TTL_SECONDS):
+        """Drop abandoned or expired results and work files of jobs that no longer exist"""
+        now = time.time()
+        pending = set(self.pending())
+        abandoned = {name[:-len('.abandoned')] for name in os.listdir(self.jobs_dir) if name.endswith('.abandoned')}
+        for name in os.listdir(self.results_dir):
+            path = os.path.join(self.results_dir, name)
+            if name[:-5] in abandoned or now - os.path.getmtime(path) > result_ttl:
+                _remove_if_exists(path)
+        for job_id in abandoned - pending:
+            _remove_if_exists(self._abandoned_path(job_id))
+        for name in os.listdir(self.work_dir):
+            if name.split('.', 1)[0] not in pending:
+                _remove_if_exists(os.path.join(self.work_dir, name))
+
+    def stats(self):
+        def count(directory, suffix):
+            return sum(1 for name in os.listdir(directory) if name.endswith(suffix))
+        return {
+            'pending': count(self.jobs_dir, '.json'),
+            'claimed': count(self.jobs_dir, '.lock'),
+            'results': count(self.results_dir, '.json'),
+            'dead': count(self.dead_dir, '.json'),
+        }
+
+
+def run_job(queue, job, processor):
+    """Process one job through process_experience_file with a warm processor"""
+    from process_experience_nlp import process_experience_file
+
+    input_path = os.path.join(queue.work_dir, job['id'] + '.input.json')
+    output_path = os.path.join(queue.work_dir, job['id'] + '.output.json')
+    _write_json_atomic(input_path, [job['experience']])
+    try:
+        processed = process_experience_file(input_path, output_path, processor=processor)
+    finally:
+        for path in (input_path, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+    if not processed:
+        raise RuntimeError("NLP processing returned no result")
+    return processed[0]
+
+
+def consume_loop(spool_dir=QUEUE_DIR, once=False, **queue_options):
+    """Claim and process jobs until stopped; with `once`, return when the queue is drained"""
+    from process_experience_nlp import build_processor
+
+    queue = JobQueue(spool_dir, **queue_options)
+    processor = build_processor(os.environ.get('NLP_RESULT_CACHE'))
+    logger.info(f"Queue consumer {os.getpid()} ready on {spool_dir}")
+    last_cleanup = 0
+    while True:
+        worked = False
+        waiting = False
+        for job_id in queue.pending():
+            job = queue.claim(job_id)
+            if job is None:
+                waiting = True
+                continue
+            worked = True
+            try:
+                result = run_job(queue, job, processor)
+            except Exception as e:
+                queue.fail(job, f"{type(e).__name__}: {e}")
+            else:
+                queue.complete(job, result)
+                logger.info(f"Job {job_id} done")
+
+        if once and not worked and not waiting:
+            return
+        if time.time() - last_cleanup > 60:
+            queue.cleanup()
+            last_cleanup = time.time()
+        if not worked:
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def consume(spool_dir=QUEUE_DIR, concurrency=1, once=False, **queue_options):
+    """
+    Run `concurrency` consumer processes, each with its own warm processor;
+    lock files keep them (and any other consumer on the spool) from taking
+    the same job.
+    """
+    if concurrency <= 1:
+        consume_loop(spool_dir, once=once, **queue_options)
+        return
+
+    workers = [multiprocessing.Process(target=consume_loop, args=(spool_dir, once), kwargs=queue_options)
+               for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Jobs a terminated worker held are reclaimed through their stale locks
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Durable spool queue for experience processing")
+    parser.add_argument("command", choices=["consume", "enqueue", "stats", "requeue"])
+    parser.add_argument("job_ids", nargs="*", help="Dead-lettered job ids for 'requeue'")
+    parser.add_argument("--spool", default=QUEUE_DIR, help="Spool directory (default: $NLP_QUEUE_DIR or data/nlp_queue)")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get('NLP_QUEUE_CONCURRENCY', 1)),
+                        help="Worker processes, each holding one set of loaded models")
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is drained")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--backoff", type=float, default=BACKOFF_SECONDS,
+                        help="Seconds before the first retry, doubling with each further attempt")
+    parser.add_argument("--lock-timeout", type=float, default=LOCK_TIMEOUT_SECONDS,
+                        help="Seconds after which a claim is considered abandoned even if its process lives")
+    parser.add_argument("--input", help="JSON/JSONL experiences to queue with 'enqueue'")
+    parser.add_argument("--all", action="store_true", help="With 'requeue', requeue every dead-lettered job")
+    args = parser.parse_args()
+
+    queue_options = {'max_attempts': args.max_attempts, 'backoff': args.backoff, 'lock_timeout': args.lock_timeout}
+    if args.command == "consume":
+        consume(args.spool, args.concurrency, once=args.once, **queue_options)
+    else:
+        queue = JobQueue(args.spool, **queue_options)
+        if args.command == "enqueue":
+            from stream_io import iter_json_records
+
+            job_ids = [queue.enqueue(experience) for experience in iter_json_records(args.input)]
+            print(f"[✓] Queued {len(job_ids)} jobs")
+        elif args.command == "requeue":
+            job_ids = sorted(name[:-5] for name in os.listdir(queue.dead_dir)
+                             if name.endswith('.json')) if args.all else args.job_ids
+            for job_id in job_ids:
+                queue.requeue_dead(job_id)
+            print(f"[✓] Requeued {len(job_ids)} jobs")
+        print(json.dumps(queue.stats(), indent=2))
@@ -0,0 +1,51 @@
+"""
+Lazily loaded models.
+
+Loaders are registered by name and only run the first time a model is asked
+for, so importing a pipeline module stays cheap and a run only pays for the
+models its stages actually use.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        # Re-entrant: a loader may get() the models it builds on
+        self._lock = threading.RLock()
+        self.load_times = {}
+
+    def register(self, name, loader):
+        """Register a zero-argument `loader` returning the model for `name`"""
+        self._loaders[name] = loader
+
+    def get(self, name):
+        """The model for `name`, loading it on first use"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                start = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self.load_times[name] = round(time.perf_counter() - start, 3)
+                logger.info(f"Loaded model '{name}' in {self.load_times[name]}s")
+            return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def names(self):
+        return list(self._loaders)
+
+    def load_all(self):
+        """Eagerly load every registered model (e.g. to warm a long-lived service)"""
+        for name in self._loaders:
+            self.get(name)
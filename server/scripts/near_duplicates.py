@@ -0,0 +1,242 @@
+"""
+MinHash/LSH index for spotting near-duplicate submissions before NLP runs.
+
+Texts are reduced to word shingles, and each shingle set to a MinHash
+signature whose agreement rate estimates the Jaccard similarity of two texts.
+Signatures are split into bands; texts sharing any band bucket are
+candidates, and a candidate whose estimated similarity reaches the threshold
+is a near-duplicate. Signatures and buckets live in SQLite (indexed by
+bucket), so a lookup is a handful of indexed reads however large the corpus
+gets. Links from a duplicate to the record it repeats are kept as well.
+
+Usage:
+    python near_duplicates.py seed --input ../../public/processed_experiences.json
+    python near_duplicates.py stats
+    python near_duplicates.py query --text "..."
+"""
+
+import math
+import os
+import re
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+NEAR_DUPLICATE_INDEX_PATH = os.path.join(DATA_DIR, 'near_duplicates.sqlite')
+
+DEFAULT_THRESHOLD = 0.8
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: texts at Jaccard 0.5 already share a bucket with ~87% probability
+BANDS = 32
+SEED = 7
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """CRC32 hashes of the overlapping `size`-word shingles of the lowercased text"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=SEED):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) >> 32 with odd 64-bit a, wrapping on overflow
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.band_mix = rng.integers(1, 2 ** 63, self.rows + 1, dtype=np.uint64) | np.uint64(1)
+
+    def signature(self, text):
+        """uint32 MinHash signature of `text`, or None when it has no words"""
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        if not len(hashes):
+            return None
+        return ((hashes[:, None] * self.a + self.b) >> np.uint64(32)).min(axis=0).astype(np.uint32)
+
+    def buckets(self, signature):
+        """One signed 64-bit bucket key per band (the band number is mixed in)"""
+        rows = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        rows = np.hstack([np.arange(self.bands, dtype=np.uint64)[:, None], rows])
+        return (rows * self.band_mix).sum(axis=1).view(np.int64).tolist()
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def min_shared_bands(threshold, bands=BANDS, rows=NUM_PERM // BANDS, recall=0.99):
+    """
+    Most bands a pair at Jaccard `threshold` still shares with probability
+    `recall`; candidates sharing fewer are not worth verifying.
+    """
+    p = threshold ** rows
+    at_least = 1.0
+    for k in range(bands + 1):
+        # at_least = P(shared bands >= k)
+        if at_least < recall:
+            return max(1, k - 1)
+        at_least -= math.comb(bands, k) * p ** k * (1 - p) ** (bands - k)
+    return bands
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=NEAR_DUPLICATE_INDEX_PATH, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM,
+                 bands=BANDS):
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, bands)
+        self.min_bands = min_shared_bands(threshold, bands, num_perm // bands)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = None
+        self._pid = None
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS signatures (record_id TEXT PRIMARY KEY, signature BLOB NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER NOT NULL, record_id TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets (bucket);"
+            "CREATE INDEX IF NOT EXISTS buckets_record ON buckets (record_id);"
+            "CREATE TABLE IF NOT EXISTS links ("
+            " record_id TEXT PRIMARY KEY, duplicate_of TEXT NOT NULL, similarity REAL NOT NULL,"
+            " linked_at REAL NOT NULL);"
+        )
+        # Signatures from different hash parameters are not comparable
+        params = f"{num_perm}/{bands}/{SEED}/{SHINGLE_WORDS}"
+        self.conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('params', ?)", (params,))
+        stored = self.conn.execute("SELECT value FROM meta WHERE name = 'params'").fetchone()[0]
+        self.conn.commit()
+        if stored != params:
+            raise ValueError(f"{path} was built with MinHash parameters {stored}, not {params}")
+
+    @property
+    def conn(self):
+        # SQLite connections must not cross fork(); reopen in child processes
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._pid = os.getpid()
+        return self._conn
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def find(self, signature, exclude=None):
+        """(record_id, similarity) of the most similar indexed record at or above the threshold, else None"""
+        buckets = self.hasher.buckets(signature)
+        candidates = self.conn.execute(
+            "SELECT record_id, signature FROM signatures JOIN ("
+            f" SELECT record_id FROM buckets WHERE bucket IN ({','.join('?' * len(buckets))})"
+            " GROUP BY record_id HAVING COUNT(*) >= ?) USING (record_id)",
+            buckets + [self.min_bands]
+        ).fetchall()
+        candidates = [(record_id, blob) for record_id, blob in candidates if record_id != exclude]
+        if not candidates:
+            return None
+
+        signatures = np.frombuffer(b"".join(blob for _, blob in candidates), dtype=np.uint32)
+        scores = (signatures.reshape(len(candidates), -1) == signature).mean(axis=1)
+        best = int(scores.argmax())
+        return (candidates[best][0], float(scores[best])) if scores[best] >= self.threshold else None
+
+    def query(self, text, exclude=None):
+        """Near-duplicate of `text` as (record_id, similarity), or None; `exclude` is the text's own id"""
+        signature = self.hasher.signature(text)
+        return self.find(signature, exclude) if signature is not None else None
+
+    def add(self, record_id, text, commit=True):
+        """Index `text` under `record_id` (replacing an earlier text with that id); False if it has no words"""
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return False
+        self.conn.execute("DELETE FROM buckets WHERE record_id = ?", (record_id,))
+        self.conn.execute("INSERT OR REPLACE INTO signatures (record_id, signature) VALUES (?, ?)",
+                          (record_id, signature.tobytes()))
+        self.conn.executemany("INSERT INTO buckets (bucket, record_id) VALUES (?, ?)",
+                              [(bucket, record_id) for bucket in self.hasher.buckets(signature)])
+        if commit:
+            self.conn.commit()
+        return True
+
+    def remove(self, record_id, commit=True):
+        self.conn.execute("DELETE FROM buckets WHERE record_id = ?", (record_id,))
+        self.conn.execute("DELETE FROM signatures WHERE record_id = ?", (record_id,))
+        if commit:
+            self.conn.commit()
+
+    def link(self, record_id, duplicate_of, score, commit=True):
+        """Record that `record_id` was linked to `duplicate_of` instead of being processed"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO links (record_id, duplicate_of, similarity, linked_at) VALUES (?, ?, ?, ?)",
+            (record_id, duplicate_of, score, time.time())
+        )
+        if commit:
+            self.conn.commit()
+
+    def duplicates_of(self, record_id):
+        """(record_id, similarity) of the submissions linked to `record_id`"""
+        return self.conn.execute("SELECT record_id, similarity FROM links WHERE duplicate_of = ? ORDER BY linked_at",
+                                 (record_id,)).fetchall()
+
+    def commit(self):
+        self.conn.commit()
+
+    def stats(self):
+        return {
+            'records': len(self),
+            'links': self.conn.execute("SELECT COUNT(*) FROM links").fetchone()[0],
+            'threshold': self.threshold,
+            'size_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Build, inspect or query the near-duplicate index")
+    parser.add_argument("command", choices=["seed", "stats", "query"])
+    parser.add_argument("--index", default=os.environ.get('NLP_NEAR_DUPLICATE_INDEX') or NEAR_DUPLICATE_INDEX_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--input", help="JSON/JSONL records to index with 'seed'")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="original_experience",
+                        help="Field holding the text ('content' for GFG records)")
+    parser.add_argument("--text", help="Text to look up with 'query'")
+    args = parser.parse_args()
+
+    index = NearDuplicateIndex(args.index, threshold=args.threshold)
+    if args.command == "seed":
+        from stream_io import iter_json_records
+
+        added = 0
+        for record in iter_json_records(args.input):
+            if record.get(args.id_field) and index.add(str(record[args.id_field]), record.get(args.text_field) or "",
+                                                       commit=False):
+                added += 1
+        index.commit()
+        print(f"[✓] Indexed {added} records from '{args.input}'")
+    elif args.command == "query":
+        start = time.perf_counter()
+        match = index.query(args.text or "")
+        print(json.dumps({'match': match, 'ms': round((time.perf_counter() - start) * 1000, 3)}))
+    print(json.dumps(index.stats(), indent=2))
+    index.close()
@@ -0,0 +1,118 @@
+"""
+Lightweight instrumentation for the NLP pipelines.
+
+RecordStats times the stages of one record and counts which fallbacks ran.
+RunMetrics aggregates those blocks into per-stage latency histograms for a
+whole run; the totals of worker processes are merged into the run's.
+"""
+
+import cProfile
+import pstats
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class RecordStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def flag(self, name):
+        """Mark a per-record condition; counts once however often it is hit"""
+        self.counters[name] = 1
+
+    def to_dict(self):
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'stages_ms': {name: round(ms, 3) for name, ms in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+
+class RunMetrics:
+    def __init__(self):
+        self.records = 0
+        self.stages = {}
+        self.counters = Counter()
+
+    def _observe(self, name, ms):
+        stage = self.stages.setdefault(name, {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'histogram': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        })
+        stage['count'] += 1
+        stage['total_ms'] += ms
+        stage['max_ms'] = max(stage['max_ms'], ms)
+        bucket = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if ms <= bound), len(HISTOGRAM_BUCKETS_MS))
+        stage['histogram'][bucket] += 1
+
+    def add(self, stats):
+        """Fold one RecordStats.to_dict() block into the run totals"""
+        if not stats:
+            return
+        self.records += 1
+        self._observe('total', stats.get('total_ms', 0.0))
+        for name, ms in stats.get('stages_ms', {}).items():
+            self._observe(name, ms)
+        self.counters.update(stats.get('counters', {}))
+
+    def merge(self, other):
+        """Fold the totals of another RunMetrics (e.g. from a pool worker) into these"""
+        self.records += other.records
+        for name, theirs in other.stages.items():
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = {**theirs, 'histogram': list(theirs['histogram'])}
+                continue
+            stage['count'] += theirs['count']
+            stage['total_ms'] += theirs['total_ms']
+            stage['max_ms'] = max(stage['max_ms'], theirs['max_ms'])
+            stage['histogram'] = [a + b for a, b in zip(stage['histogram'], theirs['histogram'])]
+        self.counters.update(other.counters)
+
+    def summary(self):
+        return {
+            'records': self.records,
+            'histogram_buckets_ms': list(HISTOGRAM_BUCKETS_MS),
+            'stages': {
+                name: {**stage, 'total_ms': round(stage['total_ms'], 3), 'max_ms': round(stage['max_ms'], 3),
+                       'mean_ms': round(stage['total_ms'] / stage['count'], 3)}
+                for name, stage in self.stages.items()
+            },
+            'counters': dict(self.counters)
+        }
+
+
+class Profiler:
+    """Optional cProfile hook accumulating across calls"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    @contextmanager
+    def running(self):
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+
+    def dump(self, path):
+        pstats.Stats(self.profile).dump_stats(path)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Local asyncio HTTP service for the NLP pipelines with dynamic micro-batching.
+
+Concurrent submissions are queued per pipeline and collected into batches of
+at most --max-batch-size, waiting no longer than --max-wait-ms for stragglers,
+so spaCy's nlp.pipe and the transformer models run over the whole batch at
+once. Every request carries a latency deadline (its SLO); a batch is closed
+early when waiting longer would miss the earliest deadline, and requests
+whose deadline has already passed are rejected instead of processed. The
+queues are bounded: when full, new requests get 503 with Retry-After.
+
+Endpoints (JSON in and out):
+    POST /process/experience  {"experience": {...}, "deadline_ms": 2000}
+    POST /process/gfg         {"entry": {"title": ..., "content": ...}}
+    POST /commit/experience   {"records": [{...}]}   (experiences the server has stored)
+    GET  /search?corpus=gfg&q=dynamic+programming&k=10
+    GET  /health
+
+Usage:
+    python nlp_service.py --port 8765 --max-batch-size 16 --max-wait-ms 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from search_index import CORPORA, META_FILE, SEARCH_INDEX_DIR, SearchIndex
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 2 * 1024 * 1024
+LATENCY_WINDOW = 1000
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+               500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class Overloaded(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class MicroBatcher:
+    """
+    Collects submitted items into batches for `process_batch`, which takes a
+    list of items and returns a list of results (None marks a failed item).
+    Batches run one at a time on a dedicated thread, so the event loop keeps
+    accepting requests while a batch is being processed.
+    """
+
+    def __init__(self, name, process_batch, max_batch_size=16, max_wait_ms=10, queue_size=256, slo_ms=2000):
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.slo = slo_ms / 1000
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"nlp-{name}")
+        self.task = None
+
+        # Running estimate of processing time per item, used to close batches before deadlines
+        self.item_cost = 0.05
+        self.batches = 0
+        self.processed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.slo_misses = 0
+        self.latencies = []
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item, deadline_ms=None):
+        loop = asyncio.get_running_loop()
+        submitted = loop.time()
+        deadline = submitted + (deadline_ms / 1000 if deadline_ms else self.slo)
+        future = loop.create_future()
+        try:
+            self.queue.put_nowait((item, deadline, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded(f"{self.name} queue is full ({self.queue.maxsize} pending)")
+
+        try:
+            return await future
+        finally:
+            latency = loop.time() - submitted
+            self.latencies.append(latency)
+            del self.latencies[:-LATENCY_WINDOW]
+            if latency > deadline - submitted:
+                self.slo_misses += 1
+
+    async def _collect(self):
+        """Wait for one item, then gather more until the batch is full, max_wait passes or a deadline nears"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        close_at = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            earliest = min(deadline for _, deadline, _ in batch)
+            remaining = min(close_at, earliest - self.item_cost * (len(batch) + 1)) - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            live = []
+            for item, deadline, future in batch:
+                if future.cancelled():
+                    continue
+                if loop.time() >= deadline:
+                    # Shed work that can no longer meet its SLO
+                    self.expired += 1
+                    future.set_exception(DeadlineExceeded("deadline passed before processing started"))
+                else:
+                    live.append((item, future))
+            if not live:
+                continue
+
+            start = loop.time()
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, [item for item, _ in live])
+                error = None
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(live)} failed: {e}")
+                results, error = [None] * len(live), f"{type(e).__name__}: {e}"
+
+            elapsed = loop.time() - start
+            self.item_cost = 0.8 * self.item_cost + 0.2 * (elapsed / len(live))
+            self.batches += 1
+            self.processed += len(live)
+
+            for (_, future), result in zip(live, results):
+                if future.done():
+                    continue
+                if result is None:
+                    future.set_exception(RuntimeError(error or "NLP processing returned no result"))
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'batches': self.batches,
+            'processed': self.processed,
+            'mean_batch_size': round(self.processed / self.batches, 2) if self.batches else 0,
+            'item_cost_ms': round(self.item_cost * 1000, 2),
+            'rejected': self.rejected,
+            'expired': self.expired,
+            'slo_ms': round(self.slo * 1000),
+            'slo_misses': self.slo_misses,
+            'latency_p50_ms': percentile(0.5),
+            'latency_p95_ms': percentile(0.95),
+        }
+
+
+def experience_batch_processor(cache_path=None):
+    from process_experience_nlp import build_processor
+
+    processor = build_processor(cache_path)
+    return processor.process_experiences
+
+
+def gfg_batch_processor():
+    import process_gfg_nlp as gfg
+
+    def process_batch(entries):
+        try:
+            metadata = gfg.extract_metadata_batch(entries)
+        except Exception as e:
+            # One bad entry should not fail the whole batch
+            logger.warning(f"GFG batch failed, retrying entries one by one: {e}")
+            metadata = []
+            for entry in entries:
+                try:
+                    metadata.append(gfg.extract_metadata_batch([entry])[0])
+                except Exception:
+                    metadata.append(None)
+        return [{**entry, **meta} if meta is not None else None for entry, meta in zip(entries, metadata)]
+
+    return process_batch
+
+
+class NLPService:
+    def __init__(self, batchers, search_index_dir=None):
+        self.batchers = batchers
+        self.search_index_dir = search_index_dir
+        self.search_indexes = {}
+        self.started_at = time.time()
+
+    def search_index(self, corpus):
+        """The corpus' search index, reloaded when a pipeline run has updated it"""
+        index_dir = os.path.join(self.search_index_dir or SEARCH_INDEX_DIR, corpus)
+        meta_path = os.path.join(index_dir, META_FILE)
+        mtime = os.path.getmtime(meta_path) if os.path.exists(meta_path) else None
+        cached = self.search_indexes.get(corpus)
+        if cached is None or cached[0] != mtime:
+            cached = self.search_indexes[corpus] = (mtime, SearchIndex.for_corpus(corpus, index_dir))
+        return cached[1]
+
+    def search(self, query):
+        params = parse_qs(query)
+        corpus = params.get('corpus', ['gfg'])[0]
+        text = params.get('q', [''])[0]
+        if corpus not in CORPORA or not text.strip():
+            return 400, {'ok': False, 'error': f"Expected q and corpus ({', '.join(CORPORA)})"}, {}
+        try:
+            k = min(int(params.get('k', ['10'])[0]), 100)
+        except ValueError:
+            return 400, {'ok': False, 'error': 'k must be an integer'}, {}
+        results = self.search_index(corpus).search(text, k=k)
+        return 200, {'ok': True, 'results': [{'id': record_id, 'score': score} for record_id, score in results]}, {}
+
+    async def commit(self, body):
+        from process_experience_nlp import commit_experiences
+
+        try:
+            records = json.loads(body or b'{}')['records']
+            if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                raise ValueError('records must be a list of JSON objects')
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'ok': False, 'error': f"Invalid request: {e}"}, {}
+        try:
+            index_dir = os.path.join(self.search_index_dir, 'experiences') if self.search_index_dir else None
+            committed = await asyncio.get_running_loop().run_in_executor(None, commit_experiences, records, None,
+                                                                         index_dir)
+        except Exception as e:
+            return 500, {'ok': False, 'error': str(e)}, {}
+        return 200, {'ok': True, 'committed': committed}, {}
+
+    def status(self):
+        return {
+            'status': 'ready',
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 3),
+            'pipelines': {name: batcher.stats() for name, batcher in self.batchers.items()},
+        }
+
+    async def route(self, method, path, body, query=''):
+        """Returns (status, payload, extra_headers)"""
+        if method == 'GET' and path == '/health':
+            return 200, self.status(), {}
+        if method == 'GET' and path == '/search':
+            return self.search(query)
+
+        if method == 'POST' and path == '/commit/experience':
+            return await self.commit(body)
+
+        pipeline = path[len('/process/'):] if path.startswith('/process/') else None
+        if method != 'POST' or pipeline not in self.batchers:
+            return 404, {'ok': False, 'error': f"No route for {method} {path}"}, {}
+
+        try:
+            request = json.loads(body or b'{}')
+            item = request['experience' if pipeline == 'experience' else 'entry']
+            if not isinstance(item, dict):
+                raise ValueError('payload must be a JSON object')
+            deadline_ms = request.get('deadline_ms')
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'ok': False, 'error': f"Invalid request: {e}"}, {}
+
+        try:
+            result = await self.batchers[pipeline].submit(item, deadline_ms)
+        except Overloaded as e:
+            return 503, {'ok': False, 'error': str(e)}, {'Retry-After': '1'}
+        except DeadlineExceeded as e:
+            return 504, {'ok': False, 'error': str(e)}, {}
+        except Exception as e:
+            return 500, {'ok': False, 'error': str(e)}, {}
+        return 200, {'ok': True, 'result': result}, {}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload, extra = 413, {'ok': False, 'error': 'Request body too large'}, {}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    path, _, query = target.partition('?')
+                    status, payload, extra = await self.route(method, path, body, query)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                        'Content-Type: application/json',
+                        f"Content-Length: {len(data)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    batch_options = dict(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                         queue_size=args.queue_size, slo_ms=args.slo_ms)
+    factories = {
+        'experience': lambda: experience_batch_processor(args.cache_path),
+        'gfg': gfg_batch_processor,
+    }
+    batchers = {}
+    for name in args.pipelines:
+        logger.info(f"Loading {name} pipeline")
+        batchers[name] = MicroBatcher(name, factories[name](), **batch_options)
+        batchers[name].start()
+
+    service = NLPService(batchers, args.search_index_dir)
+    server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+    logger.info(f"NLP service listening on http://{args.host}:{args.port} ({', '.join(batchers)})")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching HTTP service for the NLP pipelines")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('NLP_SERVICE_PORT', 8765)))
+    parser.add_argument('--pipelines', nargs='+', choices=['experience', 'gfg'], default=['experience', 'gfg'])
+    parser.add_argument('--max-batch-size', type=int, default=16)
+    parser.add_argument('--max-wait-ms', type=float, default=10,
+                        help="Longest time the first request of a batch waits for more requests")
+    parser.add_argument('--queue-size', type=int, default=256,
+                        help="Pending requests per pipeline before new ones are rejected with 503")
+    parser.add_argument('--slo-ms', type=float, default=2000,
+                        help="Default per-request latency deadline (requests may pass deadline_ms)")
+    parser.add_argument('--cache', dest='cache_path', default=os.environ.get('NLP_RESULT_CACHE'),
+                        help="Result cache for the experience pipeline (default: $NLP_RESULT_CACHE)")
+    parser.add_argument('--search-index-dir', help="Root of the per-corpus BM25 indexes (default: data/search_index)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        logger.info("NLP service shutting down")
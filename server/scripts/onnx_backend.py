@@ -0,0 +1,237 @@
+"""
+Quantized ONNX Runtime backend for the GFG pipeline's SBERT and sentiment models.
+
+`export` converts the PyTorch models to ONNX and applies int8 dynamic
+quantization; OnnxSentenceEncoder and OnnxSentimentClassifier then run them on
+CPU with the same call interfaces as SentenceTransformer.encode and the
+transformers sentiment pipeline, so process_gfg_nlp can switch backends with
+NLP_INFERENCE_BACKEND=onnx. `check` compares both backends' outputs.
+
+Usage:
+    python onnx_backend.py export
+    python onnx_backend.py check --records 200
+"""
+
+import json
+import os
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ONNX_MODEL_DIR = os.path.join(BASE_DIR, 'data', 'onnx_models')
+
+SBERT_MODEL = "all-MiniLM-L6-v2"
+# The model transformers' pipeline("sentiment-analysis") falls back to
+SENTIMENT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+
+# Minimum agreement with the PyTorch models before the ONNX backend is considered usable
+MIN_MEAN_COSINE = 0.98
+MIN_LABEL_AGREEMENT = 0.95
+
+
+def _session(path, num_threads=None):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    num_threads = num_threads or int(os.environ.get("ONNX_NUM_THREADS", 0))
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def _load_config(model_dir, name):
+    with open(os.path.join(model_dir, name, "config.onnx.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _length_sorted_batches(texts, batch_size):
+    """Index batches of similar-length texts, so each batch pads little"""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+class _OnnxModel:
+    def __init__(self, model_dir, name):
+        from transformers import AutoTokenizer
+
+        path = os.path.join(model_dir, name)
+        self.config = _load_config(model_dir, name)
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.session = _session(os.path.join(path, "model.int8.onnx"))
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _run(self, texts, max_length):
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=max_length, return_tensors="np")
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        return self.session.run(None, feeds)[0], encoded["attention_mask"]
+
+
+class OnnxSentenceEncoder(_OnnxModel):
+    """Drop-in for SentenceTransformer.encode backed by the quantized ONNX export"""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR):
+        super().__init__(model_dir, "sbert")
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(sentences), self.config["dim"]), dtype=np.float32)
+
+        for batch in _length_sorted_batches(sentences, batch_size):
+            hidden, mask = self._run([sentences[i] for i in batch], self.config["max_seq_length"])
+            if self.config["pooling"] == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = mask[..., None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[batch] = pooled
+
+        if normalize_embeddings or self.config["normalize"]:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+class OnnxSentimentClassifier(_OnnxModel):
+    """Drop-in for pipeline("sentiment-analysis") backed by the quantized ONNX export"""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR):
+        super().__init__(model_dir, "sentiment")
+        self.labels = {int(i): label for i, label in self.config["id2label"].items()}
+
+    def __call__(self, texts, batch_size=16, **kwargs):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        results = [None] * len(texts)
+
+        for batch in _length_sorted_batches(texts, batch_size):
+            logits, _ = self._run([texts[i] for i in batch], self.config["max_length"])
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs /= probs.sum(axis=1, keepdims=True)
+            for i, row in zip(batch, probs):
+                best = int(row.argmax())
+                results[i] = {"label": self.labels[best], "score": float(row[best])}
+        return results
+
+
+def _export_onnx(model, tokenizer, path, dynamic_output_axes):
+    """Trace a transformers model to ONNX with dynamic batch/sequence axes; returns the first output only"""
+    import torch
+
+    sample = tokenizer(["export sample sentence", "another one"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _FirstOutput(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["output"] = dynamic_output_axes
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(_FirstOutput(), tuple(sample[name] for name in input_names), path,
+                          input_names=input_names, output_names=["output"], dynamic_axes=dynamic_axes,
+                          opset_version=14)
+
+
+def _quantize(model_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    quantize_dynamic(fp32_path, os.path.join(model_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+
+def export_models(model_dir=ONNX_MODEL_DIR, sbert_name=SBERT_MODEL, sentiment_name=SENTIMENT_MODEL):
+    """Export both models to ONNX with int8 dynamic quantization under `model_dir`"""
+    from sentence_transformers import SentenceTransformer
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    # SBERT: export the transformer; pooling and normalization are redone in numpy
+    sbert = SentenceTransformer(sbert_name)
+    sbert_dir = os.path.join(model_dir, "sbert")
+    os.makedirs(sbert_dir, exist_ok=True)
+    _export_onnx(sbert[0].auto_model, sbert.tokenizer, os.path.join(sbert_dir, "model.onnx"),
+                 {0: "batch", 1: "sequence"})
+    _quantize(sbert_dir)
+    sbert.tokenizer.save_pretrained(sbert_dir)
+    pooling = next((m for m in sbert if hasattr(m, "pooling_mode_cls_token")), None)
+    with open(os.path.join(sbert_dir, "config.onnx.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "source": sbert_name,
+            "dim": sbert.get_sentence_embedding_dimension(),
+            "max_seq_length": sbert.max_seq_length,
+            "pooling": "cls" if pooling is not None and pooling.pooling_mode_cls_token else "mean",
+            "normalize": any(type(m).__name__ == "Normalize" for m in sbert),
+        }, f, indent=2)
+    print(f"[✓] Exported {sbert_name} to {sbert_dir}")
+
+    sentiment_dir = os.path.join(model_dir, "sentiment")
+    os.makedirs(sentiment_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(sentiment_name)
+    classifier = AutoModelForSequenceClassification.from_pretrained(sentiment_name)
+    _export_onnx(classifier, tokenizer, os.path.join(sentiment_dir, "model.onnx"), {0: "batch"})
+    _quantize(sentiment_dir)
+    tokenizer.save_pretrained(sentiment_dir)
+    with open(os.path.join(sentiment_dir, "config.onnx.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "source": sentiment_name,
+            "id2label": {str(i): label for i, label in classifier.config.id2label.items()},
+            "max_length": min(tokenizer.model_max_length, 512),
+        }, f, indent=2)
+    print(f"[✓] Exported {sentiment_name} to {sentiment_dir}")
+
+
+def check_accuracy(questions, texts, model_dir=ONNX_MODEL_DIR):
+    """Compare ONNX outputs with the PyTorch models on the same inputs"""
+    from sentence_transformers import SentenceTransformer
+    from transformers import pipeline
+
+    sbert_cfg = _load_config(model_dir, "sbert")
+    sentiment_cfg = _load_config(model_dir, "sentiment")
+    reference = SentenceTransformer(sbert_cfg["source"]).encode(questions, convert_to_numpy=True,
+                                                                normalize_embeddings=True)
+    onnx = OnnxSentenceEncoder(model_dir).encode(questions, normalize_embeddings=True)
+    cosine = (reference * onnx).sum(axis=1)
+
+    texts = [t[:512] for t in texts]
+    expected = [r["label"] for r in pipeline("sentiment-analysis", model=sentiment_cfg["source"])(texts)]
+    actual = [r["label"] for r in OnnxSentimentClassifier(model_dir)(texts)]
+    agreement = float(np.mean([a == b for a, b in zip(expected, actual)])) if texts else 1.0
+
+    report = {
+        "questions": len(questions),
+        "mean_cosine": round(float(cosine.mean()), 5) if len(questions) else 1.0,
+        "min_cosine": round(float(cosine.min()), 5) if len(questions) else 1.0,
+        "texts": len(texts),
+        "label_agreement": round(agreement, 5),
+    }
+    report["ok"] = report["mean_cosine"] >= MIN_MEAN_COSINE and report["label_agreement"] >= MIN_LABEL_AGREEMENT
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Export and verify the quantized ONNX models")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--records", type=int, default=200, help="Synthetic GFG articles used by 'check'")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_models(args.model_dir)
+    else:
+        from benchmark_pipelines import generate_corpus
+        from process_gfg_nlp import split_questions_by_round
+
+        articles = list(generate_corpus("gfg", args.records, "medium"))
+        questions = sorted({q for a in articles for qs in split_questions_by_round(a["content"]).values() for q in qs})
+        report = check_accuracy(questions, [a["content"] for a in articles], args.model_dir)
+        print(json.dumps(report, indent=2))
+        if not report["ok"]:
+            sys.exit(1)
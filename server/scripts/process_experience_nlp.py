@@ -8,6 +8,9 @@ import json
 import re
 import sys
 import os
+import time
+import argparse
+import multiprocessing
 from datetime import datetime
 import logging
 
@@ -36,12 +39,164 @@ except ImportError as e:
     logger.warning(f"spaCy not available: {e}")
     SPACY_AVAILABLE = False
 
+from bisect import bisect_right
 from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+
+from company_aggregates import AGGREGATES_PATH, CompanyAggregates
+from compact_output import compact_path, write_compact
+from near_duplicates import DEFAULT_THRESHOLD as DEFAULT_DUPLICATE_THRESHOLD, NearDuplicateIndex
+from nlp_metrics import Profiler, RecordStats, RunMetrics
+from result_cache import DEFAULT_MAX_BYTES, ResultCache
+from search_index import SEARCH_INDEX_DIR, SearchIndex
+from spacy_pipeline import SPACY_BATCH_SIZE, load_pipeline, parse_documents
+from stream_io import JsonlCheckpointWriter, iter_json_records
+from tiered_sentiment import (DEFAULT_COMPOUND_THRESHOLD, DEFAULT_KEYWORD_MARGIN, SENTIMENT_KEYWORDS,
+                              lexicon_verdict, load_transformer_escalation)
+
+# Bump whenever a change to the processor alters its NLP output, so cached
+# results from older versions are no longer used
+PROCESSOR_VERSION = 4
+
+# Sentiment the VADER/keyword scores leave ambiguous can be escalated to a
+# transformer ("transformer"); by default ("none") the lexicon result stands
+SENTIMENT_ESCALATION = os.environ.get('NLP_SENTIMENT_ESCALATION', 'none')
+SENTIMENT_THRESHOLD = float(os.environ.get('NLP_SENTIMENT_THRESHOLD', DEFAULT_COMPOUND_THRESHOLD))
+KEYWORD_MARGIN = int(os.environ.get('NLP_KEYWORD_MARGIN', DEFAULT_KEYWORD_MARGIN))
+
+# Submissions whose text is a near-duplicate (MinHash Jaccard >= threshold) of an
+# indexed one are linked to it instead of processed; off unless an index path is set
+NEAR_DUPLICATE_INDEX = os.environ.get('NLP_NEAR_DUPLICATE_INDEX')
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('NLP_NEAR_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD))
+
+# Per-company counters updated with each experience the server commits (see
+# commit_experiences); off unless a path is set
+COMPANY_AGGREGATES = os.environ.get('NLP_COMPANY_AGGREGATES')
+
+# BM25 index that committed experiences are added to, so search finds new
+# submissions right away; NLP_SEARCH_INDEX=off disables it
+SEARCH_INDEX = os.environ.get('NLP_SEARCH_INDEX') or os.path.join(SEARCH_INDEX_DIR, 'experiences')
+
+def _pattern_alternatives(pattern):
+    r"""Split a r'\b(a|b|c)\b' keyword pattern into its literal alternatives"""
+    match = re.fullmatch(r'\\b\((.*)\)\\b', pattern)
+    if not match:
+        raise ValueError(f"Not a keyword alternation pattern: {pattern}")
+    return match.group(1).split('|')
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+def _trie_regex(words):
+    """Regex matching any of `words`, factored as a trie so each position is tried once"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional suffix: longest alternative is tried first
+        return f'(?:{body})?' if '' in node else body
+
+    return render(trie)
+
+class KeywordMatcher:
+    r"""Single-pass matcher over many keyword groups.
+
+    Word groups behave like ``re.findall(r'\b(a|b)\b', text)`` and substring
+    groups like ``text.count(keyword)``: every group gets its own
+    non-overlapping, leftmost-first matches, but the text is scanned once.
+    """
+
+    def __init__(self, word_groups, substring_groups):
+        self.word_groups = word_groups
+        self.substring_groups = substring_groups
+        self.group_names = list(word_groups) + list(substring_groups)
+
+        words = {alt for alts in word_groups.values() for alt in alts}
+        substrings = {alt for alts in substring_groups.values() for alt in alts}
+        substring_regex = _trie_regex(substrings)
+        self.regex = re.compile(
+            r'(?=\b(' + _trie_regex(words) + r')\b)(?=(' + substring_regex + r')|)'
+            r'|(?=(' + substring_regex + r'))'
+        )
+
+        # At one position, every matching alternative is a prefix of the longest one,
+        # so each group's match there is fully determined by that longest alternative
+        self._word_choices = {word: self._choices(word, word_groups, True) for word in words}
+        self._substring_choices = {sub: self._choices(sub, substring_groups, False) for sub in substrings}
+
+    @staticmethod
+    def _choices(longest, groups, word_bounded):
+        matching = set()
+        for alts in groups.values():
+            for alt in alts:
+                if not longest.startswith(alt):
+                    continue
+                if (word_bounded and len(alt) < len(longest)
+                        and _is_word_char(longest[len(alt) - 1]) == _is_word_char(longest[len(alt)])):
+                    continue
+                matching.add(alt)
+
+        choices = []
+        for name, alts in groups.items():
+            chosen = next((alt for alt in alts if alt in matching), None)
+            if chosen is not None:
+                choices.append((name, chosen))
+        return choices
+
+    def scan(self, text_lower):
+        """Return {group name: [(position, matched alternative), ...]} in text order"""
+        hits = {name: [] for name in self.group_names}
+        next_allowed = dict.fromkeys(self.group_names, 0)
+
+        for match in self.regex.finditer(text_lower):
+            position = match.start()
+            word, substring, substring_only = match.groups()
+            choices = self._word_choices[word] if word else []
+            substring = substring or substring_only
+            if substring:
+                choices = choices + self._substring_choices[substring]
+
+            for name, alt in choices:
+                if position >= next_allowed[name]:
+                    hits[name].append((position, alt))
+                    next_allowed[name] = position + len(alt)
+
+        return hits
 
 class InterviewExperienceProcessor:
-    def __init__(self):
+    def __init__(self, cache=None, profile=False, sentiment_escalation=None, compound_threshold=None,
+                 keyword_margin=None, near_duplicates=None):
         self.nltk_ready = False
         self.spacy_ready = False
+        self.nlp = None
+        self.cache = cache
+        self.near_duplicates = near_duplicates
+        
+        # Tiered sentiment: only texts the lexicon finds ambiguous are escalated
+        self.sentiment_escalation = sentiment_escalation or SENTIMENT_ESCALATION
+        self.compound_threshold = SENTIMENT_THRESHOLD if compound_threshold is None else compound_threshold
+        self.keyword_margin = KEYWORD_MARGIN if keyword_margin is None else keyword_margin
+        self.escalate = None
+        if self.sentiment_escalation == 'transformer':
+            try:
+                self.escalate = load_transformer_escalation()
+                logger.info("Transformer sentiment escalation enabled")
+            except Exception as e:
+                logger.warning(f"Transformer sentiment escalation unavailable: {e}")
+        
+        # Instrumentation: stats of the record being processed, run aggregates, optional cProfile
+        self.stats = None
+        self.metrics = RunMetrics()
+        self.profiler = Profiler() if profile else None
         
         # Initialize NLTK components
         if NLTK_AVAILABLE:
@@ -55,7 +210,8 @@ class InterviewExperienceProcessor:
         # Initialize spaCy
         if SPACY_AVAILABLE:
             try:
-                self.nlp = spacy.load("en_core_web_sm")
+                # Only entities and sentence boundaries are used downstream
+                self.nlp = load_pipeline(components=("ner", "senter"))
                 self.spacy_ready = True
                 logger.info("spaCy model loaded successfully")
             except Exception as e:
@@ -84,11 +240,55 @@ class InterviewExperienceProcessor:
         }
         
         # Sentiment keywords
-        self.sentiment_keywords = {
-            'positive': ['excellent', 'great', 'good', 'amazing', 'wonderful', 'fantastic', 'smooth', 'easy', 'helpful', 'supportive', 'professional', 'organized', 'clear', 'fair', 'selected', 'offered', 'positive', 'successful'],
-            'negative': ['difficult', 'hard', 'stressful', 'unclear', 'confusing', 'disorganized', 'unprofessional', 'rude', 'unhelpful', 'negative', 'rejected', 'failed', 'disappointing', 'frustrating', 'terrible', 'awful', 'bad', 'poor'],
-            'neutral': ['okay', 'fine', 'average', 'standard', 'normal', 'typical', 'expected', 'reasonable', 'fair', 'balanced', 'mixed']
-        }
+        self.sentiment_keywords = {name: list(keywords) for name, keywords in SENTIMENT_KEYWORDS.items()}
+
+        # Insight patterns
+        self.tech_patterns = [
+            r'\b(python|java|javascript|typescript|react|angular|vue|node|express|django|flask|spring|hibernate|mysql|postgresql|mongodb|redis|docker|kubernetes|aws|azure|gcp|git|jenkins|jira|zendesk)\b'
+        ]
+        self.difficulty_patterns = [
+            r'\b(easy|simple|straightforward|basic|fundamental)\b',
+            r'\b(medium|moderate|reasonable|standard|typical)\b',
+            r'\b(hard|difficult|challenging|complex|advanced)\b',
+            r'\b(very hard|extremely difficult|intense|rigorous)\b'
+        ]
+        self.tip_patterns = [
+            r'\b(study|practice|prepare|review|learn|read|watch|mock interview|leetcode|hackerrank)\b'
+        ]
+
+        # Common round patterns
+        self.round_patterns = [
+            (r'\b(phone screen|phone interview|screening|initial)\b', 'Phone Screen'),
+            (r'\b(technical|coding|programming|algorithm)\b', 'Technical Round'),
+            (r'\b(behavioral|culture|personality|soft skills)\b', 'Behavioral Round'),
+            (r'\b(system design|architecture|design)\b', 'System Design'),
+            (r'\b(onsite|on-site|in-person|final)\b', 'Onsite Round'),
+            (r'\b(hr|human resources|recruiter)\b', 'HR Round')
+        ]
+
+        self.matcher = self._build_matcher()
+
+    def _build_matcher(self):
+        """Compile every keyword pattern above into one single-pass matcher"""
+        word_groups = {}
+        for category, patterns in self.question_patterns.items():
+            for i, pattern in enumerate(patterns):
+                word_groups[f'question:{category}:{i}'] = _pattern_alternatives(pattern)
+        for prefix, patterns in (('tech', self.tech_patterns),
+                                 ('difficulty', self.difficulty_patterns),
+                                 ('tips', self.tip_patterns)):
+            for i, pattern in enumerate(patterns):
+                word_groups[f'{prefix}:{i}'] = _pattern_alternatives(pattern)
+        for i, (pattern, _) in enumerate(self.round_patterns):
+            word_groups[f'round:{i}'] = _pattern_alternatives(pattern)
+
+        keywords = dict.fromkeys(k for ks in self.sentiment_keywords.values() for k in ks)
+        substring_groups = {f'keyword:{keyword}': [keyword] for keyword in keywords}
+
+        return KeywordMatcher(word_groups, substring_groups)
+
+    def _keyword_count(self, hits, keyword):
+        return len(hits[f'keyword:{keyword}'])
 
     def _setup_nltk(self):
         """Setup NLTK with required data"""
@@ -114,21 +314,46 @@ class InterviewExperienceProcessor:
         self.sia = SentimentIntensityAnalyzer()
         self.stop_words = set(stopwords.words('english'))
 
-    def extract_questions(self, text):
+    def _stage(self, name):
+        """Time a stage of the current record (no-op outside process_experience)"""
+        return self.stats.stage(name) if self.stats is not None else nullcontext()
+
+    def _count(self, name, once=False):
+        """Count a fallback or event for the current record"""
+        if self.stats is not None:
+            self.stats.flag(name) if once else self.stats.count(name)
+
+    def parse(self, text):
+        """spaCy Doc for `text`, or None when spaCy is unavailable or fails"""
+        if not (self.spacy_ready and self.nlp):
+            self._count('spacy_unavailable', once=True)
+            return None
+        try:
+            return self.nlp(text)
+        except Exception as e:
+            logger.warning(f"spaCy processing failed: {e}")
+            self._count('spacy_parse_failed')
+            return None
+
+    def extract_questions(self, text, doc=None):
         """Extract questions from text using simple pattern matching"""
         questions = []
         
-        # Split into sentences using simple splitting if NLTK not available
-        if self.nltk_ready:
+        # Reuse the spaCy sentences when a Doc is available, else NLTK, else simple splitting
+        if doc is not None:
+            sentences = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
+        elif self.nltk_ready:
             try:
                 sentences = sent_tokenize(text)
             except Exception as e:
                 logger.warning(f"NLTK tokenization failed: {e}")
+                self._count('nltk_tokenize_failed')
                 # Fallback sentence splitting
                 sentences = re.split(r'[.!?]+', text)
                 sentences = [s.strip() for s in sentences if s.strip()]
         else:
             # Fallback sentence splitting
+            self._count('regex_sentence_split')
             sentences = re.split(r'[.!?]+', text)
             sentences = [s.strip() for s in sentences if s.strip()]
         
@@ -152,15 +377,12 @@ class InterviewExperienceProcessor:
         }
         
         for question in questions:
-            question_lower = question.lower()
+            hits = self.matcher.scan(question.lower())
             max_score = 0
             best_category = 'other'
             
             for category, patterns in self.question_patterns.items():
-                score = 0
-                for pattern in patterns:
-                    matches = re.findall(pattern, question_lower, re.IGNORECASE)
-                    score += len(matches)
+                score = sum(len(hits[f'question:{category}:{i}']) for i in range(len(patterns)))
                 
                 if score > max_score:
                     max_score = score
@@ -170,9 +392,10 @@ class InterviewExperienceProcessor:
         
         return categorized
 
-    def analyze_sentiment(self, text):
+    def analyze_sentiment(self, text, hits=None):
         """Perform sentiment analysis with fallback"""
-        text_lower = text.lower()
+        if hits is None:
+            hits = self.matcher.scan(text.lower())
         
         # Try VADER sentiment analysis if available
         if self.nltk_ready:
@@ -180,8 +403,10 @@ class InterviewExperienceProcessor:
                 vader_scores = self.sia.polarity_scores(text)
             except Exception as e:
                 logger.warning(f"VADER analysis failed: {e}")
+                self._count('vader_failed')
                 vader_scores = {'compound': 0.0, 'pos': 0.0, 'neu': 1.0, 'neg': 0.0}
         else:
+            self._count('vader_unavailable', once=True)
             vader_scores = {'compound': 0.0, 'pos': 0.0, 'neu': 1.0, 'neg': 0.0}
         
         # Keyword-based sentiment analysis
@@ -189,7 +414,7 @@ class InterviewExperienceProcessor:
         
         for sentiment, keywords in self.sentiment_keywords.items():
             for keyword in keywords:
-                keyword_scores[sentiment] += text_lower.count(keyword)
+                keyword_scores[sentiment] += self._keyword_count(hits, keyword)
         
         # Determine overall sentiment
         if self.nltk_ready and vader_scores['compound'] >= 0.05:
@@ -203,6 +428,22 @@ class InterviewExperienceProcessor:
         else:
             sentiment = 'neutral'
         
+        # The lexicon result stands for clear cases; ambiguous ones go to the transformer when enabled
+        tier = 'lexicon'
+        compound = vader_scores['compound'] if self.nltk_ready else None
+        verdict = lexicon_verdict(compound, keyword_scores['positive'], keyword_scores['negative'],
+                                  self.compound_threshold, self.keyword_margin)
+        if verdict is None:
+            self._count('sentiment_ambiguous')
+            if self.escalate is not None:
+                try:
+                    sentiment = self.escalate([text])[0]
+                    tier = 'transformer'
+                    self._count('sentiment_escalated')
+                except Exception as e:
+                    logger.warning(f"Sentiment escalation failed: {e}")
+                    self._count('sentiment_escalation_failed')
+        
         # Calculate confidence
         if self.nltk_ready:
             confidence = abs(vader_scores['compound'])
@@ -217,10 +458,11 @@ class InterviewExperienceProcessor:
             'sentiment': sentiment,
             'vader_scores': vader_scores,
             'keyword_scores': keyword_scores,
-            'confidence': confidence
+            'confidence': confidence,
+            'tier': tier
         }
 
-    def extract_key_insights(self, text):
+    def extract_key_insights(self, text, hits=None, doc=None):
         """Extract key insights from the experience"""
         insights = {
             'topics': [],
@@ -233,58 +475,34 @@ class InterviewExperienceProcessor:
             'positive_aspects': []
         }
         
-        text_lower = text.lower()
-        
-        # Extract technologies using pattern matching
-        tech_patterns = [
-            r'\b(python|java|javascript|typescript|react|angular|vue|node|express|django|flask|spring|hibernate|mysql|postgresql|mongodb|redis|docker|kubernetes|aws|azure|gcp|git|jenkins|jira|zendesk)\b'
-        ]
+        if hits is None:
+            hits = self.matcher.scan(text.lower())
         
-        for pattern in tech_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            insights['technologies'].extend(matches)
-        
-        # Extract difficulty indicators
-        difficulty_patterns = [
-            r'\b(easy|simple|straightforward|basic|fundamental)\b',
-            r'\b(medium|moderate|reasonable|standard|typical)\b',
-            r'\b(hard|difficult|challenging|complex|advanced)\b',
-            r'\b(very hard|extremely difficult|intense|rigorous)\b'
-        ]
-        
-        for pattern in difficulty_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            insights['difficulty_indicators'].extend(matches)
-        
-        # Extract preparation tips
-        tip_patterns = [
-            r'\b(study|practice|prepare|review|learn|read|watch|mock interview|leetcode|hackerrank)\b'
-        ]
-        
-        for pattern in tip_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            insights['preparation_tips'].extend(matches)
+        # Technologies, difficulty indicators and preparation tips from the keyword scan
+        for prefix, patterns, key in (('tech', self.tech_patterns, 'technologies'),
+                                      ('difficulty', self.difficulty_patterns, 'difficulty_indicators'),
+                                      ('tips', self.tip_patterns, 'preparation_tips')):
+            for i in range(len(patterns)):
+                insights[key].extend(alt for _, alt in hits[f'{prefix}:{i}'])
         
         # Extract red flags and positive aspects
         for keyword in self.sentiment_keywords['negative']:
-            if keyword in text_lower:
+            if self._keyword_count(hits, keyword):
                 insights['red_flags'].append(keyword)
         
         for keyword in self.sentiment_keywords['positive']:
-            if keyword in text_lower:
+            if self._keyword_count(hits, keyword):
                 insights['positive_aspects'].append(keyword)
         
         # Use spaCy for entity extraction if available
-        if self.spacy_ready and self.nlp:
-            try:
-                doc = self.nlp(text)
-                for ent in doc.ents:
-                    if ent.label_ in ['ORG']:
-                        insights['companies_mentioned'].append(ent.text)
-                    elif ent.label_ in ['PRODUCT', 'GPE']:
-                        insights['technologies'].append(ent.text)
-            except Exception as e:
-                logger.warning(f"spaCy processing failed: {e}")
+        if doc is None:
+            doc = self.parse(text)
+        if doc is not None:
+            for ent in doc.ents:
+                if ent.label_ in ['ORG']:
+                    insights['companies_mentioned'].append(ent.text)
+                elif ent.label_ in ['PRODUCT', 'GPE']:
+                    insights['technologies'].append(ent.text)
         
         # Remove duplicates and clean up
         for key in insights:
@@ -293,40 +511,44 @@ class InterviewExperienceProcessor:
         
         return insights
 
-    def extract_rounds(self, text):
+    def extract_rounds(self, text, hits=None, doc=None):
         """Extract interview rounds information"""
         rounds = []
+        text_lower = text.lower()
+        if hits is None:
+            hits = self.matcher.scan(text_lower)
         
-        # Common round patterns
-        round_patterns = [
-            (r'\b(phone screen|phone interview|screening|initial)\b', 'Phone Screen'),
-            (r'\b(technical|coding|programming|algorithm)\b', 'Technical Round'),
-            (r'\b(behavioral|culture|personality|soft skills)\b', 'Behavioral Round'),
-            (r'\b(system design|architecture|design)\b', 'System Design'),
-            (r'\b(onsite|on-site|in-person|final)\b', 'Onsite Round'),
-            (r'\b(hr|human resources|recruiter)\b', 'HR Round')
-        ]
+        # Sentence spans in the lowercased text: the Doc's sentences when available,
+        # otherwise punctuation splitting aligned with re.split on the original
+        if doc is not None and len(text_lower) == len(text):
+            sentences = [sent.text for sent in doc.sents]
+            starts = [sent.start_char for sent in doc.sents]
+        else:
+            sentences = re.split(r'[.!?]+', text)
+            starts = [0] + [m.end() for m in re.finditer(r'[.!?]+', text_lower)]
         
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        # First round pattern (in pattern order) hit within each sentence
+        sentence_rounds = {}
+        for i, (_, round_type) in enumerate(self.round_patterns):
+            for position, _ in hits[f'round:{i}']:
+                sentence_rounds.setdefault(bisect_right(starts, position) - 1, round_type)
         
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
+        for index, sentence in enumerate(sentences):
+            sentence = sentence.strip()
+            if not sentence or index not in sentence_rounds:
+                continue
+            
+            round_info = {
+                'type': sentence_rounds[index],
+                'description': sentence,
+                'questions': []
+            }
+            
+            # Look for questions in the same sentence
+            if '?' in sentence:
+                round_info['questions'].append(sentence)
             
-            for pattern, round_type in round_patterns:
-                if re.search(pattern, sentence_lower):
-                    round_info = {
-                        'type': round_type,
-                        'description': sentence,
-                        'questions': []
-                    }
-                    
-                    # Look for questions in the same sentence
-                    if '?' in sentence:
-                        round_info['questions'].append(sentence)
-                    
-                    rounds.append(round_info)
-                    break
+            rounds.append(round_info)
         
         return rounds
 
@@ -364,8 +586,184 @@ class InterviewExperienceProcessor:
         
         return highlights
 
-    def process_experience(self, experience_data):
-        """Main processing function"""
+    def analyze_text(self, text_content, doc=None):
+        """Run the NLP stack over one experience text, sharing one spaCy Doc across extractors"""
+        if doc is None:
+            with self._stage('spacy_parse'):
+                doc = self.parse(text_content)
+        
+        # Extract questions
+        with self._stage('extract_questions'):
+            questions = self.extract_questions(text_content, doc)
+        logger.info(f"Extracted {len(questions)} questions")
+        
+        # Categorize questions
+        with self._stage('categorize'):
+            categorized_questions = self.categorize_questions(questions)
+        
+        # One keyword scan shared by sentiment, insights and rounds
+        with self._stage('keyword_scan'):
+            hits = self.matcher.scan(text_content.lower())
+        
+        # Analyze sentiment
+        with self._stage('sentiment'):
+            sentiment_analysis = self.analyze_sentiment(text_content, hits)
+        logger.info(f"Sentiment analysis: {sentiment_analysis['sentiment']}")
+        
+        # Extract insights
+        with self._stage('insights'):
+            insights = self.extract_key_insights(text_content, hits, doc)
+        
+        # Extract rounds
+        with self._stage('rounds'):
+            rounds = self.extract_rounds(text_content, hits, doc)
+        logger.info(f"Extracted {len(rounds)} interview rounds")
+        
+        # Generate highlights
+        with self._stage('highlights'):
+            highlights = self.generate_highlights(insights, sentiment_analysis)
+        
+        return {
+            'raw_questions': questions,
+            'sentiment_analysis': sentiment_analysis,
+            'categorized_questions': categorized_questions,
+            'extracted_insights': insights,
+            'interview_rounds': rounds,
+            'highlights': highlights
+        }
+
+    def cache_version(self):
+        """Everything besides the text that determines analyze_text output"""
+        return {
+            'processor': PROCESSOR_VERSION,
+            'nltk': self.nltk_ready,
+            'spacy': self.spacy_ready,
+            'spacy_model': self.nlp.meta.get('version') if self.spacy_ready and self.nlp else None,
+            'sentiment_escalation': [self.sentiment_escalation, self.compound_threshold, self.keyword_margin]
+            if self.escalate is not None else None
+        }
+
+    def is_cached(self, text_content):
+        if self.cache is None:
+            return False
+        try:
+            return self.cache.contains(ResultCache.make_key(text_content, self.cache_version()))
+        except Exception:
+            return False
+
+    def analyze_text_cached(self, text_content, doc=None):
+        """analyze_text, served from the result cache when the same text was seen before"""
+        if self.cache is None:
+            return self.analyze_text(text_content, doc)
+        
+        key = ResultCache.make_key(text_content, self.cache_version())
+        try:
+            cached = self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            logger.info("Using cached NLP results")
+            self._count('cache_hit')
+            return cached
+        self._count('cache_miss')
+        
+        nlp_results = self.analyze_text(text_content, doc)
+        try:
+            self.cache.put(key, nlp_results)
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {e}")
+        return nlp_results
+
+    def process_experiences(self, experiences, batch_size=SPACY_BATCH_SIZE, metrics=None):
+        """
+        Process a batch of experiences, parsing every uncached text in one
+        nlp.pipe call instead of one spaCy call per text
+        """
+        texts = [experience.get('experience', '') for experience in experiences]
+        docs = {}
+        parse_ms = None
+        if self.spacy_ready and self.nlp:
+            pending = [i for i, text in enumerate(texts) if text and not self.is_cached(text)]
+            start = time.perf_counter()
+            parsed = parse_documents(self.nlp, [texts[i] for i in pending], batch_size=batch_size)
+            if pending:
+                parse_ms = (time.perf_counter() - start) * 1000 / len(pending)
+            docs = dict(zip(pending, parsed))
+        
+        results = [self.process_experience(experience, docs.get(i), parse_ms if i in docs else None, metrics)
+                   for i, experience in enumerate(experiences)]
+        return results
+
+    def process_experience(self, experience_data, doc=None, parse_ms=None, metrics=None):
+        """
+        Main processing function. Per-stage timings and fallback counters go
+        to the processor's metrics, and to the run's `metrics` if given, not
+        into the record; `parse_ms` is this record's share of a batched spaCy
+        parse that produced `doc`.
+        """
+        self.stats = RecordStats()
+        if parse_ms is not None:
+            self.stats.stages['spacy_parse'] = parse_ms
+        try:
+            with self.profiler.running() if self.profiler else nullcontext():
+                processed = self._process_experience(experience_data, doc)
+        finally:
+            stats, self.stats = self.stats.to_dict(), None
+        
+        self.metrics.add(stats)
+        if metrics is not None:
+            metrics.add(stats)
+        return processed
+
+    def link_near_duplicate(self, experience_data, text_content):
+        """
+        A record linking the submission to the indexed experience it
+        near-duplicates, or None when it should be processed. Submissions with
+        'allow_duplicate' set (e.g. when the linked record no longer exists)
+        are always processed.
+        """
+        if self.near_duplicates is None or experience_data.get('allow_duplicate'):
+            return None
+        try:
+            with self._stage('near_duplicate_check'):
+                match = self.near_duplicates.query(text_content, exclude=experience_data.get('id'))
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup failed: {e}")
+            return None
+        if match is None:
+            return None
+
+        duplicate_of, similarity = match
+        record_id = experience_data.get('id', f"exp_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        logger.info(f"Experience {record_id} near-duplicates {duplicate_of} (Jaccard ~{similarity:.2f}), not processing")
+        self._count('near_duplicate')
+        try:
+            self.near_duplicates.link(record_id, duplicate_of, similarity)
+        except Exception as e:
+            logger.warning(f"Near-duplicate link write failed: {e}")
+        return {
+            'id': record_id,
+            'title': experience_data.get('title', f"Interview at {experience_data.get('company', 'Unknown Company')}"),
+            'company': experience_data.get('company', ''),
+            'role': experience_data.get('role', ''),
+            'source': 'User Submission',
+            'timestamp': datetime.now().isoformat(),
+            'nlp_processed': False,
+            'duplicate_of': duplicate_of,
+            'duplicate_similarity': round(similarity, 4),
+        }
+
+    def index_near_duplicates(self, record_id, text_content):
+        """Make a processed experience findable by later near-duplicate submissions"""
+        if self.near_duplicates is None:
+            return
+        try:
+            self.near_duplicates.add(record_id, text_content)
+        except Exception as e:
+            logger.warning(f"Near-duplicate index write failed: {e}")
+
+    def _process_experience(self, experience_data, doc=None):
         try:
             logger.info(f"Processing experience: {experience_data.get('id', 'unknown')}")
             
@@ -377,26 +775,13 @@ class InterviewExperienceProcessor:
             
             logger.info(f"Processing text of length: {len(text_content)}")
             
-            # Extract questions
-            questions = self.extract_questions(text_content)
-            logger.info(f"Extracted {len(questions)} questions")
-            
-            # Categorize questions
-            categorized_questions = self.categorize_questions(questions)
-            
-            # Analyze sentiment
-            sentiment_analysis = self.analyze_sentiment(text_content)
-            logger.info(f"Sentiment analysis: {sentiment_analysis['sentiment']}")
+            duplicate = self.link_near_duplicate(experience_data, text_content)
+            if duplicate is not None:
+                return duplicate
             
-            # Extract insights
-            insights = self.extract_key_insights(text_content)
-            
-            # Extract rounds
-            rounds = self.extract_rounds(text_content)
-            logger.info(f"Extracted {len(rounds)} interview rounds")
-            
-            # Generate highlights
-            highlights = self.generate_highlights(insights, sentiment_analysis)
+            # Run (or reuse cached) NLP analysis
+            nlp_results = self.analyze_text_cached(text_content, doc)
+            sentiment_analysis = nlp_results['sentiment_analysis']
             
             # Create processed experience
             processed_experience = {
@@ -416,12 +801,12 @@ class InterviewExperienceProcessor:
                     'spacy': self.spacy_ready
                 },
                 'sentiment_analysis': sentiment_analysis,
-                'categorized_questions': categorized_questions,
-                'extracted_insights': insights,
-                'interview_rounds': rounds,
-                'highlights': highlights,
+                'categorized_questions': nlp_results['categorized_questions'],
+                'extracted_insights': nlp_results['extracted_insights'],
+                'interview_rounds': nlp_results['interview_rounds'],
+                'highlights': nlp_results['highlights'],
                 'feedback_sentiment': sentiment_analysis['sentiment'],
-                'raw_questions': questions,
+                'raw_questions': nlp_results['raw_questions'],
                 
                 # Original data preservation
                 'original_experience': text_content,
@@ -444,6 +829,7 @@ class InterviewExperienceProcessor:
                 }
             }
             
+            self.index_near_duplicates(processed_experience['id'], text_content)
             logger.info("Experience processed successfully")
             return processed_experience
             
@@ -451,12 +837,88 @@ class InterviewExperienceProcessor:
             logger.error(f"Error processing experience: {str(e)}")
             return None
 
-def process_experience_file(input_file, output_file):
-    """Process experiences from a JSON file"""
+def build_processor(cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES, profile=False):
+    """
+    Create a processor, backed by a result cache when `cache_path` is set and
+    by the near-duplicate index when NEAR_DUPLICATE_INDEX is
+    """
+    cache = ResultCache(cache_path, max_bytes=cache_max_bytes) if cache_path else None
+    near_duplicates = None
+    if NEAR_DUPLICATE_INDEX:
+        near_duplicates = NearDuplicateIndex(NEAR_DUPLICATE_INDEX, threshold=NEAR_DUPLICATE_THRESHOLD)
+    return InterviewExperienceProcessor(cache=cache, profile=profile, near_duplicates=near_duplicates)
+
+def log_cache_stats(processor):
+    if processor is not None and processor.cache is not None:
+        logger.info(f"Result cache: {processor.cache.stats()}")
+
+def report_run(metrics, metrics_path=None, processor=None, profile_path=None):
+    """Log the per-stage summary of a run and write the metrics/profile files if requested"""
+    summary = metrics.summary()
+    stages = ", ".join(f"{name}={stage['mean_ms']}ms" for name, stage in summary['stages'].items())
+    logger.info(f"Mean stage latency over {summary['records']} records: {stages}")
+    if summary['counters']:
+        logger.info(f"Fallback counters: {summary['counters']}")
+    if summary['records']:
+        ambiguous = summary['counters'].get('sentiment_ambiguous', 0)
+        escalated = summary['counters'].get('sentiment_escalated', 0)
+        logger.info(f"Sentiment: {ambiguous} of {summary['records']} records ambiguous, "
+                    f"{escalated} escalated ({escalated / summary['records']:.1%})")
+
+    if metrics_path:
+        with open(metrics_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Metrics written to {metrics_path}")
+
+    if profile_path and processor is not None and processor.profiler is not None:
+        processor.profiler.dump(profile_path)
+        logger.info(f"cProfile stats written to {profile_path}")
+
+def update_search_index(search_index_dir, records):
+    """Add processed experiences (not near-duplicate links) to the BM25 search index"""
+    index = SearchIndex.for_corpus('experiences', search_index_dir)
+    added = index.add(record for record in records if not record.get('duplicate_of'))
+    logger.info(f"Search index: {added} experiences added, {len(index)} total")
+
+def commit_experiences(records, aggregates_path=None, search_index_dir=None):
+    """
+    Apply experiences that have been stored to the per-company counters at
+    `aggregates_path` (default COMPANY_AGGREGATES, re-exported afterwards)
+    and add them to the search index in `search_index_dir` (default
+    SEARCH_INDEX). Only committed records belong here: the server calls this
+    after saving a submission, so rejected or failed ones are never counted.
+    Near-duplicate links are skipped. Returns how many records changed the
+    counters.
+    """
+    aggregates_path = aggregates_path or COMPANY_AGGREGATES
+    search_index_dir = search_index_dir or SEARCH_INDEX
+    records = [record for record in records if not record.get('duplicate_of')]
+    if not records:
+        return 0
+    if search_index_dir and search_index_dir != 'off':
+        update_search_index(search_index_dir, records)
+    if not aggregates_path:
+        return 0
+    aggregates = CompanyAggregates(aggregates_path)
+    try:
+        changed = aggregates.add('experiences', records)
+        aggregates.export()
+    finally:
+        aggregates.close()
+    return changed
+
+def process_experience_file(input_file, output_file, workers=1, cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+                            metrics_path=None, profile_path=None, search_index_dir=None, compact=False,
+                            processor=None, aggregates_path=None):
+    """
+    Process experiences from a JSON file; `compact` writes minified JSONL with
+    texts stored once, to the .jsonl sibling of a .json `output_file`. Pass a warm `processor` to reuse its loaded models.
+    With `aggregates_path` the written output counts as committed and is
+    applied to those per-company counters.
+    Returns the processed experiences, or None if the run failed.
+    """
     logger.info(f"Processing file: {input_file} -> {output_file}")
     
-    processor = InterviewExperienceProcessor()
-    
     try:
         # Check if input file exists
         if not os.path.exists(input_file):
@@ -469,33 +931,370 @@ def process_experience_file(input_file, output_file):
         logger.info(f"Loaded {len(experiences)} experiences from file")
         
         processed_experiences = []
+        metrics = RunMetrics()
         
-        for i, experience in enumerate(experiences):
-            logger.info(f"Processing experience {i+1}/{len(experiences)}")
-            processed = processor.process_experience(experience)
+        # Profiling only covers the in-process processor, not pool workers
+        if processor is None and workers <= 1:
+            processor = build_processor(cache_path, cache_max_bytes, profile=bool(profile_path))
+        results = iter_processed_experiences(experiences, processor=processor, workers=workers,
+                                             cache_path=cache_path, cache_max_bytes=cache_max_bytes, metrics=metrics)
+        for i, (processed, error) in enumerate(results):
+            logger.info(f"Processed experience {i+1}/{len(experiences)}")
             if processed:
                 processed_experiences.append(processed)
+            else:
+                logger.error(f"Experience {i+1} failed: {error}")
         
         # Ensure output directory exists
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
         # Save processed experiences
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(processed_experiences, f, indent=2, ensure_ascii=False)
+        if compact:
+            output_file = compact_path(output_file)
+            write_compact(processed_experiences, output_file)
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(processed_experiences, f, indent=2, ensure_ascii=False)
         
         logger.info(f"Successfully processed {len(processed_experiences)} experiences. Output saved to {output_file}")
+        if search_index_dir:
+            update_search_index(search_index_dir, processed_experiences)
+        if aggregates_path:
+            commit_experiences(processed_experiences, aggregates_path)
+        report_run(metrics, metrics_path, processor, profile_path)
         print(f"Processed {len(processed_experiences)} experiences successfully")
+        return processed_experiences
         
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         print(f"Error: {str(e)}")
 
+# Per-process processor used by pool workers, created once by the pool initializer
+_pool_processor = None
+
+def _init_pool_worker(cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    global _pool_processor
+    _pool_processor = build_processor(cache_path, cache_max_bytes)
+
+def _process_one(experience, processor=None, metrics=None):
+    """Process one record, returning (processed, error) instead of raising"""
+    try:
+        processed = (processor or _pool_processor).process_experience(experience, metrics=metrics)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    if processed is None:
+        return None, "NLP processing returned no result"
+    return processed, None
+
+def _process_pooled(experience):
+    """_process_one in a pool worker, also returning the record's metrics for the parent to merge"""
+    metrics = RunMetrics()
+    return (*_process_one(experience, metrics=metrics), metrics)
+
+def iter_processed_experiences(experiences, processor=None, workers=1, chunksize=1,
+                               cache_path=None, cache_max_bytes=DEFAULT_MAX_BYTES, metrics=None):
+    """
+    Yield (processed, error) pairs in input order as each record finishes;
+    per-record stats are added to `metrics` if given.
+
+    With workers > 1 records are fanned out to a process pool whose workers
+    each load the NLP models once; a failing record yields an error instead
+    of stopping the run.
+    """
+    if workers <= 1:
+        processor = processor or build_processor(cache_path, cache_max_bytes)
+        experiences = iter(experiences)
+        # Parse each batch of texts with one nlp.pipe call
+        while True:
+            batch = list(islice(experiences, SPACY_BATCH_SIZE))
+            if not batch:
+                break
+            # Merged once the batch is done, so a batch retried record by record is not counted twice
+            batch_metrics = RunMetrics()
+            try:
+                results = processor.process_experiences(batch, metrics=batch_metrics)
+            except Exception:
+                batch_metrics = RunMetrics()
+                results = [_process_one(experience, processor, batch_metrics)[0] for experience in batch]
+            if metrics is not None:
+                metrics.merge(batch_metrics)
+            for processed in results:
+                yield processed, None if processed else "NLP processing returned no result"
+        log_cache_stats(processor)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_pool_worker,
+                              initargs=(cache_path, cache_max_bytes)) as pool:
+        for processed, error, record_metrics in pool.imap(_process_pooled, experiences, chunksize):
+            if metrics is not None:
+                metrics.merge(record_metrics)
+            yield processed, error
+
+def process_experience_stream(input_file, output_file, resume=True, workers=1, cache_path=None,
+                              cache_max_bytes=DEFAULT_MAX_BYTES, metrics_path=None, profile_path=None,
+                              search_index_dir=None, compact=False, aggregates_path=None):
+    """
+    Stream experiences from a JSON array or JSONL file into a JSONL output.
+
+    Each processed record is appended and checkpointed as soon as it is done,
+    so memory stays flat and a rerun resumes after the last committed record.
+    With `aggregates_path`, committed records are applied to those counters.
+    """
+    if compact:
+        output_file = compact_path(output_file)
+    logger.info(f"Streaming file: {input_file} -> {output_file}")
+
+    if not os.path.exists(input_file):
+        logger.error(f"Input file not found: {input_file}")
+        return
+
+    with JsonlCheckpointWriter(output_file, resume=resume, compact=compact, source=input_file) as writer:
+        if writer.untracked_output:
+            # Records have no stable key to skip by, so appending would duplicate them
+            logger.error(f"{output_file} already holds records without a checkpoint of this input to resume from; "
+                         f"move it away or choose another output")
+            return
+        start = writer.records_read
+        if start:
+            logger.info(f"Resuming after {start} already processed records")
+
+        metrics = RunMetrics()
+        processor = build_processor(cache_path, cache_max_bytes, profile=bool(profile_path)) if workers <= 1 else None
+        experiences = islice(iter_json_records(input_file), start, None)
+        results = iter_processed_experiences(experiences, processor=processor, workers=workers,
+                                             cache_path=cache_path, cache_max_bytes=cache_max_bytes, metrics=metrics)
+        unindexed = []
+        for i, (processed, error) in enumerate(results, start + 1):
+            logger.info(f"Processed experience {i}")
+            if processed:
+                writer.write(processed)
+                unindexed.append(processed)
+            else:
+                logger.error(f"Experience {i} failed: {error}")
+            writer.commit(i)
+            if len(unindexed) >= SPACY_BATCH_SIZE:
+                if search_index_dir:
+                    update_search_index(search_index_dir, unindexed)
+                if aggregates_path:
+                    commit_experiences(unindexed, aggregates_path)
+                unindexed = []
+        if search_index_dir and unindexed:
+            update_search_index(search_index_dir, unindexed)
+        if aggregates_path and unindexed:
+            commit_experiences(unindexed, aggregates_path)
+
+        logger.info(f"Streamed {writer.records_written} experiences to {output_file}")
+        report_run(metrics, metrics_path, processor, profile_path)
+        print(f"Processed {writer.records_written} experiences successfully")
+
+class NLPWorker:
+    """Long-lived worker that keeps one warm InterviewExperienceProcessor.
+
+    Requests and replies are newline-delimited JSON objects:
+        {"id": "1", "type": "process", "experience": {...}}
+        {"id": "2", "type": "commit", "records": [{...}]}
+        {"id": "3", "type": "health"}
+    A "commit" request reports experiences the server has stored (see
+    commit_experiences).
+    Every reply echoes the request id and carries an "ok" flag.
+    """
+
+    def __init__(self, processor=None):
+        self.started_at = time.time()
+        self.processor = processor or InterviewExperienceProcessor()
+        self.processed_count = 0
+        self.error_count = 0
+
+    def status(self):
+        """Health/readiness snapshot of this worker"""
+        return {
+            'status': 'ready',
+            'pid': os.getpid(),
+            'uptime': round(time.time() - self.started_at, 3),
+            'processed': self.processed_count,
+            'errors': self.error_count,
+            'nlp_tools_used': {
+                'nltk': self.processor.nltk_ready,
+                'spacy': self.processor.spacy_ready
+            },
+            'cache': self.processor.cache.stats() if self.processor.cache is not None else None,
+            'near_duplicates': (self.processor.near_duplicates.stats()
+                                if self.processor.near_duplicates is not None else None),
+            'aggregates': COMPANY_AGGREGATES,
+            'metrics': self.processor.metrics.summary()
+        }
+
+    def handle(self, request):
+        """Handle a single decoded request and return the reply dict"""
+        request_id = request.get('id')
+        request_type = request.get('type', 'process')
+
+        if request_type in ('health', 'ready', 'ping'):
+            return {'id': request_id, 'ok': True, **self.status()}
+
+        if request_type == 'commit':
+            records = request.get('records')
+            if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                return {'id': request_id, 'ok': False, 'error': "Missing 'records' list"}
+            return {'id': request_id, 'ok': True, 'committed': commit_experiences(records)}
+
+        if request_type != 'process':
+            return {'id': request_id, 'ok': False, 'error': f"Unknown request type: {request_type}"}
+
+        experience = request.get('experience')
+        if not isinstance(experience, dict):
+            return {'id': request_id, 'ok': False, 'error': "Missing 'experience' object"}
+
+        processed = self.processor.process_experience(experience)
+        if processed is None:
+            self.error_count += 1
+            return {'id': request_id, 'ok': False, 'error': 'NLP processing returned no result'}
+
+        self.processed_count += 1
+        return {'id': request_id, 'ok': True, 'result': processed}
+
+    def handle_line(self, line):
+        """Decode one request line and encode the reply line"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            reply = self.handle(request)
+        except Exception as e:
+            self.error_count += 1
+            reply = {'id': None, 'ok': False, 'error': f"Invalid request: {e}"}
+        return json.dumps(reply, ensure_ascii=False) + "\n"
+
+    def serve_stdio(self, stdin=sys.stdin, stdout=sys.stdout):
+        """Serve requests from stdin, one JSON object per line, until EOF"""
+        stdout.write(json.dumps({'id': None, 'type': 'ready', 'ok': True, **self.status()}) + "\n")
+        stdout.flush()
+
+        for line in stdin:
+            if not line.strip():
+                continue
+            stdout.write(self.handle_line(line))
+            stdout.flush()
+
+        logger.info(f"Worker stdin closed after {self.processed_count} experiences")
+
+    def serve_socket(self, socket_path, pool_size=1):
+        """Serve requests on a Unix socket.
+
+        Models are loaded once in the parent; each connection is handled in a
+        forked child that inherits the warm processor, with at most
+        ``pool_size`` connections served at a time.
+        """
+        import socketserver
+
+        worker = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode('utf-8')
+                    if not line.strip():
+                        continue
+                    self.wfile.write(worker.handle_line(line).encode('utf-8'))
+                    self.wfile.flush()
+
+        class _Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+            max_children = max(1, pool_size)
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        with _Server(socket_path, _Handler) as server:
+            logger.info(f"NLP worker listening on {socket_path} (pool size {pool_size})")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                logger.info("NLP worker shutting down")
+            finally:
+                if os.path.exists(socket_path):
+                    os.unlink(socket_path)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Process interview experiences with NLP")
+    parser.add_argument('input_file', nargs='?', help="Input JSON file with a list of experiences")
+    parser.add_argument('output_file', nargs='?', help="Output JSON file for processed experiences")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream records (JSON array or JSONL input) into a JSONL output, resumably")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="With --stream, ignore the last checkpoint and read the input from the start "
+                             "(an existing output must be moved away first)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Process records in a pool of N processes (file and --stream modes)")
+    parser.add_argument('--worker', action='store_true',
+                        help="Run as a long-lived worker reading newline-delimited JSON requests")
+    parser.add_argument('--socket', dest='socket_path',
+                        help="Serve worker requests on this Unix socket instead of stdin/stdout")
+    parser.add_argument('--pool-size', type=int, default=int(os.environ.get('NLP_WORKER_POOL_SIZE', 1)),
+                        help="Maximum concurrent connections served in socket mode")
+    parser.add_argument('--cache', dest='cache_path', default=os.environ.get('NLP_RESULT_CACHE'),
+                        help="SQLite file caching NLP results by text hash (default: $NLP_RESULT_CACHE)")
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Evict least recently used cache entries above this size")
+    parser.add_argument('--near-duplicate-index', default=NEAR_DUPLICATE_INDEX,
+                        help="MinHash index of processed texts; near-duplicate submissions are linked, not processed "
+                             "(default: $NLP_NEAR_DUPLICATE_INDEX)")
+    parser.add_argument('--duplicate-threshold', type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated Jaccard similarity at which a submission counts as a near-duplicate")
+    parser.add_argument('--search-index', dest='search_index_dir', nargs='?',
+                        const=os.path.join(SEARCH_INDEX_DIR, 'experiences'),
+                        help="Add processed experiences to this BM25 search index (default directory if no value)")
+    parser.add_argument('--aggregates', nargs='?', const=AGGREGATES_PATH,
+                        help="Count the written output in the per-company counters in this SQLite file and its "
+                             "JSON export (default path if no value)")
+    parser.add_argument('--commit', action='store_true',
+                        help="Apply the stored experiences given as JSON on stdin to $NLP_COMPANY_AGGREGATES and "
+                             "the search index ($NLP_SEARCH_INDEX), then exit")
+    parser.add_argument('--compact', action='store_true',
+                        help="Write minified JSONL, next to a .json output as .jsonl, with raw texts stored once in "
+                             "a '.texts' sidecar")
+    parser.add_argument('--metrics', dest='metrics_path',
+                        help="Write per-stage latency histograms and fallback counters for the run to this JSON file")
+    parser.add_argument('--profile', dest='profile_path',
+                        help="Write cProfile stats for the run to this file (single-process runs only)")
+    parser.add_argument('--sentiment-escalation', choices=['none', 'transformer'], default=SENTIMENT_ESCALATION,
+                        help="Escalate sentiment the VADER/keyword scores leave ambiguous (default: $NLP_SENTIMENT_ESCALATION)")
+    parser.add_argument('--sentiment-threshold', type=float, default=SENTIMENT_THRESHOLD,
+                        help="|VADER compound| below which sentiment counts as ambiguous")
+    parser.add_argument('--keyword-margin', type=int, default=KEYWORD_MARGIN,
+                        help="Keyword lead against VADER (or, without VADER, for a verdict) that counts as decisive")
+    args = parser.parse_args(argv)
+
+    if not (args.worker or args.commit) and not (args.input_file and args.output_file):
+        parser.error("input_file and output_file are required unless --worker or --commit is given")
+    return args
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python process_experience_nlp.py input_file.json output_file.json")
-        sys.exit(1)
-    
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    
-    process_experience_file(input_file, output_file)
\ No newline at end of file
+    args = parse_args()
+    cache_max_bytes = args.cache_max_mb * 1024 * 1024
+    SENTIMENT_ESCALATION = args.sentiment_escalation
+    SENTIMENT_THRESHOLD = args.sentiment_threshold
+    KEYWORD_MARGIN = args.keyword_margin
+    NEAR_DUPLICATE_INDEX = args.near_duplicate_index
+    NEAR_DUPLICATE_THRESHOLD = args.duplicate_threshold
+
+    if args.commit:
+        records = json.load(sys.stdin)
+        print(json.dumps({'ok': True, 'committed': commit_experiences(records if isinstance(records, list) else [records])}))
+    elif args.worker:
+        worker = NLPWorker(build_processor(args.cache_path, cache_max_bytes))
+        if args.socket_path:
+            worker.serve_socket(args.socket_path, pool_size=args.pool_size)
+        else:
+            worker.serve_stdio()
+    elif args.stream:
+        process_experience_stream(args.input_file, args.output_file, resume=not args.no_resume,
+                                  workers=args.workers, cache_path=args.cache_path,
+                                  cache_max_bytes=cache_max_bytes, metrics_path=args.metrics_path,
+                                  profile_path=args.profile_path, search_index_dir=args.search_index_dir, compact=args.compact,
+                                  aggregates_path=args.aggregates)
+    else:
+        process_experience_file(args.input_file, args.output_file, workers=args.workers,
+                                cache_path=args.cache_path, cache_max_bytes=cache_max_bytes,
+                                metrics_path=args.metrics_path, profile_path=args.profile_path,
+                                search_index_dir=args.search_index_dir, compact=args.compact,
+                                aggregates_path=args.aggregates)
@@ -2,23 +2,126 @@ import os
 os.environ["TRANSFORMERS_NO_TF"] = "1"
 
 import json
+import logging
+import multiprocessing
 import re
-import spacy
+import numpy as np
 from collections import defaultdict
+from functools import partial
+from itertools import islice
 
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer, util
+from company_aggregates import AGGREGATES_PATH, CompanyAggregates
+from compact_output import compact_path, write_compact
+from embedding_cache import EMBEDDING_CACHE_DIR, EmbeddingCache
+from enhanced_store import ENHANCED_STORE_PATH, EnhancedStore, content_key
+from model_registry import ModelRegistry
+from near_duplicates import DEFAULT_THRESHOLD as DEFAULT_DUPLICATE_THRESHOLD, NearDuplicateIndex, similarity
+from question_index import CanonicalQuestionIndex, QUESTION_INDEX_DIR
+from search_index import SEARCH_INDEX_DIR, SearchIndex
+from spacy_pipeline import SPACY_BATCH_SIZE, load_pipeline, parse_documents
+from stream_io import JsonlCheckpointWriter, iter_json_records
+from topic_classifier import TopicClassifier, topic_category
+from tiered_sentiment import DEFAULT_COMPOUND_THRESHOLD, DEFAULT_KEYWORD_MARGIN, TieredSentiment, load_vader
 
-# Load models once
-nlp = spacy.load("en_core_web_sm")
-sbert_model = SentenceTransformer("all-MiniLM-L6-v2")
-sentiment_pipeline = pipeline("sentiment-analysis")
+logger = logging.getLogger(__name__)
+
+# "torch" or "onnx" (int8 models exported with `python onnx_backend.py export`)
+INFERENCE_BACKEND = os.environ.get("NLP_INFERENCE_BACKEND", "torch")
+
+
+def _load_sbert():
+    if INFERENCE_BACKEND == "onnx":
+        from onnx_backend import OnnxSentenceEncoder
+        return OnnxSentenceEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("all-MiniLM-L6-v2")
+
+
+def _load_sentiment():
+    if INFERENCE_BACKEND == "onnx":
+        from onnx_backend import OnnxSentimentClassifier
+        return OnnxSentimentClassifier()
+    from transformers import pipeline
+    return pipeline("sentiment-analysis")
+
+
+# "tiered" settles clear cases with VADER/keywords and escalates only ambiguous texts
+# to the transformer; "full" runs the transformer on every text
+SENTIMENT_MODE = os.environ.get("NLP_SENTIMENT_MODE", "full")
+SENTIMENT_THRESHOLDS = {"compound_threshold": DEFAULT_COMPOUND_THRESHOLD, "keyword_margin": DEFAULT_KEYWORD_MARGIN}
+
+
+def _load_tiered_sentiment():
+    return TieredSentiment(_transformer_sentiments, vader=models.get("vader"), **SENTIMENT_THRESHOLDS)
+
+
+# Models are loaded on first use, so importing a helper costs nothing and a
+# run only loads what its stages need
+models = ModelRegistry()
+# Highlights and summaries only need sentence boundaries
+models.register("spacy", partial(load_pipeline, components=("senter",)))
+models.register("sbert", _load_sbert)
+models.register("sentiment", _load_sentiment)
+models.register("vader", load_vader)
+models.register("tiered_sentiment", _load_tiered_sentiment)
+# Topic centroids are embedded with the same model (and cache) as the questions
+models.register("topics", lambda: TopicClassifier(encode_questions))
+
+# Old module-level names, resolved through the registry
+_MODEL_ATTRS = {"nlp": "spacy", "sbert_model": "sbert", "sentiment_pipeline": "sentiment"}
+
+
+def __getattr__(name):
+    if name in _MODEL_ATTRS:
+        return models.get(_MODEL_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Question embeddings are cached per model/backend; NLP_EMBEDDING_CACHE=off always encodes
+EMBEDDING_CACHE = os.environ.get("NLP_EMBEDDING_CACHE", EMBEDDING_CACHE_DIR)
+_embedding_cache = None
+
+
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None and EMBEDDING_CACHE and EMBEDDING_CACHE != "off":
+        _embedding_cache = EmbeddingCache(os.path.join(EMBEDDING_CACHE, f"all-MiniLM-L6-v2-{INFERENCE_BACKEND}"))
+    return _embedding_cache
+
+
+def save_embedding_cache(report=False):
+    cache = _embedding_cache
+    if cache is not None:
+        cache.save()
+        if report:
+            print(f"[✓] Embedding cache: {cache.stats()}")
+
+
+# Optional enrichment stages and the model each one loads; rounds, verdict etc. are always extracted
+STAGE_MODELS = {"highlights": "spacy", "dedup": "sbert", "topics": "sbert", "sentiment": "sentiment"}
+STAGES = tuple(STAGE_MODELS)
+
+# Adding "sentiment_windows" to the stages scores sentiment over sentence windows
+# of the whole document instead of its first 512 characters
+SENTIMENT_WINDOWS = "sentiment_windows"
+# spaCy tokens per window, leaving headroom for wordpiece splits under the model's 512
+WINDOW_TOKENS = 384
+MAX_SENTIMENT_CHUNKS = int(os.environ.get("NLP_SENTIMENT_MAX_CHUNKS", 8))
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 RAW_DATA_PATH = os.path.join(DATA_DIR, 'raw_data.json')
 ENHANCED_DATA_PATH = os.path.join(DATA_DIR, 'enhanced_gfg_data.json')
 
+# Raw entries near-duplicating an enriched one (MinHash Jaccard >= threshold) are
+# linked to it in this index instead of being enriched; off unless a path is set
+NEAR_DUPLICATE_INDEX = os.environ.get("NLP_GFG_NEAR_DUPLICATE_INDEX")
+NEAR_DUPLICATE_INDEX_PATH = os.path.join(DATA_DIR, 'gfg_near_duplicates.sqlite')
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NLP_NEAR_DUPLICATE_THRESHOLD", DEFAULT_DUPLICATE_THRESHOLD))
+
+# Per-company counters shared with the experience pipeline (corpus "gfg"); off
+# unless a path is set, as on the experience side
+COMPANY_AGGREGATES = os.environ.get("NLP_COMPANY_AGGREGATES")
+
 
 # Normalize round names
 ROUND_MAPPING = {
@@ -36,76 +139,180 @@ ROUND_MAPPING = {
     "exploratory round": "Initial Screening"
 }
 
-def normalize_round_name(name):
+VERDICT_KEYWORDS = {
+    "selected": "Selected",
+    "rejected": "Rejected",
+    "not selected": "Rejected",
+    "shortlisted": "Shortlisted",
+}
+
+QUESTION_PREFIXES = ("what", "why", "how", "could", "do", "explain", "when", "which", "are", "did", "describe",
+                     "have", "name")
+
+# Every round/verdict keyword occurrence in one scan; the lookahead also reports
+# keywords that overlap or sit inside others (e.g. "selected" in "not selected")
+_LINE_KEYWORD_RE = re.compile("(?=(" + "|".join(
+    re.escape(key) for key in sorted({*ROUND_MAPPING, *VERDICT_KEYWORDS}, key=len, reverse=True)) + "))")
+_ROUND_PRIORITY = {key: i for i, key in enumerate(ROUND_MAPPING)}
+_VERDICT_PRIORITY = {key: i for i, key in enumerate(VERDICT_KEYWORDS)}
+
+ROUND_KEYWORDS = ["Online Assessment", "Technical", "HR", "Managerial", "Coding", "Aptitude", "Telephonic",
+                  "Group Discussion"]
+_ROUND_KEYWORD_RE = re.compile(r"(?i)\b(" + "|".join(re.escape(r) for r in ROUND_KEYWORDS) + r")\b")
+_ROUND_KEYWORD_NAMES = {r.lower(): r for r in ROUND_KEYWORDS}
+
+
+def _first_by_priority(found, priority):
+    return min((key for key in found if key in priority), key=priority.get, default=None)
+
+
+def normalize_round_name(name, found=None):
+    """`found`: the line's keyword matches, when the caller has already scanned it"""
     name = name.lower().strip()
-    for key in ROUND_MAPPING:
-        if key in name:
-            return ROUND_MAPPING[key]
-    return name.title()
+    key = _first_by_priority(_LINE_KEYWORD_RE.findall(name) if found is None else found, _ROUND_PRIORITY)
+    return ROUND_MAPPING[key] if key is not None else name.title()
 
-def extract_verdict(text):
-    verdict_keywords = {
-        "selected": "Selected",
-        "rejected": "Rejected",
-        "not selected": "Rejected",
-        "shortlisted": "Shortlisted",
-    }
-    for line in text.split("\n"):
-        for key in verdict_keywords:
-            if key in line.lower():
-                return verdict_keywords[key]
-    return ""
-
-def deduplicate_questions_semantically(questions, threshold=0.8):
-    embeddings = sbert_model.encode(questions, convert_to_tensor=True)
-    deduped = []
-    used = set()
-
-    for i, q in enumerate(questions):
-        if i in used:
-            continue
-        deduped.append(q)
-        for j in range(i + 1, len(questions)):
-            if j not in used and util.cos_sim(embeddings[i], embeddings[j]) > threshold:
-                used.add(j)
-    return deduped
 
+def classify_line(line):
+    """
+    (kind, value, verdict) for a stripped line: kind is "round" (value: the
+    normalized round name), "question" (value: the line), "verdict" or
+    "other". `verdict` is the line's verdict, or "" if it names none, for
+    every kind, since a round header can also carry the result.
+    """
+    lower = line.lower()
+    found = _LINE_KEYWORD_RE.findall(lower)
+    verdict_key = _first_by_priority(found, _VERDICT_PRIORITY) if found else None
+    verdict = VERDICT_KEYWORDS[verdict_key] if verdict_key is not None else ""
+
+    if lower.startswith("round") or (found and any(key in _ROUND_PRIORITY for key in found)):
+        return "round", normalize_round_name(lower, found), verdict
+    if len(line) >= 10 and (lower.endswith("?") or lower.startswith(QUESTION_PREFIXES)):
+        return "question", line, verdict
+    return ("verdict" if verdict else "other"), None, verdict
 
-def extract_questions_by_round(content):
+
+def scan_lines(content):
+    """
+    One walk over the lines of `content`: candidate questions grouped by round
+    header (without deduplication) and the verdict of the first line naming one.
+    """
     rounds = defaultdict(list)
     current_round = "General"
+    verdict = ""
 
     for line in content.split("\n"):
-        line = line.strip()
+        kind, value, line_verdict = classify_line(line.strip())
+        if line_verdict and not verdict:
+            verdict = line_verdict
+        if kind == "round":
+            current_round = value
+        elif kind == "question":
+            rounds[current_round].append(value)
 
-        # Detect round headers
-        if re.match(r"(?i)^round\s*\d*[:\-]?\s*", line):
-            current_round = normalize_round_name(line)
-            continue
-        elif any(keyword in line.lower() for keyword in ROUND_MAPPING.keys()):
-            current_round = normalize_round_name(line)
+    return rounds, verdict
+
+
+def extract_verdict(text):
+    return scan_lines(text)[1]
+
+# Above this many questions, dedup compares only LSH bucket neighbours
+# instead of building the full n x n similarity matrix
+LSH_MIN_QUESTIONS = 256
+LSH_BANDS = 16
+LSH_ROWS_PER_BAND = 8
+LSH_SEED = 13
+
+
+def _greedy_dedup_dense(embeddings, threshold):
+    """Greedy clustering on one similarity matrix; returns kept indices."""
+    similarity = embeddings @ embeddings.T
+    used = np.zeros(len(embeddings), dtype=bool)
+    keep = []
+    for i in range(len(embeddings)):
+        if used[i]:
             continue
+        keep.append(i)
+        used |= similarity[i] > threshold
+    return keep
+
 
-        # Filter actual questions
-        if (
-            len(line) < 10 or
-            not re.search(r"\?$|^(what|why|how|could|do|explain|when|which|are|did|describe|have|name)", line.lower())
-        ):
+def _lsh_buckets(embeddings, bands=LSH_BANDS, rows=LSH_ROWS_PER_BAND, seed=LSH_SEED):
+    """Random-hyperplane LSH: per band, map signature -> list of row indices."""
+    rng = np.random.default_rng(seed)
+    planes = rng.standard_normal((embeddings.shape[1], bands * rows)).astype(embeddings.dtype)
+    bits = (embeddings @ planes) > 0
+    weights = 1 << np.arange(rows, dtype=np.int64)
+    keys = bits.reshape(len(embeddings), bands, rows).astype(np.int64) @ weights
+
+    buckets = []
+    for band in range(bands):
+        table = defaultdict(list)
+        for i, key in enumerate(keys[:, band]):
+            table[key].append(i)
+        buckets.append(table)
+    return keys, buckets
+
+
+def _greedy_dedup_lsh(embeddings, threshold):
+    """Same greedy clustering, but only scoring LSH candidate neighbours."""
+    keys, buckets = _lsh_buckets(embeddings)
+    used = np.zeros(len(embeddings), dtype=bool)
+    keep = []
+    for i in range(len(embeddings)):
+        if used[i]:
             continue
+        keep.append(i)
+        candidates = set()
+        for band, table in enumerate(buckets):
+            candidates.update(table[keys[i, band]])
+        candidates = np.fromiter((j for j in candidates if j > i and not used[j]), dtype=np.int64)
+        if len(candidates):
+            scores = embeddings[candidates] @ embeddings[i]
+            used[candidates[scores > threshold]] = True
+    return keep
+
+
+def deduplicate_questions_semantically(questions, threshold=0.8, embeddings=None):
+    """
+    Drop questions whose cosine similarity to an earlier kept question exceeds
+    `threshold`. `embeddings`, if given, must be L2-normalized rows aligned with
+    `questions`.
+    """
+    if len(questions) < 2:
+        return list(questions)
+    if embeddings is None:
+        embeddings = encode_questions(questions)
+
+    if len(questions) >= LSH_MIN_QUESTIONS:
+        keep = _greedy_dedup_lsh(embeddings, threshold)
+    else:
+        keep = _greedy_dedup_dense(embeddings, threshold)
+    return [questions[i] for i in keep]
+
+
+def split_questions_by_round(content):
+    """Group candidate question lines by round header, without deduplication."""
+    return scan_lines(content)[0]
 
-        rounds[current_round].append(line)
+
+def extract_questions_by_round(content):
+    rounds = split_questions_by_round(content)
 
     # Deduplicate + add topics
     final = {}
     for round_name, qs in rounds.items():
-        deduped = deduplicate_questions_semantically(qs)
-        final[round_name] = [{"question": q} for q in deduped]
+        embeddings = encode_questions(qs)
+        topics = dict(zip(qs, models.get("topics").classify(embeddings)))
+        deduped = deduplicate_questions_semantically(qs, embeddings=embeddings)
+        final[round_name] = [{"question": q, "topic": topics[q], "category": topic_category(topics[q])}
+                             for q in deduped]
 
 
     return final
 
-def extract_highlights(text, max_sentences=8):
-    doc = nlp(text)
+def extract_highlights(text, max_sentences=8, doc=None):
+    doc = doc if doc is not None else models.get("spacy")(text)
     highlights = []
     seen = set()
 
@@ -140,8 +347,79 @@ def analyze_sentiment(text):
     Analyze sentiment using Hugging Face Transformers.
     Returns 'POSITIVE' or 'NEGATIVE'.
     """
-    result = sentiment_pipeline(text[:512])
-    return result[0]['label']
+    return classify_sentiments([text])[0][0]
+
+
+def sentence_windows(text, doc=None, max_tokens=WINDOW_TOKENS, max_chunks=None):
+    """
+    Split `text` into windows of consecutive sentences of at most `max_tokens`
+    tokens, using the spaCy sentences of `doc` when available. At most
+    `max_chunks` windows are kept, spread evenly and always including the
+    first and last (where the verdict and closing feedback usually are).
+    """
+    max_chunks = max_chunks or MAX_SENTIMENT_CHUNKS
+    if doc is not None:
+        sentences = [(sent.text.strip(), len(sent)) for sent in doc.sents]
+    else:
+        sentences = [(sent.strip(), len(sent.split())) for sent in re.split(r"(?<=[.!?])\s+|\n+", text)]
+
+    windows, current, size = [], [], 0
+    for sentence, tokens in sentences:
+        if not sentence:
+            continue
+        if current and size + tokens > max_tokens:
+            windows.append(" ".join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += tokens
+    if current:
+        windows.append(" ".join(current))
+
+    if len(windows) > max_chunks:
+        keep = np.unique(np.linspace(0, len(windows) - 1, max_chunks).round().astype(int))
+        windows = [windows[i] for i in keep]
+    return windows or [text[:512]]
+
+
+def _transformer_sentiments(inputs, batch_size=16):
+    """
+    (label, chunk scores) per input. A text input is scored on its first 512
+    characters (chunk scores None); a list of sentence windows has every
+    window scored and gets the length-weighted polarity as its label. All
+    windows of all inputs go through one batched call.
+    """
+    windows = [item if isinstance(item, list) else [item[:512]] for item in inputs]
+    flat = [window for item_windows in windows for window in item_windows]
+    scored = models.get("sentiment")(flat, batch_size=batch_size, truncation=True) if flat else []
+
+    results = []
+    offset = 0
+    for item, item_windows in zip(inputs, windows):
+        item_scores = scored[offset:offset + len(item_windows)]
+        offset += len(item_windows)
+        if not isinstance(item, list):
+            results.append((item_scores[0]["label"], None))
+            continue
+
+        polarity = sum((1 if s["label"] == "POSITIVE" else -1) * s["score"] * len(w)
+                       for s, w in zip(item_scores, item_windows))
+        label = "POSITIVE" if polarity >= 0 else "NEGATIVE"
+        results.append((label, [{"label": s["label"], "score": round(float(s["score"]), 4)} for s in item_scores]))
+    return results
+
+
+def classify_sentiments(texts, batch_size=16, windows=None):
+    """
+    (label, chunk scores) per text, with label 'POSITIVE' or 'NEGATIVE'. With
+    `windows` (sentence windows per text) the transformer scores every window
+    instead of text[:512]. In tiered mode only ambiguous texts reach the
+    transformer; the others get chunk scores None.
+    """
+    inputs = texts if windows is None else windows
+    if SENTIMENT_MODE == "full":
+        return _transformer_sentiments(inputs, batch_size)
+    results = models.get("tiered_sentiment").classify(texts, batch_size, inputs=inputs)
+    return [value if tier == "transformer" else (value.upper(), None) for value, tier in results]
 
 # def analyze_sentiment_transformer(text):
 #     try:
@@ -150,7 +428,27 @@ def analyze_sentiment(text):
 #     except:
 #         return "Neutral"
 
-def extract_metadata(entry):
+# Batch sizes used when a whole set of entries goes through the models at once
+ENCODE_BATCH_SIZE = 64
+SENTIMENT_BATCH_SIZE = 16
+ENTRY_BATCH_SIZE = 256
+
+
+def encode_questions(questions, batch_size=ENCODE_BATCH_SIZE):
+    """L2-normalized SBERT embeddings of `questions`; only embedding cache misses are encoded"""
+    def encode(texts):
+        return models.get("sbert").encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                          normalize_embeddings=True)
+
+    cache = get_embedding_cache()
+    return cache.get_or_encode(questions, encode, batch_size=batch_size) if cache is not None else encode(questions)
+
+
+def extract_text_metadata(entry, doc=None, highlights=True, windows=False, verdict=None):
+    """
+    Everything extract_metadata derives without the SBERT/sentiment models.
+    `verdict` skips the line scan when the caller already has it from scan_lines.
+    """
     title = entry.get("title", "")
     content = entry.get("content", "")
 
@@ -159,38 +457,225 @@ def extract_metadata(entry):
     role_match = re.search(r"for ([A-Za-z0-9()+\- ]+)", title, re.IGNORECASE)
     role = role_match.group(1).strip() if role_match else ""
 
-    round_keywords = ["Online Assessment", "Technical", "HR", "Managerial", "Coding", "Aptitude", "Telephonic", "Group Discussion"]
-    found_rounds = list({r for r in round_keywords if re.search(rf"(?i)\b{re.escape(r)}\b", content)})
+    found_rounds = list({_ROUND_KEYWORD_NAMES[r.lower()] for r in _ROUND_KEYWORD_RE.findall(content)})
 
     diff_match = re.search(r"(easy|medium|moderate|hard|difficult|tough)", content.lower())
     difficulty = {"easy": "Easy", "medium": "Medium", "moderate": "Medium", "hard": "Hard", "difficult": "Hard", "tough": "Hard"}.get(diff_match.group(1)) if diff_match else ""
 
-    verdict = extract_verdict(content)
-    questions_by_round = extract_questions_by_round(content)
-    total_questions = sum(len(v) for v in   questions_by_round.values())
-    highlights = extract_highlights(content)
-    sentiment = analyze_sentiment(content)
-
-    return {
+    meta = {
         "company": company,
         "role": role,
         "rounds": found_rounds,
         "difficulty": difficulty,
-        "verdict": verdict,
-        "question_count": total_questions,
-        "questions_by_round": questions_by_round,
-        "highlights": highlights,
-        "feedback_sentiment": sentiment
+        "verdict": extract_verdict(content) if verdict is None else verdict,
+        "highlights": extract_highlights(content, doc=doc) if highlights else [],
     }
-def process_enhanced_pipeline(input_file=RAW_DATA_PATH, output_file=ENHANCED_DATA_PATH):
+    if windows:
+        meta["sentiment_windows"] = sentence_windows(content, doc=doc)
+    return meta
+
+
+def extract_text_stage(entry, doc=None, highlights=True, windows=False):
+    """Per-entry CPU work (regexes, spaCy parse) that needs no batched model."""
+    rounds, verdict = scan_lines(entry.get("content", ""))
+    return extract_text_metadata(entry, doc=doc, highlights=highlights, windows=windows, verdict=verdict), rounds
+
+
+def _init_text_worker(stages=STAGES):
+    # Warm the spaCy pipeline once per pool process, if highlights need it
+    if "highlights" in stages:
+        models.get("spacy")("warm up")
+
+
+def _text_stages_or_errors(entries, stages=STAGES):
+    """extract_text_stage over a list of entries with one nlp.pipe call; errors are per entry"""
+    highlights = "highlights" in stages
+    windows = SENTIMENT_WINDOWS in stages and "sentiment" in stages
+    docs = [None] * len(entries)
+    if highlights:
+        docs = parse_documents(models.get("spacy"), [entry.get("content", "") for entry in entries],
+                               batch_size=SPACY_BATCH_SIZE)
+    results = []
+    for entry, doc in zip(entries, docs):
+        try:
+            results.append((extract_text_stage(entry, doc, highlights=highlights, windows=windows), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def extract_metadata_batch(entries, encode_batch_size=ENCODE_BATCH_SIZE, sentiment_batch_size=SENTIMENT_BATCH_SIZE,
+                           text_stages=None, stages=STAGES):
+    """
+    Batched extract_metadata: gather every question and sentiment input from
+    all entries, run each model once over the whole set in fixed-size batches,
+    then scatter the results back per entry. `text_stages` may carry
+    precomputed extract_text_stage results (e.g. from a process pool).
+    Only the models of the selected `stages` are loaded; a skipped stage
+    leaves questions undeduplicated or untagged, highlights empty or sentiment None.
+    """
+    contents = [entry.get("content", "") for entry in entries]
+    windows = SENTIMENT_WINDOWS in stages and "sentiment" in stages
+    if text_stages is None:
+        highlights = "highlights" in stages
+        docs = [None] * len(entries)
+        if highlights:
+            docs = parse_documents(models.get("spacy"), contents, batch_size=SPACY_BATCH_SIZE)
+        text_stages = [extract_text_stage(entry, doc, highlights=highlights, windows=windows)
+                       for entry, doc in zip(entries, docs)]
+    text_metadata = [meta for meta, _ in text_stages]
+    raw_rounds = [rounds for _, rounds in text_stages]
+
+    # One SBERT pass over every question of every round of every entry
+    all_questions = [q for rounds in raw_rounds for qs in rounds.values() for q in qs]
+    embeddings = topics = None
+    if all_questions and ("dedup" in stages or "topics" in stages):
+        embeddings = encode_questions(all_questions, batch_size=encode_batch_size)
+    # Topics for every question with one matrix product over the same embeddings
+    if embeddings is not None and "topics" in stages:
+        topics = models.get("topics").classify(embeddings)
+
+    # One batched sentiment call over all entries
+    sentiments = [(None, None)] * len(contents)
+    if contents and "sentiment" in stages:
+        sentiments = classify_sentiments(contents, batch_size=sentiment_batch_size,
+                                         windows=[meta["sentiment_windows"] for meta in text_metadata]
+                                         if windows else None)
+
+    results = []
+    offset = 0
+    for meta, rounds, (sentiment, chunk_scores) in zip(text_metadata, raw_rounds, sentiments):
+        questions_by_round = {}
+        for round_name, qs in rounds.items():
+            round_topics = {}
+            if embeddings is not None:
+                round_embeddings = embeddings[offset:offset + len(qs)]
+                if topics is not None:
+                    round_topics = dict(zip(qs, topics[offset:offset + len(qs)]))
+                offset += len(qs)
+                if "dedup" in stages:
+                    qs = deduplicate_questions_semantically(qs, embeddings=round_embeddings)
+            questions_by_round[round_name] = [
+                {"question": q, "topic": round_topics[q], "category": topic_category(round_topics[q])}
+                if round_topics else {"question": q} for q in qs]
+
+        result = {
+            "company": meta["company"],
+            "role": meta["role"],
+            "rounds": meta["rounds"],
+            "difficulty": meta["difficulty"],
+            "verdict": meta["verdict"],
+            "question_count": sum(len(v) for v in questions_by_round.values()),
+            "questions_by_round": questions_by_round,
+            "highlights": meta["highlights"],
+            "feedback_sentiment": sentiment
+        }
+        if windows:
+            result["sentiment_chunks"] = chunk_scores or []
+        results.append(result)
+    return results
+
+
+def extract_metadata(entry):
+    return extract_metadata_batch([entry])[0]
+
+
+def uses_sbert(stages):
+    """Whether a selected stage already loads SBERT"""
+    return any(STAGE_MODELS.get(stage) == "sbert" for stage in stages)
+
+
+def update_question_index(entries, index_dir=QUESTION_INDEX_DIR, backfill=(), key=None):
+    """
+    Assign every question of `entries` to a canonical cluster and store its
+    `cluster_id` on the question dict. `backfill` entries are indexed too when
+    the index is still empty (first run over an existing corpus).
+
+    The index is saved before the entries are written, so every stored
+    `cluster_id` exists in it. Frequencies are counted once per entry `key`
+    (the title by default), so entries enriched again after a crash before
+    their output was written are not counted twice.
+
+    The pipelines update the index by default, but only when dedup or topics
+    is among their stages: the index needs SBERT embeddings, which those
+    stages have just computed (and cached) for the same questions.
+    """
+    key = key or _title_key
+    index = CanonicalQuestionIndex(index_dir)
+    if not len(index):
+        entries = list(backfill) + list(entries)
+
+    records, questions = [], []
+    for entry in entries:
+        for round_name, round_questions in entry.get("questions_by_round", {}).items():
+            for q in round_questions:
+                records.append({"question": q["question"], "company": entry.get("company", ""), "round": round_name,
+                                "key": key(entry)})
+                questions.append(q)
+
+    if not records:
+        return index
+
+    embeddings = encode_questions([r["question"] for r in records])
+    index.dim = embeddings.shape[1]
+    for q, cluster_id in zip(questions, index.assign(records, embeddings)):
+        q["cluster_id"] = cluster_id
+    index.save()
+    save_embedding_cache()
+
+    print(f"[✓] Indexed {len(records)} questions into {len(index)} canonical clusters")
+    return index
+
+
+def update_search_index(entries, index_dir=os.path.join(SEARCH_INDEX_DIR, "gfg"), backfill=()):
+    """
+    Add `entries` to the BM25 search index; `backfill` entries are added first
+    when the index is still empty (first run over an existing corpus).
+    """
+    index = SearchIndex.for_corpus("gfg", index_dir)
+    if not len(index):
+        index.add(backfill)
+    added = index.add(entries)
+    print(f"[✓] Search index: {added} entries added, {len(index)} total")
+    return index
+
+
+def update_company_aggregates(entries, backfill=()):
+    """
+    Apply the deltas of committed `entries` to the per-company counters and
+    re-export them; `backfill` entries are counted first when the corpus has
+    no counters yet (first run over an existing corpus). Does nothing unless
+    COMPANY_AGGREGATES is set.
+    """
+    if not COMPANY_AGGREGATES:
+        return
+    aggregates = CompanyAggregates(COMPANY_AGGREGATES)
+    if not aggregates.count("gfg"):
+        aggregates.add("gfg", backfill)
+    changed = aggregates.add("gfg", entries)
+    aggregates.export()
+    print(f"[✓] Company aggregates: {changed} entries counted, {aggregates.count('gfg')} total")
+    aggregates.close()
+
+
+def process_enhanced_pipeline(input_file=RAW_DATA_PATH, output_file=ENHANCED_DATA_PATH, build_question_index=True,
+                              entry_batch_size=ENTRY_BATCH_SIZE, encode_batch_size=ENCODE_BATCH_SIZE,
+                              sentiment_batch_size=SENTIMENT_BATCH_SIZE, workers=1, stages=STAGES,
+                              build_search_index=True, build_aggregates=True, compact=False):
     # Load raw data (new experiences)
     with open(input_file, "r", encoding="utf-8") as f:
         raw_data = json.load(f)
 
+    # A compact output goes next to the JSON array, which the frontend keeps reading;
+    # once it exists it is the one to extend
+    json_file = output_file
+    if compact:
+        output_file = compact_path(output_file)
+    existing_file = output_file if os.path.exists(output_file) else json_file
+
     # Load existing enhanced data if exists
-    if os.path.exists(output_file):
-        with open(output_file, "r", encoding="utf-8") as ef:
-            existing_enhanced = json.load(ef)
+    if os.path.exists(existing_file):
+        existing_enhanced = list(iter_json_records(existing_file))
     else:
         existing_enhanced = []
 
@@ -198,32 +683,362 @@ def process_enhanced_pipeline(input_file=RAW_DATA_PATH, output_file=ENHANCED_DAT
     already_titles = {entry['title'] for entry in existing_enhanced if 'title' in entry}
     new_enriched = []
 
-    for entry in raw_data:
-        if entry.get("title") not in already_titles:
-            new_enriched.append({**entry, **extract_metadata(entry)})
+    # Run the models over fixed-size chunks of entries to bound memory
+    near_duplicates = open_near_duplicate_index(existing_enhanced, _title_key)
+    for _, enriched in iter_enriched_entries(raw_data, already_titles, entry_batch_size=entry_batch_size,
+                                             encode_batch_size=encode_batch_size,
+                                             sentiment_batch_size=sentiment_batch_size, workers=workers,
+                                             stages=stages, near_duplicates=near_duplicates):
+        new_enriched.extend(enriched)
+
+    # Map new questions onto the corpus-wide canonical question clusters
+    if build_question_index and uses_sbert(stages):
+        update_question_index(new_enriched, backfill=existing_enhanced)
 
     # Merge and write back
     merged = existing_enhanced + new_enriched
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(merged, f, indent=2, ensure_ascii=False)
+    if compact:
+        write_compact(merged, output_file)
+    else:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2, ensure_ascii=False)
+
+    if build_search_index:
+        update_search_index(new_enriched, backfill=existing_enhanced)
+    if build_aggregates:
+        update_company_aggregates(new_enriched, backfill=existing_enhanced)
 
     print(f"[✓] Appended {len(new_enriched)} entries to '{output_file}'")
 
 
 
-def summarize_text_spacy(text, max_sentences=3):
+def _title_key(entry):
+    return entry.get("title")
+
+
+def open_near_duplicate_index(backfill=(), key=_title_key):
+    """
+    The NEAR_DUPLICATE_INDEX, or None when disabled. An empty index is first
+    seeded with the `backfill` records (the existing enriched corpus).
+    """
+    if not NEAR_DUPLICATE_INDEX:
+        return None
+    index = NearDuplicateIndex(NEAR_DUPLICATE_INDEX, threshold=NEAR_DUPLICATE_THRESHOLD)
+    if not len(index):
+        seeded = sum(index.add(key(record), record.get("content", ""), commit=False) for record in backfill)
+        index.commit()
+        if seeded:
+            print(f"[✓] Seeded near-duplicate index with {seeded} existing entries")
+    return index
+
+
+def iter_enriched_entries(entries, skip_keys=(), entry_batch_size=ENTRY_BATCH_SIZE,
+                          encode_batch_size=ENCODE_BATCH_SIZE, sentiment_batch_size=SENTIMENT_BATCH_SIZE,
+                          workers=1, key=_title_key, stages=STAGES, near_duplicates=None):
+    """
+    Yield (consumed, enriched) per chunk of `entries`, where every input entry
+    before `consumed` has been handled and `enriched` holds the new records of
+    that chunk. Entries whose `key(entry)` is in `skip_keys` (any container, e.g.
+    an EnhancedStore) or repeats within this run are skipped.
+
+    With workers > 1 the per-entry text stage runs in a process pool while the
+    batched SBERT/sentiment stage stays in this process. Entries that fail are
+    logged and left out, and `consumed` stops at the first of them, so a
+    resumed stream run reads them again and retries them. `stages` selects the
+    optional enrichment stages (see STAGES).
+
+    With a `near_duplicates` index, entries whose content near-duplicates an
+    indexed one are linked to it there and skipped. Entries are indexed once
+    enriched, committed once their chunk has been consumed; an entry that
+    near-duplicates one enriched in the same chunk waits for the next chunk,
+    so it is never linked to an entry that then fails.
+    """
+    seen = set()
+    entries = enumerate(entries)
+    # Entries that near-duplicate another entry still being enriched wait for the next chunk,
+    # when that entry is indexed (and they are linked to it) or has failed (and they are enriched)
+    deferred = []
+    read = 0
+    first_failed = None
+    linked = 0
+    pool = multiprocessing.Pool(workers, initializer=_init_text_worker, initargs=(stages,)) if workers > 1 else None
+    text_stages = partial(_text_stages_or_errors, stages=stages)
+
+    try:
+        while True:
+            fresh = list(islice(entries, max(1, entry_batch_size - len(deferred))))
+            if not fresh and not deferred:
+                return
+            if fresh:
+                read = fresh[-1][0] + 1
+
+            new_entries = []
+            positions = []
+            signatures = []
+            waiting = []
+            for carried, (position, entry) in [(True, item) for item in deferred] + [(False, item) for item in fresh]:
+                entry_key = key(entry)
+                if not carried:
+                    if entry_key in seen or entry_key in skip_keys:
+                        continue
+                    seen.add(entry_key)
+                if near_duplicates is not None:
+                    signature = near_duplicates.hasher.signature(entry.get("content", ""))
+                    if signature is not None:
+                        match = near_duplicates.find(signature, exclude=entry_key)
+                        if match is not None:
+                            near_duplicates.link(entry_key, *match, commit=False)
+                            linked += 1
+                            continue
+                        if any(similarity(signature, other) >= near_duplicates.threshold
+                               for other in signatures if other is not None):
+                            waiting.append((position, entry))
+                            continue
+                    signatures.append(signature)
+                new_entries.append(entry)
+                positions.append(position)
+            deferred = waiting
+
+            # Each pool task pipes a slice of entries through spaCy in one call
+            if pool:
+                step = max(1, -(-len(new_entries) // workers))
+                slices = [new_entries[i:i + step] for i in range(0, len(new_entries), step)]
+                results = [result for part in pool.map(text_stages, slices) for result in part]
+            else:
+                results = text_stages(new_entries)
+
+            ok_entries, ok_stages = [], []
+            for position, entry, (stage, error) in zip(positions, new_entries, results):
+                if error:
+                    logger.warning(f"Skipping '{entry.get('title', '')}': {error}")
+                    if first_failed is None:
+                        first_failed = position
+                    continue
+                ok_entries.append(entry)
+                ok_stages.append(stage)
+
+            metadata = extract_metadata_batch(ok_entries, encode_batch_size=encode_batch_size,
+                                              sentiment_batch_size=sentiment_batch_size,
+                                              text_stages=ok_stages, stages=stages) if ok_entries else []
+            # Only entries that made it into the output become link targets
+            if near_duplicates is not None:
+                for entry in ok_entries:
+                    near_duplicates.add(key(entry), entry.get("content", ""), commit=False)
+            consumed = deferred[0][0] if deferred else read
+            if first_failed is not None:
+                consumed = min(consumed, first_failed)
+            yield consumed, [{**entry, **meta} for entry, meta in zip(ok_entries, metadata)]
+            if near_duplicates is not None:
+                near_duplicates.commit()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if near_duplicates is not None:
+            print(f"[✓] Linked {linked} near-duplicate entries: {near_duplicates.stats()}")
+        save_embedding_cache(report=True)
+        if models.is_loaded("tiered_sentiment"):
+            print(f"[✓] Tiered sentiment: {models.get('tiered_sentiment').stats()}")
+
+
+def process_enhanced_pipeline_stream(input_file=RAW_DATA_PATH, output_file=ENHANCED_DATA_PATH + "l",
+                                     build_question_index=True, resume=True, build_search_index=True,
+                                     build_aggregates=True, compact=False, **options):
+    """
+    Streaming variant of process_enhanced_pipeline with a JSONL output.
+
+    Raw entries are read record by record, enriched one chunk at a time and
+    appended to `output_file`, which is never rewritten. Only titles of the
+    existing output are kept in memory, and entries with those titles are
+    skipped. A checkpoint lets an interrupted run resume after the last
+    committed chunk without reading the input from the start.
+    """
+    build_question_index = build_question_index and uses_sbert(options.get("stages", STAGES))
+    if compact:
+        output_file = compact_path(output_file)
+    with JsonlCheckpointWriter(output_file, resume=resume, compact=compact, source=input_file) as writer:
+        start = writer.records_read
+        already_titles = set()
+        if os.path.getsize(output_file):
+            already_titles = {entry.get("title") for entry in iter_json_records(output_file)}
+
+        raw_entries = islice(iter_json_records(input_file), start, None)
+        near_duplicates = open_near_duplicate_index(iter_json_records(output_file))
+        for consumed, enriched in iter_enriched_entries(raw_entries, already_titles,
+                                                        near_duplicates=near_duplicates, **options):
+            # Backfill is only read if the question index is still empty
+            if build_question_index and enriched:
+                update_question_index(enriched, backfill=iter_json_records(output_file))
+            for record in enriched:
+                writer.write(record)
+            writer.commit(start + consumed)
+            if build_search_index and enriched:
+                update_search_index(enriched, backfill=iter_json_records(output_file))
+            if build_aggregates and enriched:
+                update_company_aggregates(enriched, backfill=iter_json_records(output_file))
+
+    print(f"[✓] Appended {writer.records_written} entries to '{output_file}'")
+
+
+def process_enhanced_pipeline_store(input_file=RAW_DATA_PATH, store_path=ENHANCED_STORE_PATH,
+                                    export_file=ENHANCED_DATA_PATH, build_question_index=True, build_search_index=True,
+                                    build_aggregates=True, compact=False, **options):
+    """
+    Incremental variant of process_enhanced_pipeline backed by EnhancedStore.
+
+    Entries are matched by content key with indexed lookups and new records
+    are appended to the store; nothing is reloaded or rewritten. On first use
+    the store is seeded from `export_file`. When `export_file` is set, the
+    frontend JSON is re-exported from the store if this run added records or
+    the export does not exist yet.
+    """
+    build_question_index = build_question_index and uses_sbert(options.get("stages", STAGES))
+    store = EnhancedStore(store_path)
+    if not len(store) and export_file and os.path.exists(export_file):
+        print(f"[✓] Seeded store with {store.import_json(export_file)} existing entries")
+
+    added = 0
+    near_duplicates = open_near_duplicate_index(store.iter_records(), key=content_key)
+    for _, enriched in iter_enriched_entries(iter_json_records(input_file), store, key=content_key,
+                                             near_duplicates=near_duplicates, **options):
+        # Backfill is only read if the question index is still empty
+        if build_question_index and enriched:
+            update_question_index(enriched, backfill=store.iter_records(), key=content_key)
+        added += store.append(enriched)
+        if build_search_index and enriched:
+            update_search_index(enriched, backfill=store.iter_records())
+        if build_aggregates and enriched:
+            update_company_aggregates(enriched, backfill=store.iter_records())
+
+    print(f"[✓] Appended {added} entries to store '{store_path}'")
+    if export_file and compact:
+        export_file = compact_path(export_file)
+    if export_file and (added or not os.path.exists(export_file)):
+        if compact:
+            write_compact(store.iter_records(), export_file)
+        else:
+            store.export_json(export_file)
+        print(f"[✓] Exported {len(store)} entries to '{export_file}'")
+    elif export_file:
+        print(f"[✓] Nothing added, '{export_file}' is up to date")
+    store.close()
+
+
+def summarize_text_spacy(text, max_sentences=3, doc=None):
     """
     Generate a simple summary of the input text using spaCy sentence splitting.
+    Pass `doc` to reuse a Doc already parsed for the same text.
     """
-    doc = nlp(text)
+    doc = doc if doc is not None else models.get("spacy")(text)
     sentences = [sent.text.strip() for sent in doc.sents if len(sent.text.strip()) > 40]
     return " ".join(sentences[:max_sentences])
 
 
 
 if __name__ == "__main__":
-    process_enhanced_pipeline()
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Enrich raw GFG interview experiences")
+    parser.add_argument("--input", default=RAW_DATA_PATH)
+    parser.add_argument("--output", default=ENHANCED_DATA_PATH)
+    parser.add_argument("--entry-batch-size", type=int, default=ENTRY_BATCH_SIZE)
+    parser.add_argument("--encode-batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    parser.add_argument("--sentiment-batch-size", type=int, default=SENTIMENT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="Run the per-entry text stage in N processes")
+    parser.add_argument("--no-question-index", action="store_true", help="Skip updating the canonical question index (updated by default "
+                             "whenever dedup or topics runs)")
+    parser.add_argument("--no-search-index", action="store_true", help="Skip updating the BM25 search index")
+    parser.add_argument("--aggregates", nargs="?", const=AGGREGATES_PATH, default=COMPANY_AGGREGATES,
+                        help="Update the per-company counters in this SQLite file and its JSON export "
+                             "(default path if no value; default: $NLP_COMPANY_AGGREGATES)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read entries record by record and append to a JSONL output (resumable)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="With --stream, ignore the previous checkpoint; entries already in the output are "
+                             "still skipped")
+    parser.add_argument("--store", nargs="?", const=ENHANCED_STORE_PATH,
+                        help="Append to the indexed SQLite store (default path if no value) and export --output "
+                             "when entries were added")
+    parser.add_argument("--no-export", action="store_true", help="With --store, skip re-exporting the JSON file")
+    parser.add_argument("--compact", action="store_true",
+                        help="Write minified JSONL, next to a .json output as .jsonl, with raw texts stored once in "
+                             "a '.texts' sidecar")
+    parser.add_argument("--near-duplicates", nargs="?", const=NEAR_DUPLICATE_INDEX_PATH, default=NEAR_DUPLICATE_INDEX,
+                        help="Link raw entries that near-duplicate enriched ones in this MinHash index instead of "
+                             "enriching them (default path if no value; default: $NLP_GFG_NEAR_DUPLICATE_INDEX)")
+    parser.add_argument("--duplicate-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated Jaccard similarity at which an entry counts as a near-duplicate")
+    parser.add_argument("--no-highlights", action="store_true", help="Skip highlight extraction (no spaCy)")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep questions as found, without SBERT dedup")
+    parser.add_argument("--no-topics", action="store_true", help="Skip embedding topic tags for questions")
+    parser.add_argument("--no-sentiment", action="store_true", help="Skip feedback sentiment (no transformers)")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=INFERENCE_BACKEND,
+                        help="Run SBERT/sentiment with PyTorch or the quantized ONNX export (default: $NLP_INFERENCE_BACKEND)")
+    parser.add_argument("--no-embedding-cache", action="store_true",
+                        help="Encode every question instead of using the embedding cache")
+    parser.add_argument("--sentiment-mode", choices=["tiered", "full"], default=SENTIMENT_MODE,
+                        help="tiered: transformer only for texts the lexicon finds ambiguous "
+                             "(default: $NLP_SENTIMENT_MODE or full)")
+    parser.add_argument("--sentiment-windows", action="store_true",
+                        help="Score sentiment over sentence windows of the whole document, not its first 512 characters")
+    parser.add_argument("--max-chunks", type=int, default=MAX_SENTIMENT_CHUNKS,
+                        help="Most sentence windows scored per document with --sentiment-windows")
+    parser.add_argument("--sentiment-threshold", type=float, default=DEFAULT_COMPOUND_THRESHOLD,
+                        help="Escalate when |VADER compound| is below this")
+    parser.add_argument("--keyword-margin", type=int, default=DEFAULT_KEYWORD_MARGIN,
+                        help="Keyword lead against VADER (or, without VADER, for a verdict) that counts as decisive")
+    args = parser.parse_args()
+
+    INFERENCE_BACKEND = args.backend
+    NEAR_DUPLICATE_INDEX = args.near_duplicates
+    NEAR_DUPLICATE_THRESHOLD = args.duplicate_threshold
+    SENTIMENT_MODE = args.sentiment_mode
+    COMPANY_AGGREGATES = args.aggregates
+    MAX_SENTIMENT_CHUNKS = args.max_chunks
+    SENTIMENT_THRESHOLDS.update(compound_threshold=args.sentiment_threshold, keyword_margin=args.keyword_margin)
+    if args.no_embedding_cache:
+        EMBEDDING_CACHE = None
+
+    stages = tuple(stage for stage in STAGES if not getattr(args, f"no_{stage}"))
+    if args.sentiment_windows:
+        stages += (SENTIMENT_WINDOWS,)
+
+    output = args.output
+    if args.stream and not output.endswith(".jsonl"):
+        output = output + "l" if output.endswith(".json") else output + ".jsonl"
+
+    if args.store:
+        process_enhanced_pipeline_store(args.input, args.store,
+                                        export_file=None if args.no_export else output,
+                                        build_question_index=not args.no_question_index,
+                                        entry_batch_size=args.entry_batch_size,
+                                        encode_batch_size=args.encode_batch_size,
+                                        sentiment_batch_size=args.sentiment_batch_size,
+                                        workers=args.workers, stages=stages,
+                                        build_search_index=not args.no_search_index,
+                                        compact=args.compact)
+    elif args.stream:
+        process_enhanced_pipeline_stream(args.input, output,
+                                         build_question_index=not args.no_question_index,
+                                         resume=not args.no_resume,
+                                         entry_batch_size=args.entry_batch_size,
+                                         encode_batch_size=args.encode_batch_size,
+                                         sentiment_batch_size=args.sentiment_batch_size,
+                                         workers=args.workers, stages=stages,
+                                         build_search_index=not args.no_search_index,
+                                          compact=args.compact)
+    else:
+        process_enhanced_pipeline(args.input, output,
+                                  build_question_index=not args.no_question_index,
+                                  entry_batch_size=args.entry_batch_size,
+                                  encode_batch_size=args.encode_batch_size,
+                                  sentiment_batch_size=args.sentiment_batch_size,
+                                  workers=args.workers, stages=stages,
+                                  build_search_index=not args.no_search_index,
+                                  compact=args.compact)
 
 
 
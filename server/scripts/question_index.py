@@ -0,0 +1,206 @@
+"""
+Corpus-wide canonical question index.
+
+Every extracted question is mapped to a cluster of semantically equivalent
+questions. Cluster embeddings live in a memory-mapped NumPy file so new
+entries can be assigned incrementally without re-encoding the corpus, and
+each cluster keeps frequency counts per company and per round. Counts are
+keyed by record, so re-assigning a record that was already counted (a rerun
+after a crash) leaves them unchanged.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+QUESTION_INDEX_DIR = os.path.join(DATA_DIR, 'question_index')
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+CLUSTERS_FILE = 'clusters.json'
+TOP_QUESTIONS_FILE = 'top_questions.json'
+
+INITIAL_CAPACITY = 1024
+
+
+def _counted_key(key):
+    return hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:16]
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class CanonicalQuestionIndex:
+    def __init__(self, index_dir=QUESTION_INDEX_DIR, dim=384, threshold=0.8):
+        self.index_dir = index_dir
+        self.dim = dim
+        self.threshold = threshold
+        self.embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+        self.clusters_path = os.path.join(index_dir, CLUSTERS_FILE)
+
+        self.clusters = []
+        self.embeddings = None
+        # Hashed keys of the records whose questions are already counted
+        self.counted = set()
+
+        if os.path.exists(self.clusters_path) and os.path.exists(self.embeddings_path):
+            self._load()
+
+    def _load(self):
+        with open(self.clusters_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.threshold = meta.get('threshold', self.threshold)
+        self.clusters = meta['clusters']
+        self.counted = set(meta.get('counted', []))
+        self.embeddings = np.load(self.embeddings_path, mmap_mode='r+')
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def _ensure_capacity(self, needed):
+        capacity = 0 if self.embeddings is None else self.embeddings.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.embeddings_path + '.tmp'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                          shape=(new_capacity, self.dim))
+        if self.embeddings is not None:
+            grown[:len(self.clusters)] = self.embeddings[:len(self.clusters)]
+        grown.flush()
+        del grown
+        self.embeddings = None
+        os.replace(tmp_path, self.embeddings_path)
+        self.embeddings = np.load(self.embeddings_path, mmap_mode='r+')
+
+    def _new_cluster(self, question, embedding):
+        cluster_id = len(self.clusters)
+        self._ensure_capacity(cluster_id + 1)
+        self.embeddings[cluster_id] = embedding
+        self.clusters.append({
+            'id': cluster_id,
+            'question': question,
+            'count': 0,
+            'companies': {},
+            'rounds': {},
+        })
+        return cluster_id
+
+    def assign(self, records, embeddings):
+        """
+        Assign questions to clusters, creating new clusters as needed.
+
+        `records` is a list of dicts with "question", "company" and "round",
+        and optionally the "key" of the record they come from: questions of a
+        key counted before are assigned but not counted again. `embeddings`
+        holds the matching L2-normalized rows. Returns the list of cluster ids
+        in the same order.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        cluster_ids = []
+
+        # Score the whole batch against the existing clusters at once
+        existing = len(self.clusters)
+        if existing:
+            scores = embeddings @ np.asarray(self.embeddings[:existing]).T
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(records)), best]
+        else:
+            best = best_scores = None
+
+        new_keys = set()
+        for i, record in enumerate(records):
+            cluster_id, cluster_score = None, self.threshold
+            if best is not None and best_scores[i] > cluster_score:
+                cluster_id, cluster_score = int(best[i]), best_scores[i]
+
+            # Clusters created earlier in this batch win if they are closer
+            if len(self.clusters) > existing:
+                fresh = np.asarray(self.embeddings[existing:len(self.clusters)]) @ embeddings[i]
+                if fresh.max() > cluster_score:
+                    cluster_id = existing + int(fresh.argmax())
+
+            if cluster_id is None:
+                cluster_id = self._new_cluster(record['question'], embeddings[i])
+            cluster_ids.append(cluster_id)
+
+            key = record.get('key')
+            if key is not None:
+                key = _counted_key(key)
+                if key in self.counted:
+                    continue
+                new_keys.add(key)
+            cluster = self.clusters[cluster_id]
+            cluster['count'] += 1
+            for field, value in (('companies', record.get('company')), ('rounds', record.get('round'))):
+                if value:
+                    cluster[field][value] = cluster[field].get(value, 0) + 1
+
+        self.counted |= new_keys
+        return cluster_ids
+
+    def most_asked(self, k=20, company=None, round_name=None):
+        """Top-k clusters by frequency, optionally restricted to a company or round."""
+        def frequency(cluster):
+            if company:
+                return cluster['companies'].get(company, 0)
+            if round_name:
+                return cluster['rounds'].get(round_name, 0)
+            return cluster['count']
+
+        ranked = sorted(self.clusters, key=frequency, reverse=True)
+        return [
+            {**cluster, 'frequency': frequency(cluster)}
+            for cluster in ranked[:k] if frequency(cluster) > 0
+        ]
+
+    def save(self, top_k=100):
+        os.makedirs(self.index_dir, exist_ok=True)
+        if self.embeddings is not None:
+            self.embeddings.flush()
+        _write_json_atomic(self.clusters_path, {
+            'dim': self.dim,
+            'threshold': self.threshold,
+            'clusters': self.clusters,
+            'counted': sorted(self.counted),
+        })
+        self.export_top_questions(top_k=top_k)
+
+    def export_top_questions(self, path=None, top_k=100):
+        """Write a small "most asked questions" file the frontend can fetch directly."""
+        path = path or os.path.join(self.index_dir, TOP_QUESTIONS_FILE)
+        company_totals = Counter()
+        for cluster in self.clusters:
+            company_totals.update(cluster['companies'])
+
+        top = {
+            'overall': self.most_asked(top_k),
+            'by_company': {
+                company: self.most_asked(10, company=company)
+                for company, _ in company_totals.most_common(50)
+            },
+        }
+        _write_json_atomic(path, top)
+        return path
+
+
+if __name__ == "__main__":
+    index = CanonicalQuestionIndex()
+    company = sys.argv[1] if len(sys.argv) > 1 else None
+    for cluster in index.most_asked(20, company=company):
+        print(f"{cluster['frequency']:5d}  {cluster['question']}")
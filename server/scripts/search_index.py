@@ -0,0 +1,391 @@
+"""
+Prebuilt BM25 inverted index over processed experiences and GFG entries.
+
+Postings are sharded by the first characters of each term, so a query only
+reads the shards of its own terms instead of the whole corpus. Each shard is
+a base file <name>.json, {"upto": doc count, "terms": {term: [doc id gaps,
+term frequencies]}}, plus an append-only delta log <name>.delta with one
+JSON line of [term, doc id, tf] postings per update. docs.jsonl maps doc ids
+to record ids and lengths, and meta.json holds the document count.
+
+Adding records only appends to the deltas of their terms' shards, so a
+one-record update costs time proportional to that record, not the corpus. A
+delta that outgrows its base is merged into it (amortized, like a growing
+array); delta postings below the base's "upto" are already merged and are
+skipped, so a merge interrupted before the delta is cleared is harmless. The
+delta sizes before an update are recorded in pending.json and meta.json is
+written last, so the next writer truncates an interrupted update away;
+readers never see postings beyond meta.json's document count. Writers (e.g.
+several workers indexing submissions) take turns through an flock on
+writer.lock and pick up each other's documents before adding their own.
+
+Fields are weighted by repeating their terms (company and role count more
+than question or highlight text).
+
+Usage:
+    python search_index.py build --corpus gfg --input ../data/enhanced_gfg_data.json
+    python search_index.py build --corpus experiences --input ../../public/processed_experiences.json
+    python search_index.py query --corpus gfg "dynamic programming amazon" -k 10
+    python search_index.py compact --corpus gfg
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent writers are not serialized
+    fcntl = None
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+SEARCH_INDEX_DIR = os.path.join(DATA_DIR, 'search_index')
+
+META_FILE = 'meta.json'
+DOCS_FILE = 'docs.jsonl'
+PENDING_FILE = 'pending.json'
+LOCK_FILE = 'writer.lock'
+SHARDS_DIR = 'shards'
+
+SHARD_PREFIX = 2
+# Deltas are merged into their base once larger than it and than this
+COMPACT_MIN_BYTES = 64 * 1024
+K1 = 1.2
+B = 0.75
+
+FIELD_WEIGHTS = {
+    'company': 3,
+    'role': 2,
+    'rounds': 2,
+    'questions': 1,
+    'highlights': 1,
+}
+
+STOPWORDS = frozenset("""a an and are as at be but by did do does for from had has have how i if in into is it its
+me my of on or our so that the their them then there these they this to was we were what when where which who why
+will with you your""".split())
+
+_TOKEN_RE = re.compile(r"\w+")
+_SHARD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def shard_name(term):
+    prefix = term[:SHARD_PREFIX]
+    return prefix if _SHARD_RE.fullmatch(prefix) else '_'
+
+
+def experience_fields(record):
+    """Searchable text per field of a processed experience"""
+    return {
+        'company': record.get('company') or '',
+        'role': record.get('role') or '',
+        'rounds': ' '.join(r.get('type', '') if isinstance(r, dict) else str(r)
+                           for r in record.get('interview_rounds') or []),
+        'questions': ' '.join(record.get('raw_questions') or []),
+        'highlights': ' '.join(record.get('highlights') or []),
+    }
+
+
+def gfg_fields(record):
+    """Searchable text per field of an enriched GFG entry"""
+    questions_by_round = record.get('questions_by_round') or {}
+    return {
+        'company': record.get('company') or '',
+        'role': record.get('role') or '',
+        'rounds': ' '.join(list(questions_by_round) + list(record.get('rounds') or [])),
+        'questions': ' '.join(q.get('question', '') if isinstance(q, dict) else str(q)
+                              for qs in questions_by_round.values() for q in qs),
+        'highlights': ' '.join(record.get('highlights') or []),
+    }
+
+
+def experience_id(record):
+    return record.get('id')
+
+
+def gfg_id(record):
+    from enhanced_store import content_key
+    return content_key(record)
+
+
+CORPORA = {
+    'experiences': (experience_fields, experience_id),
+    'gfg': (gfg_fields, gfg_id),
+}
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _append_postings(shard, postings):
+    """Append (term, doc id, tf) postings, in ascending doc id order per term, to a loaded shard"""
+    for term, doc, tf in postings:
+        entry = shard.setdefault(term, [[], [], 0])
+        entry[0].append(doc - entry[2])
+        entry[1].append(tf)
+        entry[2] = doc
+
+
+class SearchIndex:
+    def __init__(self, index_dir, fields=gfg_fields, record_id=gfg_id):
+        self.index_dir = index_dir
+        self.fields = fields
+        self.record_id = record_id
+        self.count = 0
+        self.total_length = 0
+        self.docs_bytes = 0
+        self.ids = []
+        self.lengths = []
+        self._known = set()
+        self._shards = {}
+        self._refresh()
+
+    def _refresh(self):
+        """Catch up with documents other writers committed since this index was loaded"""
+        meta_path = os.path.join(self.index_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['count'] == self.count:
+            return
+        with open(os.path.join(self.index_dir, DOCS_FILE), 'rb') as f:
+            f.seek(self.docs_bytes)
+            for line in f.read(meta['docs_bytes'] - self.docs_bytes).splitlines():
+                record_id, length = json.loads(line)
+                self.ids.append(record_id)
+                self.lengths.append(length)
+                self._known.add(record_id)
+        self.count = meta['count']
+        self.total_length = meta['total_length']
+        self.docs_bytes = meta['docs_bytes']
+        # Loaded shards were cut off at the old document count
+        self._shards.clear()
+
+    @contextmanager
+    def _writing(self):
+        """Hold the writer lock, with this index caught up and any interrupted update rolled back"""
+        os.makedirs(os.path.join(self.index_dir, SHARDS_DIR), exist_ok=True)
+        with open(os.path.join(self.index_dir, LOCK_FILE), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._refresh()
+            self._roll_back()
+            yield
+
+    def _roll_back(self):
+        """Truncate the deltas an interrupted add() appended to back to their committed size"""
+        pending_path = os.path.join(self.index_dir, PENDING_FILE)
+        if not os.path.exists(pending_path):
+            return
+        with open(pending_path, 'r', encoding='utf-8') as f:
+            sizes = json.load(f)
+        for name, size in sizes.items():
+            path = self._delta_path(name)
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        os.remove(pending_path)
+
+    @classmethod
+    def for_corpus(cls, corpus, index_dir=None):
+        fields, record_id = CORPORA[corpus]
+        return cls(index_dir or os.path.join(SEARCH_INDEX_DIR, corpus), fields, record_id)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, record_id):
+        return record_id in self._known
+
+    def _shard_path(self, name):
+        return os.path.join(self.index_dir, SHARDS_DIR, name + '.json')
+
+    def _delta_path(self, name):
+        return os.path.join(self.index_dir, SHARDS_DIR, name + '.delta')
+
+    def _shard(self, name):
+        """{term: [doc id gaps, tfs, last doc id]} of a shard, its base plus its delta"""
+        shard = self._shards.get(name)
+        if shard is None:
+            # The delta is read before the base: a merge replaces the base before
+            # clearing the delta, so this order never misses merged postings
+            delta = []
+            path = self._delta_path(name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    # A line without its newline is still being appended
+                    delta = [json.loads(line) for line in f if line.endswith(b'\n')]
+            shard = {}
+            upto = 0
+            path = self._shard_path(name)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    base = json.load(f)
+                upto = base['upto']
+                shard = {term: [gaps, tfs, sum(gaps)] for term, (gaps, tfs) in base['terms'].items()}
+            for postings in delta:
+                _append_postings(shard, (p for p in postings if upto <= p[1] < self.count))
+            self._shards[name] = shard
+        return shard
+
+    def _compact_shard(self, name):
+        """Merge a shard's delta into its base"""
+        shard = self._shard(name)
+        _write_json_atomic(self._shard_path(name),
+                           {'upto': self.count, 'terms': {term: [gaps, tfs] for term, (gaps, tfs, _) in shard.items()}})
+        open(self._delta_path(name), 'wb').close()
+
+    def compact(self):
+        """Merge every delta into its base; returns how many shards were merged"""
+        with self._writing():
+            shards_dir = os.path.join(self.index_dir, SHARDS_DIR)
+            names = [name[:-len('.delta')] for name in os.listdir(shards_dir)
+                     if name.endswith('.delta') and os.path.getsize(os.path.join(shards_dir, name))]
+            for name in names:
+                self._compact_shard(name)
+        return len(names)
+
+    def weighted_terms(self, record):
+        """Term -> weighted frequency, and the weighted document length"""
+        counts = Counter()
+        for field, text in self.fields(record).items():
+            weight = FIELD_WEIGHTS.get(field, 1)
+            for term in tokenize(text):
+                counts[term] += weight
+        return counts, sum(counts.values())
+
+    def add(self, records):
+        """Index records not indexed yet (by record id); returns how many were added"""
+        records = list(records)
+        with self._writing():
+            return self._add(records)
+
+    def _add(self, records):
+        new_postings = defaultdict(list)
+        new_docs = []
+        for record in records:
+            record_id = self.record_id(record)
+            if record_id is None or record_id in self._known:
+                continue
+            doc = self.count + len(new_docs)
+            counts, length = self.weighted_terms(record)
+            for term, tf in counts.items():
+                new_postings[shard_name(term)].append((term, doc, tf))
+            new_docs.append((record_id, length))
+            self._known.add(record_id)
+        if not new_docs:
+            return 0
+
+        delta_sizes = {name: os.path.getsize(self._delta_path(name)) if os.path.exists(self._delta_path(name)) else 0
+                       for name in new_postings}
+        _write_json_atomic(os.path.join(self.index_dir, PENDING_FILE), delta_sizes)
+        for name, postings in new_postings.items():
+            with open(self._delta_path(name), 'ab') as f:
+                f.write((json.dumps(postings, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8'))
+            if name in self._shards:
+                _append_postings(self._shards[name], postings)
+
+        data = ''.join(json.dumps([record_id, length], ensure_ascii=False) + '\n'
+                       for record_id, length in new_docs).encode('utf-8')
+        with open(os.path.join(self.index_dir, DOCS_FILE), 'ab') as f:
+            # Drop lines of an earlier update that never reached meta.json
+            f.truncate(self.docs_bytes)
+            f.write(data)
+        self.docs_bytes += len(data)
+        self.ids.extend(record_id for record_id, _ in new_docs)
+        self.lengths.extend(length for _, length in new_docs)
+        self.count += len(new_docs)
+        self.total_length += sum(length for _, length in new_docs)
+        _write_json_atomic(os.path.join(self.index_dir, META_FILE),
+                           {'count': self.count, 'total_length': self.total_length, 'docs_bytes': self.docs_bytes})
+        os.remove(os.path.join(self.index_dir, PENDING_FILE))
+
+        for name in new_postings:
+            base_path = self._shard_path(name)
+            base_size = os.path.getsize(base_path) if os.path.exists(base_path) else 0
+            if os.path.getsize(self._delta_path(name)) > max(base_size, COMPACT_MIN_BYTES):
+                self._compact_shard(name)
+        return len(new_docs)
+
+    def search(self, query, k=10):
+        """Top-k (record id, BM25 score) for `query`, best first"""
+        terms = set(tokenize(query))
+        if not terms or not self.count:
+            return []
+
+        lengths = np.asarray(self.lengths, dtype=np.float32)
+        norm = K1 * (1 - B + B * lengths / (self.total_length / self.count))
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in terms:
+            postings = self._shard(shard_name(term)).get(term)
+            if not postings or not postings[0]:
+                continue
+            docs = np.cumsum(postings[0])
+            tfs = np.asarray(postings[1], dtype=np.float32)
+            idf = math.log(1 + (self.count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (K1 + 1) / (tfs + norm[docs])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind='stable')]
+        return [(self.ids[doc], round(float(scores[doc]), 4)) for doc in hits]
+
+    def stats(self):
+        shards_dir = os.path.join(self.index_dir, SHARDS_DIR)
+        shards = os.listdir(shards_dir) if os.path.isdir(shards_dir) else []
+        return {
+            'documents': self.count,
+            'shards': sum(1 for name in shards if name.endswith('.json')),
+            'size_bytes': sum(os.path.getsize(os.path.join(shards_dir, name)) for name in shards),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or query the BM25 search index")
+    parser.add_argument("command", choices=["build", "query", "compact", "stats"])
+    parser.add_argument("query", nargs="?", help="Search terms for 'query'")
+    parser.add_argument("--corpus", choices=sorted(CORPORA), default="gfg")
+    parser.add_argument("--index-dir", help="Default: data/search_index/<corpus>")
+    parser.add_argument("--input", help="JSON/JSONL records to add with 'build'")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_intermixed_args()
+
+    index = SearchIndex.for_corpus(args.corpus, args.index_dir)
+    if args.command == "build":
+        from stream_io import iter_json_records
+
+        added = 0
+        batch = []
+        for record in iter_json_records(args.input):
+            batch.append(record)
+            if len(batch) >= 1000:
+                added += index.add(batch)
+                batch = []
+        added += index.add(batch)
+        print(f"[✓] Indexed {added} records from '{args.input}'")
+    elif args.command == "query":
+        start = time.perf_counter()
+        results = index.search(args.query or "", k=args.k)
+        print(json.dumps({'results': results, 'ms': round((time.perf_counter() - start) * 1000, 3)}, indent=2))
+    elif args.command == "compact":
+        print(f"[✓] Merged the deltas of {index.compact()} shards")
+    print(json.dumps(index.stats(), indent=2))
@@ -0,0 +1,63 @@
+"""
+Helpers for loading spaCy with only the components a pipeline needs and for
+parsing many texts in one nlp.pipe call.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SPACY_MODEL = "en_core_web_sm"
+SPACY_BATCH_SIZE = 32
+
+
+def load_pipeline(components=("senter",), model=SPACY_MODEL):
+    """
+    Load `model` with only `components` active.
+
+    Sentence segmentation uses the small "senter" component when the model
+    ships one (en_core_web_sm does, disabled by default) and the dependency
+    parser otherwise. The shared tok2vec layer stays enabled only when an
+    active component listens to it.
+    """
+    import spacy
+
+    nlp = spacy.load(model)
+    needed = set(components)
+    if "senter" in needed and "senter" not in nlp.component_names:
+        needed.discard("senter")
+        needed.add("parser")
+
+    for name in nlp.component_names:
+        if name == "tok2vec":
+            continue
+        if name in needed and name in nlp.disabled:
+            nlp.enable_pipe(name)
+        elif name not in needed and name not in nlp.disabled:
+            nlp.disable_pipe(name)
+
+    if "tok2vec" in nlp.component_names:
+        listeners = set(getattr(nlp.get_pipe("tok2vec"), "listening_components", ()))
+        if not listeners & needed:
+            nlp.disable_pipe("tok2vec")
+
+    logger.info(f"spaCy pipeline active components: {nlp.pipe_names}")
+    return nlp
+
+
+def parse_documents(nlp, texts, batch_size=SPACY_BATCH_SIZE):
+    """Parse `texts` with nlp.pipe; falls back to one text at a time so a bad text yields None"""
+    texts = list(texts)
+    try:
+        return list(nlp.pipe(texts, batch_size=batch_size))
+    except Exception as e:
+        logger.warning(f"Batched spaCy parse failed, parsing texts one by one: {e}")
+
+    docs = []
+    for text in texts:
+        try:
+            docs.append(nlp(text))
+        except Exception as e:
+            logger.warning(f"spaCy processing failed: {e}")
+            docs.append(None)
+    return docs
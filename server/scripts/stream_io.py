@@ -0,0 +1,203 @@
+"""
+Streaming record I/O shared by the NLP pipelines.
+
+Inputs may be a JSON array, JSONL or a compact output (see compact_output);
+either way records are yielded one at a time without loading the whole file.
+Outputs are JSONL files appended record by record, with a small checkpoint
+file so an interrupted run can resume from the last committed record.
+"""
+
+import json
+import os
+
+from compact_output import TextStore, compact_record, is_compact, iter_compact_records, texts_path
+
+CHUNK_SIZE = 1 << 16
+
+
+def _iter_jsonl(f):
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+        if record is not None:
+            yield record
+
+
+def _iter_json_array(f, buffer):
+    """Incrementally decode the items of a top-level JSON array"""
+    decoder = json.JSONDecoder()
+    pos = buffer.index('[') + 1
+    eof = False
+
+    while True:
+        # Skip whitespace and separators, reading more input as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[pos] == ']':
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+            truncated = end == len(buffer) and not eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            truncated = True
+
+        # A value that fails to decode or ends exactly at the buffer edge may be cut off
+        if truncated:
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        # null elements are not records
+        if record is not None:
+            yield record
+        buffer, pos = buffer[end:], 0
+
+
+def iter_json_records(path):
+    """Yield records from a JSON array, JSONL or compact file one at a time"""
+    if is_compact(path):
+        yield from iter_compact_records(path)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return
+            if not char.isspace():
+                break
+
+        if char == '[':
+            yield from _iter_json_array(f, char)
+        else:
+            f.seek(0)
+            yield from _iter_jsonl(f)
+
+
+def _file_signature(path):
+    """Identifies an input file version: a regenerated or edited file gets a new one"""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class JsonlCheckpointWriter:
+    """
+    Append-only JSONL writer with a resumable checkpoint.
+
+    The checkpoint (``<output>.checkpoint``) records how many input records
+    have been consumed and the output size at that point, along with the path,
+    size and mtime of the `source` input file and the output's inode; a
+    checkpoint written for any other input, or for an output file that has
+    since been replaced, is ignored. On resume the output is truncated back to
+    the last checkpoint, dropping any half-written line. Without a checkpoint
+    to resume from, existing output is kept and appended to; `untracked_output` tells the caller it holds records the checkpoint
+    does not account for, so it can skip them or refuse to run.
+    With `compact`, or when the existing output is compact, raw texts go to a
+    deduplicated sidecar (compact_output).
+    """
+
+    def __init__(self, path, resume=True, compact=False, source=None):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+        self.source = _file_signature(source) if source else None
+        self.records_read = 0
+        self.records_written = 0
+        output_bytes = None
+
+        if resume and os.path.exists(self.checkpoint_path) and os.path.exists(path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            # A checkpoint of another input, or of an output file since replaced (e.g. by
+            # compact_output.write_compact) or cut short, does not apply
+            stat = os.stat(path)
+            if (state.get('source') == self.source and state.get('output_inode') == stat.st_ino
+                    and state['output_bytes'] <= stat.st_size):
+                self.records_read = state['records_read']
+                output_bytes = state['output_bytes']
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(path, 'ab')
+        if output_bytes is not None:
+            self._file.truncate(output_bytes)
+        self._file.seek(0, os.SEEK_END)
+        self.untracked_output = output_bytes is None and self._file.tell() > 0
+        # A partial last line of untracked output is dropped before the first write
+        self._line_checked = output_bytes is not None
+        # Appending to a compact output keeps it compact
+        self.texts = TextStore(texts_path(path)) if compact or is_compact(path) else None
+
+    def _drop_partial_line(self):
+        """Truncate the output after its last complete line"""
+        size = self._file.tell()
+        with open(self.path, 'rb') as f:
+            end = size
+            while end > 0:
+                start = max(0, end - CHUNK_SIZE)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+        if end < size:
+            self._file.truncate(end)
+            self._file.seek(end)
+
+    def write(self, record):
+        if not self._line_checked:
+            self._drop_partial_line()
+            self._line_checked = True
+        if self.texts is not None:
+            record = compact_record(record, self.texts)
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        else:
+            line = json.dumps(record, ensure_ascii=False)
+        self._file.write((line + '\n').encode('utf-8'))
+        self.records_written += 1
+
+    def commit(self, records_read):
+        """Mark every input record before `records_read` as durably handled"""
+        if self.texts is not None:
+            # Texts first, so committed records never reference a missing text
+            self.texts.flush(sync=True)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records_read = records_read
+
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'records_read': records_read, 'output_bytes': self._file.tell(),
+                       'output_inode': os.fstat(self._file.fileno()).st_ino, 'source': self.source}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self):
+        self._file.close()
+        if self.texts is not None:
+            self.texts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,122 @@
+"""
+Tiered sentiment: a cheap lexicon pass (VADER compound plus keyword counts)
+decides the clear cases, and only ambiguous texts are escalated to the
+transformer model.
+
+A text is ambiguous when |compound| is below the compound threshold, or when
+the keyword counts lean the other way from VADER by at least the keyword
+margin. Without VADER the keyword lead alone has to reach the margin.
+"""
+
+DEFAULT_COMPOUND_THRESHOLD = 0.5
+DEFAULT_KEYWORD_MARGIN = 2
+
+# The experience processor's sentiment keywords, defined once here so both
+# pipelines count the same words the same way
+SENTIMENT_KEYWORDS = {
+    'positive': ['excellent', 'great', 'good', 'amazing', 'wonderful', 'fantastic', 'smooth', 'easy', 'helpful',
+                 'supportive', 'professional', 'organized', 'clear', 'fair', 'selected', 'offered', 'positive',
+                 'successful'],
+    'negative': ['difficult', 'hard', 'stressful', 'unclear', 'confusing', 'disorganized', 'unprofessional', 'rude',
+                 'unhelpful', 'negative', 'rejected', 'failed', 'disappointing', 'frustrating', 'terrible', 'awful',
+                 'bad', 'poor'],
+    'neutral': ['okay', 'fine', 'average', 'standard', 'normal', 'typical', 'expected', 'reasonable', 'fair',
+                'balanced', 'mixed'],
+}
+
+
+def keyword_counts(text):
+    """
+    (positive, negative) keyword counts with the processor's rule: each
+    keyword counts its non-overlapping substring occurrences, as str.count
+    does, so "unclear" also counts as "clear"
+    """
+    text = text.lower()
+    return (sum(text.count(keyword) for keyword in SENTIMENT_KEYWORDS['positive']),
+            sum(text.count(keyword) for keyword in SENTIMENT_KEYWORDS['negative']))
+
+
+def lexicon_verdict(compound, positive, negative, compound_threshold=DEFAULT_COMPOUND_THRESHOLD,
+                    keyword_margin=DEFAULT_KEYWORD_MARGIN):
+    """'positive' or 'negative' when the lexicon scores are clear, None when the text should escalate"""
+    lead = positive - negative
+    if compound is None:
+        if abs(lead) >= keyword_margin:
+            return 'positive' if lead > 0 else 'negative'
+        return None
+
+    if abs(compound) < compound_threshold:
+        return None
+    label = 'positive' if compound > 0 else 'negative'
+    if (label == 'positive' and lead <= -keyword_margin) or (label == 'negative' and lead >= keyword_margin):
+        return None
+    return label
+
+
+def load_vader():
+    """NLTK's VADER analyzer, or None when NLTK or its lexicon is missing"""
+    try:
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        return SentimentIntensityAnalyzer()
+    except (ImportError, LookupError):
+        return None
+
+
+def load_transformer_escalation():
+    """Escalation function backed by transformers' default sentiment pipeline"""
+    from transformers import pipeline
+
+    classifier = pipeline("sentiment-analysis")
+
+    def escalate(texts, batch_size=16):
+        return [r["label"].lower() for r in classifier([t[:512] for t in texts], batch_size=batch_size)]
+
+    return escalate
+
+
+class TieredSentiment:
+    """
+    Classify texts with the lexicon tier and pass only the ambiguous ones to
+    `escalate`, a function from a list of texts to 'positive'/'negative' labels.
+    """
+
+    def __init__(self, escalate, vader=None, compound_threshold=DEFAULT_COMPOUND_THRESHOLD,
+                 keyword_margin=DEFAULT_KEYWORD_MARGIN):
+        self.escalate = escalate
+        self.vader = vader
+        self.compound_threshold = compound_threshold
+        self.keyword_margin = keyword_margin
+        self.total = 0
+        self.escalated = 0
+
+    def lexicon(self, text):
+        compound = self.vader.polarity_scores(text)['compound'] if self.vader is not None else None
+        return lexicon_verdict(compound, *keyword_counts(text), self.compound_threshold, self.keyword_margin)
+
+    def classify(self, texts, batch_size=16, inputs=None):
+        """
+        List of (label, tier) per text, where tier is 'lexicon' or 'transformer'.
+        `inputs`, if given, is what `escalate` receives for each text instead of
+        the text itself (e.g. its sentence windows); for escalated texts the
+        label is then whatever `escalate` returns.
+        """
+        inputs = texts if inputs is None else inputs
+        results = [(self.lexicon(text), 'lexicon') for text in texts]
+        ambiguous = [i for i, (label, _) in enumerate(results) if label is None]
+        if ambiguous:
+            labels = self.escalate([inputs[i] for i in ambiguous], batch_size=batch_size)
+            for i, label in zip(ambiguous, labels):
+                results[i] = (label, 'transformer')
+
+        self.total += len(texts)
+        self.escalated += len(ambiguous)
+        return results
+
+    def stats(self):
+        return {
+            'texts': self.total,
+            'escalated': self.escalated,
+            'escalation_rate': round(self.escalated / self.total, 4) if self.total else 0.0,
+            'compound_threshold': self.compound_threshold,
+            'keyword_margin': self.keyword_margin,
+        }
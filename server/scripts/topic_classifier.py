@@ -0,0 +1,127 @@
+"""
+Embedding-based topic tags for interview questions.
+
+Each topic is the normalized mean embedding of a few seed phrases, so tagging
+a batch of questions is one (questions x dim) @ (dim x topics) product over
+the SBERT embeddings the GFG pipeline already computes for deduplication.
+
+TOPIC_CATEGORIES maps topics onto the regex categories of
+InterviewExperienceProcessor.categorize_questions; `compare` reports how
+often the two agree on a synthetic corpus.
+
+Usage:
+    python topic_classifier.py compare --records 200
+"""
+
+import numpy as np
+
+TOPIC_SEEDS = {
+    "arrays": ["find the maximum subarray sum in an array", "rotate an array by k positions",
+               "two sum problem using a hash map", "merge overlapping intervals", "reverse a string in place",
+               "sliding window longest substring without repeating characters"],
+    "dp": ["dynamic programming solution for the knapsack problem", "longest common subsequence of two strings",
+           "count the ways to climb stairs with memoization", "minimum coins needed to make change",
+           "edit distance between two words"],
+    "graphs": ["detect a cycle in a directed graph", "shortest path with Dijkstra's algorithm",
+               "breadth first search traversal of a graph", "topological sort of tasks with dependencies",
+               "lowest common ancestor in a binary tree", "number of islands in a grid"],
+    "os": ["difference between a process and a thread", "what is a deadlock and how do you prevent it",
+           "explain virtual memory and paging", "how does CPU scheduling work", "mutex versus semaphore"],
+    "dbms": ["what is database normalization", "explain ACID properties of transactions",
+             "difference between SQL joins", "how do database indexes work", "write a SQL query to find the second highest salary"],
+    "networking": ["what happens when you type a URL in the browser", "difference between TCP and UDP",
+                   "explain the OSI model layers", "how does DNS resolution work", "what is HTTPS and TLS handshake"],
+    "system_design": ["design a URL shortener", "design a scalable chat application",
+                      "how would you design a rate limiter", "design a distributed cache with load balancing",
+                      "scale a system to millions of users"],
+    "behavioral": ["tell me about yourself", "describe a conflict with a teammate and how you resolved it",
+                   "why do you want to join this company", "what are your strengths and weaknesses",
+                   "tell me about a project you are proud of", "where do you see yourself in five years"],
+}
+
+# Topic -> regex category of InterviewExperienceProcessor.categorize_questions
+TOPIC_CATEGORIES = {
+    "arrays": "coding",
+    "dp": "coding",
+    "graphs": "coding",
+    "os": "technical",
+    "dbms": "technical",
+    "networking": "technical",
+    "system_design": "system_design",
+    "behavioral": "behavioral",
+}
+
+# Questions scoring below this against every centroid are tagged "other"
+MIN_TOPIC_SCORE = 0.25
+
+
+class TopicClassifier:
+    def __init__(self, encode, seeds=TOPIC_SEEDS, min_score=MIN_TOPIC_SCORE):
+        """`encode`: list of texts -> L2-normalized embeddings (the model the questions are embedded with)"""
+        self.topics = list(seeds)
+        self.min_score = min_score
+        centroids = []
+        for topic in self.topics:
+            centroid = np.asarray(encode(seeds[topic]), dtype=np.float32).mean(axis=0)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+        self.centroids = np.stack(centroids)
+
+    def scores(self, embeddings):
+        """(questions x topics) cosine similarities"""
+        return np.asarray(embeddings, dtype=np.float32) @ self.centroids.T
+
+    def classify(self, embeddings):
+        """Topic per embedding row, "other" when no centroid reaches min_score"""
+        if not len(embeddings):
+            return []
+        scores = self.scores(embeddings)
+        best = scores.argmax(axis=1)
+        confident = scores[np.arange(len(best)), best] >= self.min_score
+        return [self.topics[b] if ok else "other" for b, ok in zip(best, confident)]
+
+
+def topic_category(topic):
+    return TOPIC_CATEGORIES.get(topic, "other")
+
+
+def compare_with_regex(questions, topics, processor):
+    """Agreement between topic-derived categories and the regex categories, with a confusion table"""
+    regex_category = {}
+    for category, qs in processor.categorize_questions(questions).items():
+        for q in qs:
+            regex_category[q] = category
+
+    confusion = {}
+    agree = 0
+    for question, topic in zip(questions, topics):
+        expected = regex_category[question]
+        actual = topic_category(topic)
+        agree += expected == actual
+        row = confusion.setdefault(expected, {})
+        row[actual] = row.get(actual, 0) + 1
+
+    return {
+        "questions": len(questions),
+        "agreement": round(agree / len(questions), 4) if questions else 1.0,
+        "confusion": confusion,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Compare embedding topics with the regex question categories")
+    parser.add_argument("command", choices=["compare"])
+    parser.add_argument("--records", type=int, default=200, help="Synthetic GFG articles to take questions from")
+    args = parser.parse_args()
+
+    import process_gfg_nlp as gfg
+    from benchmark_pipelines import generate_corpus
+    from process_experience_nlp import InterviewExperienceProcessor
+
+    articles = list(generate_corpus("gfg", args.records, "medium"))
+    questions = sorted({q for a in articles for qs in gfg.split_questions_by_round(a["content"]).values() for q in qs})
+    topics = gfg.models.get("topics").classify(gfg.encode_questions(questions))
+    gfg.save_embedding_cache()
+    print(json.dumps(compare_with_regex(questions, topics, InterviewExperienceProcessor()), indent=2))
@@ -0,0 +1,99 @@
+// Smoke tests for the experience routes: node --test tests/ (needs `npm install`)
+const test = require('node:test');
+const assert = require('node:assert');
+const http = require('node:http');
+
+// The fake NLP service ranks the last stored experience first for every query and sheds every
+// processing request, recording the deadlines it was sent
+let rankedId = null;
+const deadlines = [];
+const service = http.createServer((req, res) => {
+  const url = new URL(req.url, 'http://localhost');
+  res.setHeader('Content-Type', 'application/json');
+  if (url.pathname === '/search') {
+    res.end(JSON.stringify({ ok: true, results: rankedId ? [{ id: rankedId, score: 1.0 }] : [] }));
+  } else if (url.pathname === '/process/experience') {
+    let body = '';
+    req.on('data', chunk => { body += chunk; });
+    req.on('end', () => {
+      deadlines.push(JSON.parse(body).deadline_ms);
+      res.statusCode = 503;
+      res.setHeader('Retry-After', '0');
+      res.end(JSON.stringify({ ok: false, error: 'queue full' }));
+    });
+  } else {
+    res.statusCode = 404;
+    res.end(JSON.stringify({ ok: false, error: 'not found' }));
+  }
+});
+
+let server;
+let baseUrl;
+
+test.before(async () => {
+  await new Promise(resolve => service.listen(0, '127.0.0.1', resolve));
+  process.env.NLP_SERVICE_URL = `http://127.0.0.1:${service.address().port}`;
+  process.env.NLP_WORKER_POOL_SIZE = '0';
+  delete process.env.NLP_QUEUE_DIR;
+
+  const express = require('express');
+  const app = express();
+  app.use(express.json());
+  app.use('/api', require('../routes/experience'));
+  server = app.listen(0, '127.0.0.1');
+  await new Promise(resolve => server.once('listening', resolve));
+  baseUrl = `http://127.0.0.1:${server.address().port}/api`;
+});
+
+test.after(() => {
+  server.close();
+  service.close();
+});
+
+async function get(path) {
+  const response = await fetch(baseUrl + path);
+  return { status: response.status, body: await response.json() };
+}
+
+test('fixed /experiences paths are not taken for an id', async () => {
+  const filtered = await get('/experiences/filter?company=all');
+  assert.strictEqual(filtered.status, 200);
+  assert.ok(Array.isArray(filtered.body));
+
+  const stats = await get('/experiences/stats');
+  assert.strictEqual(stats.status, 200);
+  assert.strictEqual(typeof stats.body.total, 'number');
+
+  const search = await get('/experiences/search?q=a');
+  assert.strictEqual(search.status, 400);
+});
+
+test('search returns BM25-ranked hits from the NLP service first', async () => {
+  const experiences = (await get('/experiences')).body;
+  rankedId = experiences.length ? experiences[experiences.length - 1].id : null;
+
+  const search = await get('/experiences/search?q=' + encodeURIComponent('zzzz unmatched query'));
+  assert.strictEqual(search.status, 200);
+  assert.deepStrictEqual(search.body.map(exp => exp.id), rankedId ? [rankedId] : []);
+});
+
+test('experiences are still found by id', async () => {
+  const missing = await get('/experiences/no-such-id');
+  assert.strictEqual(missing.status, 404);
+
+  if (rankedId) {
+    const found = await get('/experiences/' + encodeURIComponent(rankedId));
+    assert.strictEqual(found.status, 200);
+    assert.strictEqual(found.body.id, rankedId);
+  }
+});
+
+test('an overloaded NLP service is retried within the deadline, then reported', async () => {
+  const response = await fetch(baseUrl + '/test-nlp', { method: 'POST' });
+  assert.strictEqual(response.status, 503);
+  assert.ok(response.headers.get('retry-after'));
+
+  assert.strictEqual(deadlines.length, 3);
+  assert.ok(deadlines.every(ms => ms > 0 && ms <= 60000));
+  assert.ok(deadlines[2] < deadlines[0]);
+});
@@ -0,0 +1,121 @@
+import json
+import random
+
+import pytest
+
+import process_experience_nlp
+import process_gfg_nlp
+from company_aggregates import CompanyAggregates
+
+COMPANIES = ['Amazon', 'Google', ' amazon ', None]
+DIFFICULTIES = ['Easy', 'Medium', 'Hard', '']
+VERDICTS = ['Selected', 'Rejected', None]
+
+
+def make_record(record_id, rng):
+    return {
+        'id': record_id,
+        'company': rng.choice(COMPANIES),
+        'role': rng.choice(['SDE', 'SDE  2', '']),
+        'difficulty': rng.choice(DIFFICULTIES),
+        'verdict': rng.choice(VERDICTS),
+        'feedback_sentiment': rng.choice(['Positive', 'negative', None]),
+        'interview_rounds': rng.sample([{'type': 'Technical Round'}, {'type': 'HR Round'}, 'Onsite Round'],
+                                       rng.randint(0, 3)),
+        'extracted_insights': {'technologies': rng.sample(['python', 'java', 'python', 'aws'], rng.randint(0, 4))},
+    }
+
+
+def summary_of(path, records):
+    aggregates = CompanyAggregates(str(path))
+    aggregates.add('experiences', records)
+    try:
+        return aggregates.summary()
+    finally:
+        aggregates.close()
+
+
+@pytest.fixture
+def aggregates(tmp_path):
+    aggregates = CompanyAggregates(str(tmp_path / 'aggregates.sqlite'))
+    yield aggregates
+    aggregates.close()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_updates_match_a_rebuild(tmp_path, aggregates, seed):
+    rng = random.Random(seed)
+    current = {}
+    for _ in range(200):
+        record_id = f'exp{rng.randrange(30)}'
+        if rng.random() < 0.2:
+            aggregates.remove('experiences', record_id)
+            current.pop(record_id, None)
+        else:
+            record = make_record(record_id, rng)
+            aggregates.add('experiences', [record])
+            current[record_id] = record
+
+    assert aggregates.count('experiences') == len(current)
+    assert aggregates.summary() == summary_of(tmp_path / 'rebuilt.sqlite', list(current.values()))
+
+
+def test_add_then_remove_leaves_nothing(aggregates):
+    rng = random.Random(0)
+    records = [make_record(f'exp{i}', rng) for i in range(10)]
+    assert aggregates.add('experiences', records) == 10
+    for record in records:
+        aggregates.remove('experiences', record['id'])
+    assert aggregates.summary() == {}
+    assert aggregates.conn.execute("SELECT COUNT(*) FROM counts").fetchone()[0] == 0
+
+
+def test_recommitting_does_not_double_count(aggregates):
+    rng = random.Random(1)
+    records = [make_record(f'exp{i}', rng) for i in range(10)]
+    aggregates.add('experiences', records)
+    before = aggregates.summary()
+    assert aggregates.add('experiences', records) == 0
+    assert aggregates.add('experiences', [{'company': 'no id'}]) == 0
+    assert aggregates.summary() == before
+    assert sum(company['records'] for company in before['experiences'].values()) == 10
+
+
+def test_corpora_are_kept_apart(aggregates):
+    aggregates.add('experiences', [{'id': 'a', 'company': 'Amazon'}])
+    aggregates.add('gfg', [{'title': 'Amazon SDE', 'content': 'Round 1', 'company': 'Amazon'}])
+    aggregates.clear('experiences')
+    assert list(aggregates.summary()) == ['gfg']
+    assert aggregates.summary(corpus='gfg')['gfg']['Amazon']['records'] == 1
+
+
+def test_export_only_when_changed(aggregates):
+    assert not aggregates.export()
+    aggregates.add('experiences', [{'id': 'a', 'company': 'Amazon', 'difficulty': 'Hard'}])
+    assert aggregates.export()
+    assert not aggregates.export()
+    with open(aggregates.export_path, 'r', encoding='utf-8') as f:
+        exported = json.load(f)
+    assert exported['corpora'] == aggregates.summary()
+
+
+def test_commit_experiences_counts_stored_records_once(tmp_path):
+    path = str(tmp_path / 'aggregates.sqlite')
+    records = [{'id': 'a', 'company': 'Amazon'}, {'id': 'b', 'company': 'Google'},
+               {'id': 'c', 'company': 'Amazon', 'duplicate_of': 'a'}]
+    assert process_experience_nlp.commit_experiences(records, aggregates_path=path, search_index_dir='off') == 2
+    assert process_experience_nlp.commit_experiences(records, aggregates_path=path, search_index_dir='off') == 0
+    aggregates = CompanyAggregates(path)
+    assert aggregates.count('experiences') == 2
+    aggregates.close()
+
+
+def test_aggregates_are_opt_in(monkeypatch):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("aggregates opened without being enabled")
+
+    for module in (process_experience_nlp, process_gfg_nlp):
+        monkeypatch.setattr(module, 'COMPANY_AGGREGATES', None)
+        monkeypatch.setattr(module, 'CompanyAggregates', unexpected)
+    assert process_experience_nlp.commit_experiences([{'id': 'a'}], search_index_dir='off') == 0
+    process_gfg_nlp.update_company_aggregates([{'title': 't', 'content': 'c'}])
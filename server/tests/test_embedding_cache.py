@@ -0,0 +1,92 @@
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+class FakeEncoder:
+    """Deterministic unit vectors per text, recording what was asked to encode"""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def vector(self, text):
+        normalized = ' '.join(text.split()).lower()
+        rng = np.random.default_rng(sum(map(ord, normalized)) + len(normalized))
+        vector = rng.standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([self.vector(t) for t in texts])
+
+
+def test_only_missing_texts_are_encoded(tmp_path):
+    encode = FakeEncoder()
+    cache = EmbeddingCache(str(tmp_path))
+    texts = ['What is a heap?', 'what is  a HEAP?', 'Explain TCP', 'What is a heap?']
+
+    embeddings = cache.get_or_encode(texts, encode, batch_size=1)
+    assert encode.calls == [['What is a heap?'], ['Explain TCP']]
+    assert np.allclose(embeddings, np.stack([encode.vector(t) for t in texts]), atol=1e-3)
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1)
+    assert cache.stats()['hits'] == 2 and len(cache) == 2
+
+
+def test_saved_cache_is_reused_by_the_next_run(tmp_path):
+    encode = FakeEncoder()
+    cache = EmbeddingCache(str(tmp_path))
+    first = cache.get_or_encode(['a question', 'another question'], encode)
+    cache.save()
+
+    encode.calls.clear()
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.run == 2
+    second = reopened.get_or_encode(['another question', 'a question', 'new one'], encode)
+    assert encode.calls == [['new one']]
+    assert np.allclose(second[:2], first[::-1])
+
+
+def test_unsaved_rows_are_ignored_on_reload(tmp_path):
+    encode = FakeEncoder()
+    cache = EmbeddingCache(str(tmp_path))
+    cache.get_or_encode(['saved'], encode)
+    cache.save()
+    cache.get_or_encode(['not saved'], encode)
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert len(reopened) == 1
+    encode.calls.clear()
+    reopened.get_or_encode(['saved', 'not saved'], encode)
+    assert encode.calls == [['not saved']]
+
+
+def test_growth_keeps_existing_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr('embedding_cache.INITIAL_CAPACITY', 2)
+    encode = FakeEncoder()
+    cache = EmbeddingCache(str(tmp_path))
+    texts = [f'question {i}' for i in range(9)]
+    for text in texts:
+        cache.get_or_encode([text], encode)
+    assert np.allclose(cache.get_or_encode(texts, encode), np.stack([encode.vector(t) for t in texts]), atol=1e-3)
+
+
+def test_compact_drops_idle_rows(tmp_path):
+    encode = FakeEncoder()
+    cache = EmbeddingCache(str(tmp_path))
+    cache.get_or_encode(['old', 'kept'], encode)
+    cache.save()
+    for _ in range(3):
+        cache = EmbeddingCache(str(tmp_path))
+        cache.get_or_encode(['kept', 'recent'], encode)
+        cache.save()
+
+    assert cache.compact(max_idle_runs=1) == 1
+    reopened = EmbeddingCache(str(tmp_path), new_run=False)
+    assert len(reopened) == 2
+    encode.calls.clear()
+    embeddings = reopened.get_or_encode(['kept', 'recent', 'old'], encode)
+    assert encode.calls == [['old']]
+    assert np.allclose(embeddings[:2], np.stack([encode.vector('kept'), encode.vector('recent')]), atol=1e-3)
+
+    assert reopened.compact(max_entries=1) == 2
@@ -0,0 +1,67 @@
+import json
+
+from enhanced_store import EnhancedStore, content_key
+
+RECORDS = [{'title': f'Amazon SDE {i}', 'content': f'Round 1\nWhat is a heap? {i}', 'company': 'Amazon'}
+           for i in range(5)]
+
+
+def test_content_key_ignores_whitespace_and_case():
+    a = {'title': 'Amazon  SDE', 'content': 'What is\n a heap?'}
+    b = {'title': 'amazon sde ', 'content': ' what is a   heap?', 'company': 'Amazon'}
+    assert content_key(a) == content_key(b)
+    assert content_key(a) != content_key({'title': 'Amazon SDE', 'content': 'What is a stack?'})
+
+
+def test_append_skips_stored_records(tmp_path):
+    store = EnhancedStore(str(tmp_path / 'store.sqlite'))
+    assert store.append(RECORDS[:3]) == 3
+    assert store.append(RECORDS) == 2
+    assert len(store) == 5
+    assert content_key(RECORDS[0]) in store
+    assert list(store.iter_records()) == RECORDS
+    store.close()
+
+
+def test_export_and_import_round_trip(tmp_path):
+    store = EnhancedStore(str(tmp_path / 'store.sqlite'))
+    store.append(RECORDS)
+    exported = store.export_json(str(tmp_path / 'enhanced.json'))
+    store.close()
+    with open(exported, 'r', encoding='utf-8') as f:
+        assert json.load(f) == RECORDS
+
+    other = EnhancedStore(str(tmp_path / 'other.sqlite'))
+    assert other.import_json(exported) == len(RECORDS)
+    assert other.import_json(exported) == 0
+    assert list(other.iter_records()) == RECORDS
+    other.close()
+
+
+def test_export_empty_store(tmp_path):
+    store = EnhancedStore(str(tmp_path / 'store.sqlite'))
+    with open(store.export_json(str(tmp_path / 'enhanced.json')), 'r', encoding='utf-8') as f:
+        assert json.load(f) == []
+    store.close()
+
+
+def test_store_pipeline_exports_only_when_entries_were_added(tmp_path, monkeypatch):
+    import process_gfg_nlp
+
+    monkeypatch.setattr(process_gfg_nlp, 'NEAR_DUPLICATE_INDEX', None)
+    raw_path, export_path = tmp_path / 'raw.json', tmp_path / 'enhanced.json'
+    raw_path.write_text(json.dumps(RECORDS[:2]))
+    options = dict(store_path=str(tmp_path / 'store.sqlite'), export_file=str(export_path), stages=(),
+                   build_search_index=False, build_aggregates=False)
+
+    process_gfg_nlp.process_enhanced_pipeline_store(str(raw_path), **options)
+    assert [entry['title'] for entry in json.loads(export_path.read_text())] == ['Amazon SDE 0', 'Amazon SDE 1']
+
+    # Nothing new: the export is left alone
+    export_path.write_text('[]')
+    process_gfg_nlp.process_enhanced_pipeline_store(str(raw_path), **options)
+    assert export_path.read_text() == '[]'
+
+    raw_path.write_text(json.dumps(RECORDS[:3]))
+    process_gfg_nlp.process_enhanced_pipeline_store(str(raw_path), **options)
+    assert len(json.loads(export_path.read_text())) == 3
@@ -0,0 +1,200 @@
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path), backoff=0.1)
+
+
+def read_result(queue, job_id):
+    path = os.path.join(queue.results_dir, job_id + '.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_claim_complete_publishes_result(queue):
+    job_id = queue.enqueue({'company': 'Amazon'})
+    job = queue.claim(job_id)
+    assert job['experience'] == {'company': 'Amazon'}
+    assert queue.claim(job_id) is None
+
+    queue.complete(job, {'id': 'exp1'})
+    assert read_result(queue, job_id) == {'id': job_id, 'ok': True, 'result': {'id': 'exp1'}, 'attempts': 1}
+    assert queue.stats() == {'pending': 0, 'claimed': 0, 'results': 1, 'dead': 0}
+
+
+def test_fail_retries_with_backoff_then_dead_letters(queue):
+    job_id = queue.enqueue({})
+    for attempt in range(1, queue.max_attempts):
+        job = queue.claim(job_id)
+        queue.fail(job, f'error {attempt}')
+        assert queue.claim(job_id) is None, "retry must wait for its backoff"
+        time.sleep(queue.backoff * 2 ** attempt)
+
+    queue.fail(queue.claim(job_id), 'last error')
+    result = read_result(queue, job_id)
+    assert result['ok'] is False and result['attempts'] == queue.max_attempts
+    with open(result['dead_letter'], 'r', encoding='utf-8') as f:
+        assert [e['error'] for e in json.load(f)['errors']] == ['error 1', 'error 2', 'last error']
+    assert queue.pending() == []
+
+    queue.requeue_dead(job_id)
+    assert queue.claim(job_id)['attempts'] == 0
+
+
+def test_withdraw_before_claim(queue):
+    job_id = queue.enqueue({})
+    assert queue.withdraw(job_id)
+    assert queue.claim(job_id) is None
+    assert queue.pending() == [] and queue.stats()['claimed'] == 0
+    assert not queue.withdraw(job_id)
+
+
+def test_withdraw_after_claim_drops_the_result(queue):
+    job_id = queue.enqueue({})
+    job = queue.claim(job_id)
+    assert not queue.withdraw(job_id)
+    queue.complete(job, {'id': 'exp1'})
+    assert read_result(queue, job_id) is None
+    assert os.listdir(queue.jobs_dir) == []
+
+
+def test_fail_after_withdraw_does_not_resurrect(queue):
+    job_id = queue.enqueue({})
+    job = queue.claim(job_id)
+    # The submitter gave up and the job file is gone by the time the worker fails
+    os.remove(queue._job_path(job_id))
+    queue.fail(job, 'boom')
+    assert queue.pending() == []
+    assert queue.stats()['claimed'] == 0
+
+
+def test_fail_after_withdraw_drops_the_job(queue):
+    job_id = queue.enqueue({})
+    job = queue.claim(job_id)
+    assert not queue.withdraw(job_id)
+    queue.fail(job, 'boom')
+    assert queue.pending() == []
+    assert os.listdir(queue.jobs_dir) == []
+    assert read_result(queue, job_id) is None and queue.stats()['dead'] == 0
+
+
+def test_claim_drops_a_job_abandoned_under_a_stale_lock(queue):
+    job_id = queue.enqueue({})
+    # The submitter marked it while a worker held it, and the worker died before finishing
+    open(queue._abandoned_path(job_id), 'w').close()
+    assert queue.claim(job_id) is None
+    assert os.listdir(queue.jobs_dir) == []
+
+
+def test_release_leaves_a_lock_retaken_by_another_process(queue):
+    job_id = queue.enqueue({})
+    job = queue.claim(job_id)
+    # The lock was broken as stale and claimed by another consumer meanwhile
+    with open(queue._lock_path(job_id), 'w') as f:
+        f.write(str(os.getppid()))
+    queue.complete(job, {})
+    assert os.path.exists(queue._lock_path(job_id))
+    assert queue.claim(job_id) is None
+
+
+def test_stale_lock_is_reclaimed(queue):
+    job_id = queue.enqueue({})
+    process = multiprocessing.Process(target=os.getpid)
+    process.start()
+    process.join()
+    with open(queue._lock_path(job_id), 'w') as f:
+        f.write(str(process.pid))
+    assert queue.claim(job_id)['id'] == job_id
+
+
+def test_expired_lock_is_reclaimed(tmp_path):
+    queue = JobQueue(str(tmp_path), lock_timeout=0)
+    job_id = queue.enqueue({})
+    assert queue.claim(job_id) is not None
+    time.sleep(0.01)
+    assert queue.claim(job_id) is not None
+
+
+def test_cleanup_drops_abandoned_and_expired_results(queue):
+    kept, abandoned, old = (queue.enqueue({}) for _ in range(3))
+    for job_id in (kept, old):
+        queue.complete(queue.claim(job_id), {})
+    job = queue.claim(abandoned)
+    queue.withdraw(abandoned)
+    queue.complete(job, {})
+    # An abandoned marker whose job finished anyway
+    open(queue._abandoned_path('gone'), 'w').close()
+    open(os.path.join(queue.work_dir, 'gone.input.json'), 'w').close()
+    past = time.time() - 7200
+    os.utime(os.path.join(queue.results_dir, old + '.json'), (past, past))
+
+    queue.cleanup(result_ttl=3600)
+    assert sorted(os.listdir(queue.results_dir)) == [kept + '.json']
+    assert os.listdir(queue.jobs_dir) == []
+    assert os.listdir(queue.work_dir) == []
+
+
+def _drain(spool_dir, claimed):
+    queue = JobQueue(spool_dir)
+    for job_id in queue.pending():
+        job = queue.claim(job_id)
+        if job is not None:
+            claimed.put(job_id)
+            queue.complete(job, {'pid': os.getpid()})
+
+
+def _withdraw_all(spool_dir, job_ids, withdrawn, marked):
+    queue = JobQueue(spool_dir)
+    for job_id in job_ids:
+        (withdrawn if queue.withdraw(job_id) else marked).put(job_id)
+
+
+def drain_queue(channel):
+    items = []
+    while not channel.empty():
+        items.append(channel.get())
+    return items
+
+
+def test_concurrent_consumers_and_withdrawals(tmp_path):
+    spool_dir = str(tmp_path)
+    queue = JobQueue(spool_dir)
+    job_ids = [queue.enqueue({'n': i}) for i in range(200)]
+
+    claimed, withdrawn, marked = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_drain, args=(spool_dir, claimed)) for _ in range(4)]
+    processes.append(multiprocessing.Process(target=_withdraw_all,
+                                             args=(spool_dir, job_ids[::-1], withdrawn, marked)))
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    claimed, withdrawn, marked = drain_queue(claimed), drain_queue(withdrawn), drain_queue(marked)
+
+    # Every job ran exactly once or was withdrawn before it ran, never both. A withdrawal that
+    # found the job locked marked it abandoned instead, and a worker locking it then dropped it
+    assert len(claimed) == len(set(claimed))
+    assert not set(claimed) & set(withdrawn)
+    assert set(job_ids) - set(claimed) - set(withdrawn) <= set(marked)
+    assert queue.pending() == []
+
+    # A withdrawal that lost the race to a worker either stopped the result from being
+    # published or, if it came after, left a marker that cleanup uses to drop it
+    published = {name[:-5] for name in os.listdir(queue.results_dir)}
+    abandoned = {name[:-len('.abandoned')] for name in os.listdir(queue.jobs_dir) if name.endswith('.abandoned')}
+    assert published <= set(claimed)
+    assert abandoned <= published
+    queue.cleanup()
+    assert os.listdir(queue.jobs_dir) == []
+    assert {name[:-5] for name in os.listdir(queue.results_dir)} == published - abandoned
@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from benchmark_matcher import generate_text, legacy_scan, matcher_scan
+from process_experience_nlp import InterviewExperienceProcessor, KeywordMatcher
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return InterviewExperienceProcessor()
+
+
+def legacy_hits(word_groups, substring_groups, text):
+    hits = {name: re.findall(r'\b(' + '|'.join(alts) + r')\b', text) for name, alts in word_groups.items()}
+    for name, (keyword,) in substring_groups.items():
+        hits[name] = [keyword] * text.count(keyword)
+    return hits
+
+
+@pytest.mark.parametrize('text', [
+    "very hard and hard, then very hardly hard",
+    "not selected but selected; selectedselected",
+    "phone screen phone interview screening",
+    "re-design design designer system design",
+    "goodgood good goodness",
+    "",
+])
+def test_scan_matches_findall_and_count(text):
+    word_groups = {
+        'hard': ['hard', 'very hard'],
+        'very': ['very hard', 'extremely difficult'],
+        'select': ['selected', 'not selected'],
+        'phone': ['phone screen', 'phone interview', 'screening'],
+        'design': ['system design', 'design', 're-design'],
+    }
+    substring_groups = {'good': ['good'], 'selected': ['selected'], 'hard': ['hard']}
+    matcher = KeywordMatcher(word_groups, {f'keyword:{k}': v for k, v in substring_groups.items()})
+
+    hits = matcher.scan(text)
+    expected = legacy_hits(word_groups, {f'keyword:{k}': v for k, v in substring_groups.items()}, text)
+    assert {name: [alt for _, alt in found] for name, found in hits.items()} == expected
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_processor_matches_legacy_scans(processor, seed):
+    text = generate_text(processor, 400, seed=seed)
+    questions = processor.extract_questions(text)
+    assert matcher_scan(processor, text, questions) == legacy_scan(processor, text, questions)
@@ -0,0 +1,127 @@
+import random
+
+import pytest
+
+from near_duplicates import MinHasher, NearDuplicateIndex, min_shared_bands, shingles, similarity
+
+WORDS = ("array tree graph heap stack queue amazon google round interview asked coding design system "
+         "behavioral recruiter offer rejected selected binary search dynamic programming hash table").split()
+
+
+def article(seed, length=300):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def edited(text, fraction, seed=0):
+    """`text` with about `fraction` of its words replaced"""
+    rng = random.Random(seed)
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[i] = f'edit{i}'
+    return ' '.join(words)
+
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'near_duplicates.sqlite'))
+    yield index
+    index.close()
+
+
+def test_signature_estimates_jaccard():
+    hasher = MinHasher()
+    a = article(1)
+    for fraction in (0.0, 0.02, 0.1, 0.3):
+        b = edited(a, fraction)
+        assert abs(similarity(hasher.signature(a), hasher.signature(b)) - jaccard(a, b)) < 0.15
+    assert hasher.signature('  ... ') is None
+
+
+def test_min_shared_bands_keeps_recall():
+    assert 1 <= min_shared_bands(0.8) <= 32
+    assert min_shared_bands(0.9) >= min_shared_bands(0.5)
+
+
+def test_query_finds_near_duplicates_only(index):
+    originals = {f'exp{i}': article(i) for i in range(20)}
+    for record_id, text in originals.items():
+        assert index.add(record_id, text, commit=False)
+    index.commit()
+    assert len(index) == 20
+
+    match = index.query(edited(originals['exp7'], 0.01))
+    assert match is not None and match[0] == 'exp7' and match[1] >= index.threshold
+    assert index.query(article(999)) is None
+    # A record never matches itself when its own id is excluded
+    assert index.query(originals['exp3'], exclude='exp3') is None
+
+
+def test_add_replaces_and_remove_forgets(index):
+    first, second = article(1), article(2)
+    index.add('exp', first)
+    index.add('exp', second)
+    assert len(index) == 1
+    assert index.query(first) is None
+    assert index.query(second)[0] == 'exp'
+
+    index.remove('exp')
+    assert len(index) == 0
+    assert index.query(second) is None
+    assert not index.add('empty', '')
+
+
+def test_links(index):
+    index.link('exp2', 'exp1', 0.93)
+    index.link('exp3', 'exp1', 0.88)
+    assert index.duplicates_of('exp1') == [('exp2', 0.93), ('exp3', 0.88)]
+    assert index.stats()['links'] == 2
+
+
+def test_mismatched_parameters_are_rejected(tmp_path):
+    path = str(tmp_path / 'near_duplicates.sqlite')
+    NearDuplicateIndex(path).close()
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, num_perm=64, bands=16)
+
+
+def enrich_with_failures(monkeypatch, index, entries, failing_titles):
+    import process_gfg_nlp
+
+    extract_text_stage = process_gfg_nlp.extract_text_stage
+
+    def extract_or_fail(entry, *args, **kwargs):
+        if entry['title'] in failing_titles:
+            raise RuntimeError('boom')
+        return extract_text_stage(entry, *args, **kwargs)
+
+    monkeypatch.setattr(process_gfg_nlp, 'extract_text_stage', extract_or_fail)
+    return [(consumed, [record['title'] for record in enriched])
+            for consumed, enriched in process_gfg_nlp.iter_enriched_entries(
+                entries, stages=(), near_duplicates=index, entry_batch_size=10)]
+
+
+def pipeline_entries():
+    text = article(1)
+    return [{'title': 'A', 'content': text}, {'title': 'B', 'content': edited(text, 0.01)},
+            {'title': 'C', 'content': article(2)}]
+
+
+def test_pipeline_links_to_an_entry_enriched_in_the_same_chunk(monkeypatch, index):
+    chunks = enrich_with_failures(monkeypatch, index, pipeline_entries(), ())
+    # B waits for A to be indexed, then is linked to it
+    assert chunks == [(1, ['A', 'C']), (3, [])]
+    assert [record_id for record_id, _ in index.duplicates_of('A')] == ['B']
+    assert len(index) == 2
+
+
+def test_pipeline_never_links_to_a_failed_entry(monkeypatch, index):
+    chunks = enrich_with_failures(monkeypatch, index, pipeline_entries(), ('A',))
+    assert [title for _, titles in chunks for title in titles] == ['C', 'B']
+    assert index.duplicates_of('A') == []
+    assert index.query(pipeline_entries()[0]['content'])[0] == 'B'
@@ -0,0 +1,35 @@
+import json
+
+from nlp_metrics import RunMetrics
+
+
+def record(total_ms, **stages_ms):
+    return {'total_ms': total_ms, 'stages_ms': stages_ms, 'counters': {'spacy_unavailable': 1}}
+
+
+def test_merged_worker_metrics_match_a_single_run():
+    single, merged = RunMetrics(), RunMetrics()
+    stats = [record(3.0, sentiment=2.0), record(40.0, sentiment=30.0, keywords=1.5), record(700.0)]
+    for block in stats:
+        single.add(block)
+    for block in stats:
+        worker = RunMetrics()
+        worker.add(block)
+        merged.merge(worker)
+    assert merged.summary() == single.summary()
+    assert merged.summary()['counters'] == {'spacy_unavailable': 3}
+
+
+def test_stats_go_to_the_metrics_file_not_the_records(tmp_path, monkeypatch):
+    import process_experience_nlp
+
+    monkeypatch.setattr(process_experience_nlp, 'NEAR_DUPLICATE_INDEX', None)
+    input_path, output_path, metrics_path = tmp_path / 'in.json', tmp_path / 'out.json', tmp_path / 'metrics.json'
+    input_path.write_text(json.dumps([{'company': 'Amazon', 'role': 'SDE', 'experience': f'Round {i}. What is a heap?'}
+                                      for i in range(3)]))
+
+    processed = process_experience_nlp.process_experience_file(str(input_path), str(output_path),
+                                                               metrics_path=str(metrics_path))
+    assert len(processed) == 3
+    assert not any('nlp_stats' in record for record in json.loads(output_path.read_text()))
+    assert json.loads(metrics_path.read_text())['records'] == 3
@@ -0,0 +1,105 @@
+import json
+import os
+
+import numpy as np
+
+from question_index import TOP_QUESTIONS_FILE, CanonicalQuestionIndex
+
+
+def unit(*values, dim=4):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector / np.linalg.norm(vector)
+
+
+def records(*rows):
+    return [{'question': question, 'company': company, 'round': round_name}
+            for question, company, round_name in rows]
+
+
+def test_assign_groups_similar_questions(tmp_path):
+    index = CanonicalQuestionIndex(str(tmp_path), dim=4)
+    ids = index.assign(
+        records(('What is a heap?', 'Amazon', 'Technical'), ('Explain a heap', 'Google', 'Technical'),
+                ('Tell me about yourself', 'Amazon', 'HR')),
+        [unit(1, 0.05), unit(1, 0.1), unit(0, 1)])
+    # The second question joins the cluster created earlier in the same batch
+    assert ids == [0, 0, 1]
+    assert index.clusters[0]['question'] == 'What is a heap?'
+    assert index.clusters[0]['companies'] == {'Amazon': 1, 'Google': 1}
+
+
+def test_assignments_survive_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr('question_index.INITIAL_CAPACITY', 2)
+    index = CanonicalQuestionIndex(str(tmp_path), dim=4)
+    index.assign(records(*[(f'q{i}', 'Amazon', 'Technical') for i in range(3)]),
+                 [unit(1), unit(0, 1), unit(0, 0, 1)])
+    index.save()
+
+    reopened = CanonicalQuestionIndex(str(tmp_path))
+    assert len(reopened) == 3
+    assert reopened.assign(records(('q1 again', 'Google', 'HR'), ('new', None, None)),
+                           [unit(0.05, 1), unit(0, 0, 0, 1)]) == [1, 3]
+    assert reopened.clusters[1]['count'] == 2
+
+
+def test_closer_cluster_from_the_same_batch_wins(tmp_path):
+    index = CanonicalQuestionIndex(str(tmp_path), dim=4)
+    index.assign(records(('What is a heap?', 'Amazon', 'Technical')), [unit(1)])
+    ids = index.assign(records(('Heap vs stack', 'Amazon', 'Technical'), ('Heap or stack?', 'Google', 'Technical')),
+                       [unit(1, 1.2), unit(1, 0.7)])
+    # The second question passes the threshold for cluster 0 but is closer to cluster 1
+    assert ids == [1, 1]
+    assert index.clusters[0]['count'] == 1 and index.clusters[1]['count'] == 2
+
+
+def test_records_are_counted_once_per_key(tmp_path):
+    index = CanonicalQuestionIndex(str(tmp_path), dim=4)
+    rows = [dict(row, key='Amazon SDE Interview')
+            for row in records(('heap', 'Amazon', 'Technical'), ('yourself', 'Amazon', 'HR'))]
+    assert index.assign(rows, [unit(1), unit(0, 1)]) == [0, 1]
+    index.save()
+
+    # A rerun after a crash before the output was written assigns the same entry again
+    reopened = CanonicalQuestionIndex(str(tmp_path))
+    assert reopened.assign(rows, [unit(1), unit(0, 1)]) == [0, 1]
+    assert [c['count'] for c in reopened.clusters] == [1, 1]
+    assert reopened.clusters[0]['companies'] == {'Amazon': 1}
+
+    assert reopened.assign([dict(rows[0], key='Google SDE Interview')], [unit(1)]) == [0]
+    assert reopened.clusters[0]['count'] == 2
+
+
+def test_most_asked_and_export(tmp_path):
+    index = CanonicalQuestionIndex(str(tmp_path), dim=4)
+    index.assign(records(('heap', 'Amazon', 'Technical'), ('heap?', 'Amazon', 'Technical'),
+                         ('yourself', 'Google', 'HR')),
+                 [unit(1), unit(1), unit(0, 1)])
+    assert [c['question'] for c in index.most_asked()] == ['heap', 'yourself']
+    assert [c['question'] for c in index.most_asked(company='Google')] == ['yourself']
+    assert [c['frequency'] for c in index.most_asked(round_name='Technical')] == [2]
+
+    index.save()
+    with open(os.path.join(str(tmp_path), TOP_QUESTIONS_FILE), 'r', encoding='utf-8') as f:
+        top = json.load(f)
+    assert [c['question'] for c in top['overall']] == ['heap', 'yourself']
+    assert set(top['by_company']) == {'Amazon', 'Google'}
+
+
+def test_pipeline_without_sbert_stages_skips_the_index(tmp_path, monkeypatch):
+    import process_gfg_nlp
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("question index built without an SBERT stage")
+
+    monkeypatch.setattr(process_gfg_nlp, 'NEAR_DUPLICATE_INDEX', None)
+    monkeypatch.setattr(process_gfg_nlp, 'update_question_index', unexpected)
+    monkeypatch.setattr(process_gfg_nlp.models, 'get', unexpected)
+    raw_path, output_path = tmp_path / 'raw.json', tmp_path / 'enhanced.json'
+    raw_path.write_text(json.dumps([{'title': 'Amazon SDE Interview', 'content': 'Round 1\nWhat is a heap?'}]))
+
+    assert process_gfg_nlp.uses_sbert(process_gfg_nlp.STAGES)
+    assert not process_gfg_nlp.uses_sbert(('highlights', 'sentiment'))
+    process_gfg_nlp.process_enhanced_pipeline(str(raw_path), str(output_path), stages=(),
+                                              build_search_index=False, build_aggregates=False)
+    assert [entry['title'] for entry in json.loads(output_path.read_text())] == ['Amazon SDE Interview']
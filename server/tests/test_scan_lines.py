@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import re
+from collections import defaultdict
+
+import pytest
+
+from process_gfg_nlp import (ROUND_KEYWORDS, ROUND_MAPPING, VERDICT_KEYWORDS, _ROUND_KEYWORD_NAMES,
+                             _ROUND_KEYWORD_RE, normalize_round_name, scan_lines)
+
+GFG_DATA = os.path.join(os.path.dirname(__file__), '..', 'data', 'processed_gfg_data.json')
+
+
+# Per-line scans as they were before scan_lines
+
+def legacy_normalize_round_name(name):
+    name = name.lower().strip()
+    for key in ROUND_MAPPING:
+        if key in name:
+            return ROUND_MAPPING[key]
+    return name.title()
+
+
+def legacy_extract_verdict(text):
+    for line in text.split("\n"):
+        for key in VERDICT_KEYWORDS:
+            if key in line.lower():
+                return VERDICT_KEYWORDS[key]
+    return ""
+
+
+def legacy_split_questions_by_round(content):
+    rounds = defaultdict(list)
+    current_round = "General"
+    for line in content.split("\n"):
+        line = line.strip()
+        if re.match(r"(?i)^round\s*\d*[:\-]?\s*", line):
+            current_round = legacy_normalize_round_name(line)
+            continue
+        elif any(keyword in line.lower() for keyword in ROUND_MAPPING.keys()):
+            current_round = legacy_normalize_round_name(line)
+            continue
+        if (
+            len(line) < 10 or
+            not re.search(r"\?$|^(what|why|how|could|do|explain|when|which|are|did|describe|have|name)", line.lower())
+        ):
+            continue
+        rounds[current_round].append(line)
+    return rounds
+
+
+def legacy_found_rounds(content):
+    return {r for r in ROUND_KEYWORDS if re.search(rf"(?i)\b{re.escape(r)}\b", content)}
+
+
+def generated_articles(count=200, seed=7):
+    rng = random.Random(seed)
+    pieces = list(ROUND_MAPPING) + list(VERDICT_KEYWORDS) + ROUND_KEYWORDS + [
+        "Round 2:", "round", "What is a B-tree?", "How does TCP work", "explain joins", "short?",
+        "Did you like it?", "I was not selected", "We discussed hr policies", "technical", "Group discussion",
+        "Name three sorting algorithms", "described my project", "coding test", "   ", "",
+    ]
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randint(1, 25)):
+            words = rng.sample(pieces, rng.randint(1, 3))
+            line = ' '.join(words)
+            if rng.random() < 0.3:
+                line = line.upper() if rng.random() < 0.5 else line.title()
+            if rng.random() < 0.2:
+                line += '?'
+            lines.append(('  ' if rng.random() < 0.2 else '') + line)
+        yield '\n'.join(lines)
+
+
+def corpus_articles():
+    with open(GFG_DATA, 'r', encoding='utf-8') as f:
+        return [entry.get('content', '') for entry in json.load(f)]
+
+
+ARTICLES = corpus_articles() + list(generated_articles())
+
+
+@pytest.mark.parametrize('content', ARTICLES, ids=[f'article{i}' for i in range(len(ARTICLES))])
+def test_scan_lines_matches_per_line_scans(content):
+    rounds, verdict = scan_lines(content)
+    assert dict(rounds) == dict(legacy_split_questions_by_round(content))
+    assert verdict == legacy_extract_verdict(content)
+    assert {_ROUND_KEYWORD_NAMES[r.lower()] for r in _ROUND_KEYWORD_RE.findall(content)} == legacy_found_rounds(content)
+
+
+@pytest.mark.parametrize('name', list(ROUND_MAPPING) + [
+    "Round 1: technical round and hr round", "Final HR Round", "round 3", "  Managerial Round - 2 ", "Something else",
+])
+def test_normalize_round_name_matches_mapping_order(name):
+    assert normalize_round_name(name) == legacy_normalize_round_name(name)
+
+
+@pytest.mark.parametrize('content', [
+    "Result\nI was not selected after the HR round",
+    "Shortlisted for onsite\nSelected!",
+    "HR round: rejected",
+])
+def test_verdict_keeps_keyword_priority(content):
+    # "selected" is checked before "not selected", as it always was
+    assert scan_lines(content)[1] == legacy_extract_verdict(content) != ""
@@ -0,0 +1,186 @@
+import json
+import math
+import os
+
+import pytest
+
+import search_index
+from search_index import B, K1, SearchIndex, experience_fields, experience_id, tokenize
+
+COMPANIES = ['Amazon', 'Google', 'Microsoft', 'Flipkart']
+TOPICS = ['dynamic programming', 'binary search tree', 'system design of a url shortener', 'graph traversal',
+          'sql joins', 'hash maps', 'operating system scheduling', 'behavioral leadership principles']
+
+
+def make_records(count, start=0):
+    return [{
+        'id': f'exp{i}',
+        'company': COMPANIES[i % len(COMPANIES)],
+        'role': 'SDE' if i % 3 else 'Data Engineer',
+        'interview_rounds': [{'type': 'Technical Round'}, {'type': 'HR Round'}][:1 + i % 2],
+        'raw_questions': [f'Explain {TOPICS[i % len(TOPICS)]}?', f'Solve a {TOPICS[(i * 5) % len(TOPICS)]} problem'],
+        'highlights': [f'Round {i % 4} was about {TOPICS[(i * 3) % len(TOPICS)]}'],
+    } for i in range(start, start + count)]
+
+
+RECORDS = make_records(60)
+QUERIES = ['dynamic programming amazon', 'system design', 'google hr', 'sql', 'data engineer graph',
+           'behavioral leadership microsoft', 'zzz unknown', 'the and of']
+
+
+def open_index(path):
+    return SearchIndex(str(path), experience_fields, experience_id)
+
+
+def reference_search(index, records, query, k=10):
+    """Plain BM25 over the weighted terms, scored record by record"""
+    docs = [index.weighted_terms(record) for record in records]
+    average = sum(length for _, length in docs) / len(docs)
+    terms = set(tokenize(query))
+    df = {term: sum(1 for counts, _ in docs if term in counts) for term in terms}
+    scores = []
+    for record, (counts, length) in zip(records, docs):
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term, 0)
+            if tf:
+                idf = math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+        if score:
+            scores.append((record['id'], score))
+    scores.sort(key=lambda hit: -hit[1])
+    return scores[:k]
+
+
+def assert_matches_reference(index, records):
+    for query in QUERIES:
+        # Every hit, so ties at the top-k boundary cannot make the lists differ
+        hits = dict(index.search(query, k=len(records)))
+        expected = dict(reference_search(index, records, query, k=len(records)))
+        assert hits.keys() == expected.keys(), query
+        assert [hits[record_id] for record_id in expected] == pytest.approx(list(expected.values()), rel=1e-4)
+        top = [score for _, score in index.search(query, k=5)]
+        assert top == sorted(hits.values(), reverse=True)[:5]
+
+
+@pytest.fixture
+def small_compaction(monkeypatch):
+    # Merge deltas as soon as they outgrow their base, so tests exercise compaction
+    monkeypatch.setattr(search_index, 'COMPACT_MIN_BYTES', 0)
+
+
+def test_search_matches_reference_bm25(tmp_path):
+    index = open_index(tmp_path)
+    assert index.add(RECORDS) == len(RECORDS)
+    assert_matches_reference(index, RECORDS)
+    assert_matches_reference(open_index(tmp_path), RECORDS)
+
+
+def test_add_is_idempotent(tmp_path):
+    index = open_index(tmp_path)
+    index.add(RECORDS[:40])
+    before = [index.search(query) for query in QUERIES]
+    assert index.add(RECORDS[:40]) == 0
+    assert open_index(tmp_path).add(RECORDS[10:30]) == 0
+    assert index.add([{'company': 'no id'}]) == 0
+    assert len(open_index(tmp_path)) == 40
+    assert [open_index(tmp_path).search(query) for query in QUERIES] == before
+
+
+@pytest.mark.parametrize('batch', [1, 7])
+def test_incremental_adds_match_one_build(tmp_path, small_compaction, batch):
+    built = open_index(tmp_path / 'built')
+    built.add(RECORDS)
+
+    index = open_index(tmp_path / 'incremental')
+    for start in range(0, len(RECORDS), batch):
+        # Overlapping batches: the repeated records are skipped
+        assert index.add(RECORDS[max(0, start - 2):start + batch]) == len(RECORDS[start:start + batch])
+        index.search('amazon dynamic')
+
+    reopened = open_index(tmp_path / 'incremental')
+    for query in QUERIES:
+        assert index.search(query) == built.search(query)
+        assert reopened.search(query) == built.search(query)
+
+
+def test_compact_keeps_results(tmp_path):
+    index = open_index(tmp_path)
+    for start in range(0, len(RECORDS), 10):
+        index.add(RECORDS[start:start + 10])
+    before = [index.search(query) for query in QUERIES]
+    assert index.compact() > 0
+    assert index.compact() == 0
+    assert [open_index(tmp_path).search(query) for query in QUERIES] == before
+
+
+def test_writers_pick_up_each_other(tmp_path):
+    first, second = open_index(tmp_path), open_index(tmp_path)
+    first.add(RECORDS[:20])
+    first.search('amazon')
+    second.add(RECORDS[10:40])
+    first.add(RECORDS[30:60])
+    assert len(first) == len(RECORDS)
+    assert_matches_reference(first, RECORDS)
+    assert_matches_reference(open_index(tmp_path), RECORDS)
+
+
+def test_interrupted_update_is_rolled_back(tmp_path, monkeypatch):
+    index = open_index(tmp_path)
+    index.add(RECORDS[:30])
+
+    # Crash after the deltas and docs were appended but before meta.json was written
+    real_write = search_index._write_json_atomic
+
+    def crash_on_meta(path, data):
+        if os.path.basename(path) == search_index.META_FILE:
+            raise KeyboardInterrupt
+        real_write(path, data)
+
+    monkeypatch.setattr(search_index, '_write_json_atomic', crash_on_meta)
+    with pytest.raises(KeyboardInterrupt):
+        open_index(tmp_path).add(make_records(5, start=100))
+    monkeypatch.setattr(search_index, '_write_json_atomic', real_write)
+
+    reader = open_index(tmp_path)
+    assert len(reader) == 30
+    assert 'exp100' not in reader
+    assert_matches_reference(reader, RECORDS[:30])
+
+    # The next writer truncates the leftovers before appending
+    writer = open_index(tmp_path)
+    assert writer.add(RECORDS[30:]) == 30
+    assert not os.path.exists(os.path.join(str(tmp_path), search_index.PENDING_FILE))
+    assert_matches_reference(open_index(tmp_path), RECORDS)
+    with open(os.path.join(str(tmp_path), search_index.DOCS_FILE), 'r', encoding='utf-8') as f:
+        assert [json.loads(line)[0] for line in f] == [record['id'] for record in RECORDS]
+
+
+def test_partial_delta_line_is_ignored(tmp_path):
+    index = open_index(tmp_path)
+    index.add(RECORDS[:10])
+    shards_dir = os.path.join(str(tmp_path), search_index.SHARDS_DIR)
+    delta = next(name for name in os.listdir(shards_dir) if name.endswith('.delta'))
+    with open(os.path.join(shards_dir, delta), 'ab') as f:
+        f.write(b'[["amazon",10,3]')
+    assert_matches_reference(open_index(tmp_path), RECORDS[:10])
+
+
+def test_empty_index(tmp_path):
+    index = open_index(tmp_path)
+    assert len(index) == 0
+    assert index.search('amazon') == []
+    assert index.add([]) == 0
+
+
+def test_committed_experiences_are_indexed_once(tmp_path, monkeypatch):
+    import process_experience_nlp
+    monkeypatch.setattr(process_experience_nlp, 'COMPANY_AGGREGATES', None)
+
+    records = RECORDS[:5] + [dict(RECORDS[5], duplicate_of='exp1')]
+    for _ in range(2):
+        process_experience_nlp.commit_experiences(records, search_index_dir=str(tmp_path))
+    index = open_index(tmp_path)
+    assert len(index) == 5
+    assert 'exp5' not in index
+    assert_matches_reference(index, RECORDS[:5])
@@ -0,0 +1,222 @@
+import json
+
+import pytest
+
+import stream_io
+from stream_io import JsonlCheckpointWriter, iter_json_records
+
+RECORDS = [{'id': i, 'text': 'x' * (i * 7), 'nested': {'list': [i, None, '"]'], 'ok': True}} for i in range(12)]
+
+
+@pytest.fixture(params=[3, 16, stream_io.CHUNK_SIZE])
+def chunk_size(request, monkeypatch):
+    # Small chunks cut values, separators and nulls at every buffer edge
+    monkeypatch.setattr(stream_io, 'CHUNK_SIZE', request.param)
+    return request.param
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_json_array(tmp_path, chunk_size):
+    path = write(tmp_path, 'records.json', json.dumps(RECORDS, indent=2))
+    assert list(iter_json_records(path)) == RECORDS
+
+
+def test_jsonl(tmp_path, chunk_size):
+    path = write(tmp_path, 'records.jsonl', '\n'.join(json.dumps(r) for r in RECORDS) + '\n\n')
+    assert list(iter_json_records(path)) == RECORDS
+
+
+@pytest.mark.parametrize('text', ['null', '[null]', '[null, null]', ' [ ]', '', '\n', 'null\nnull\n'])
+def test_nulls_and_empty_inputs_yield_nothing(tmp_path, chunk_size, text):
+    path = write(tmp_path, 'records.json', text)
+    assert list(iter_json_records(path)) == []
+
+
+def test_nulls_between_records_are_skipped(tmp_path, chunk_size):
+    path = write(tmp_path, 'records.json', '[null, ' + ', null, '.join(json.dumps(r) for r in RECORDS) + ', null]')
+    assert list(iter_json_records(path)) == RECORDS
+    path = write(tmp_path, 'records.jsonl', 'null\n' + '\nnull\n'.join(json.dumps(r) for r in RECORDS))
+    assert list(iter_json_records(path)) == RECORDS
+
+
+@pytest.mark.parametrize('text', ['[{"id": 1}, {"id": 2', '[{"id": 1}, ', '[1, nul'])
+def test_truncated_array_raises(tmp_path, chunk_size, text):
+    path = write(tmp_path, 'records.json', text)
+    with pytest.raises(ValueError):
+        list(iter_json_records(path))
+
+
+def test_invalid_jsonl_line_raises(tmp_path):
+    path = write(tmp_path, 'records.jsonl', '{"id": 1}\n{"id": \n')
+    with pytest.raises(ValueError, match='line 2'):
+        list(iter_json_records(path))
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_checkpoint_resume_drops_uncommitted_output(tmp_path):
+    source = write(tmp_path, 'records.json', json.dumps(RECORDS))
+    path = str(tmp_path / 'out.jsonl')
+    with JsonlCheckpointWriter(path, source=source) as writer:
+        for record in RECORDS[:5]:
+            writer.write(record)
+        writer.commit(5)
+        # Written but never committed, as if the run was killed here
+        for record in RECORDS[5:8]:
+            writer.write(record)
+        writer._file.flush()
+    with open(path, 'ab') as f:
+        f.write(b'{"id": "half a li')
+
+    with JsonlCheckpointWriter(path, source=source) as writer:
+        assert writer.records_read == 5
+        assert not writer.untracked_output
+        for record in RECORDS[writer.records_read:]:
+            writer.write(record)
+        writer.commit(len(RECORDS))
+
+    assert read_jsonl(path) == RECORDS
+    with JsonlCheckpointWriter(path, source=source) as writer:
+        assert writer.records_read == len(RECORDS)
+
+
+def test_checkpoint_of_another_input_is_ignored(tmp_path):
+    source = write(tmp_path, 'records.json', json.dumps(RECORDS[:5]))
+    path = str(tmp_path / 'out.jsonl')
+    with JsonlCheckpointWriter(path, source=source) as writer:
+        for record in RECORDS[:5]:
+            writer.write(record)
+        writer.commit(5)
+
+    # The raw file is regenerated, and a different file is streamed into the same output
+    write(tmp_path, 'records.json', json.dumps(RECORDS))
+    other = write(tmp_path, 'other.json', json.dumps(RECORDS[:5]))
+    for input_path in (source, other):
+        with JsonlCheckpointWriter(path, source=input_path) as writer:
+            assert writer.records_read == 0
+            assert writer.untracked_output
+    assert read_jsonl(path) == RECORDS[:5]
+
+
+def test_no_resume_keeps_existing_output(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    with JsonlCheckpointWriter(path) as writer:
+        writer.write(RECORDS[0])
+        writer.commit(1)
+    with JsonlCheckpointWriter(path, resume=False) as writer:
+        assert writer.records_read == 0
+        assert writer.untracked_output
+        writer.write(RECORDS[1])
+        writer.commit(1)
+    assert read_jsonl(path) == RECORDS[:2]
+
+
+def test_output_without_checkpoint_is_never_emptied(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    path.write_text(json.dumps(RECORDS[0]) + '\n' + json.dumps(RECORDS[1])[:10], encoding='utf-8')
+    size = path.stat().st_size
+
+    with JsonlCheckpointWriter(str(path)) as writer:
+        assert writer.records_read == 0 and writer.untracked_output
+    assert path.stat().st_size == size
+
+    # Appending drops only the half-written last line
+    with JsonlCheckpointWriter(str(path)) as writer:
+        writer.write(RECORDS[2])
+        writer.commit(1)
+    assert read_jsonl(str(path)) == [RECORDS[0], RECORDS[2]]
+
+
+def test_checkpoint_beyond_the_output_is_ignored(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    with JsonlCheckpointWriter(path) as writer:
+        for record in RECORDS[:4]:
+            writer.write(record)
+        writer.commit(4)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(RECORDS[0]) + '\n')
+    with JsonlCheckpointWriter(path) as writer:
+        assert writer.records_read == 0 and writer.untracked_output
+    assert read_jsonl(path) == RECORDS[:1]
+
+
+def test_compact_checkpoint_resume_round_trips(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    records = [dict(r, content='shared article body', title=f"title {r['id']}") for r in RECORDS]
+    with JsonlCheckpointWriter(path, compact=True) as writer:
+        for record in records[:6]:
+            writer.write(record)
+        writer.commit(6)
+    with JsonlCheckpointWriter(path, compact=True) as writer:
+        assert writer.records_read == 6
+        for record in records[6:]:
+            writer.write(record)
+        writer.commit(len(records))
+    assert list(iter_json_records(path)) == records
+
+
+def test_experience_stream_refuses_untracked_output(tmp_path):
+    from process_experience_nlp import process_experience_stream
+
+    input_path = write(tmp_path, 'experiences.json', json.dumps([{'id': 'a', 'experience': 'It went well.'}]))
+    output_path = write(tmp_path, 'processed.jsonl', json.dumps({'id': 'old'}) + '\n')
+    process_experience_stream(input_path, output_path)
+    assert read_jsonl(output_path) == [{'id': 'old'}]
+
+
+def test_gfg_stream_retries_failed_entries_on_resume(tmp_path, monkeypatch):
+    import process_gfg_nlp
+
+    monkeypatch.setattr(process_gfg_nlp, 'NEAR_DUPLICATE_INDEX', None)
+    entries = [{'title': f'Entry {i}', 'content': f'Round 1\nWhat is topic {i}?'} for i in range(5)]
+    input_path = write(tmp_path, 'raw.json', json.dumps(entries))
+    output_path = str(tmp_path / 'enhanced.jsonl')
+    extract_text_stage = process_gfg_nlp.extract_text_stage
+
+    def run(failing=()):
+        def extract_or_fail(entry, *args, **kwargs):
+            if entry['title'] in failing:
+                raise RuntimeError('boom')
+            return extract_text_stage(entry, *args, **kwargs)
+
+        monkeypatch.setattr(process_gfg_nlp, 'extract_text_stage', extract_or_fail)
+        process_gfg_nlp.process_enhanced_pipeline_stream(input_path, output_path, stages=(), entry_batch_size=2,
+                                                         build_search_index=False, build_aggregates=False)
+        with open(output_path + '.checkpoint', 'r', encoding='utf-8') as f:
+            return json.load(f)['records_read']
+
+    # The checkpoint stays at the failed entry, even after later chunks are written
+    assert run(failing=('Entry 1',)) == 1
+    assert [record['title'] for record in read_jsonl(output_path)] == ['Entry 0', 'Entry 2', 'Entry 3', 'Entry 4']
+    assert run() == 5
+    assert sorted(record['title'] for record in read_jsonl(output_path)) == [entry['title'] for entry in entries]
+
+
+def test_checkpoint_of_a_replaced_output_is_ignored(tmp_path):
+    from compact_output import write_compact
+
+    source = write(tmp_path, 'records.json', json.dumps(RECORDS))
+    path = str(tmp_path / 'out.jsonl')
+    with JsonlCheckpointWriter(path, source=source) as writer:
+        for record in RECORDS[:3]:
+            writer.write(dict(record, content='long article text ' * 20))
+        writer.commit(3)
+
+    # A file-mode --compact run rewrites the same path with fewer records
+    write_compact([dict(RECORDS[0], content='short')], path)
+    with JsonlCheckpointWriter(path, source=source) as writer:
+        assert writer.records_read == 0 and writer.untracked_output
+        # The file is compact, so appended records are too
+        writer.write(dict(RECORDS[1], content='short'))
+        writer.commit(1)
+    assert list(iter_json_records(path)) == [dict(RECORDS[0], content='short'), dict(RECORDS[1], content='short')]
+    with open(path, 'r', encoding='utf-8') as f:
+        assert all('content_ref' in json.loads(line) for line in f)
@@ -0,0 +1,39 @@
+import pytest
+
+from benchmark_matcher import generate_text
+from process_experience_nlp import InterviewExperienceProcessor
+from tiered_sentiment import SENTIMENT_KEYWORDS, keyword_counts, lexicon_verdict
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return InterviewExperienceProcessor()
+
+
+def test_processor_shares_the_keyword_lists(processor):
+    assert processor.sentiment_keywords == SENTIMENT_KEYWORDS
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_keyword_counts_match_the_processor(processor, seed):
+    text = generate_text(processor, 300, seed=seed)
+    hits = processor.matcher.scan(text.lower())
+    scores = {sentiment: sum(processor._keyword_count(hits, keyword) for keyword in keywords)
+              for sentiment, keywords in processor.sentiment_keywords.items()}
+    assert keyword_counts(text) == (scores['positive'], scores['negative'])
+
+
+def test_substrings_count():
+    # str.count semantics, as the processor has always used
+    assert keyword_counts("GOOD goodness") == keyword_counts("good good")
+    # "unclear" is negative and also counts as the positive "clear"
+    assert keyword_counts("unclear") == (1, 1)
+
+
+def test_lexicon_verdict_escalates_unclear_texts():
+    assert lexicon_verdict(0.9, 3, 0) == 'positive'
+    assert lexicon_verdict(-0.9, 0, 3) == 'negative'
+    assert lexicon_verdict(0.1, 1, 1) is None
+    assert lexicon_verdict(0.9, 0, 3) is None
+    assert lexicon_verdict(None, 3, 0) == 'positive'
+    assert lexicon_verdict(None, 1, 0) is None